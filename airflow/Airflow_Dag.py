@@ -13,7 +13,7 @@ from datetime import datetime
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from markdown import read_pdf_from_s3, process_pdf
-from airflow.extraction_files_embedd import process_folder, list_subfolders
+from airflow.extraction_files_embedd import process_folder, list_objects, build_local_ivf
 from pathlib import Path
 from dotenv import load_dotenv
 from pinecone import Pinecone, ServerlessSpec, Index
@@ -52,6 +52,11 @@ PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TEXT_INDEX_NAME = os.getenv("TEXT_INDEX_NAME")
 IMAGE_INDEX_NAME = os.getenv("IMAGE_INDEX_NAME")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "data/indexes")
+BACKEND_URL = os.getenv("BACKEND_URL")
+BACKEND_ADMIN_TOKEN = os.getenv("BACKEND_ADMIN_TOKEN")
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH")
 
 # Set OpenAI API key
 openai.api_key = OPENAI_API_KEY
@@ -64,45 +69,60 @@ s3 = boto3.client(
     region_name=AWS_REGION
 )
 
-# Initialize Pinecone
-pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
-
-# Create Pinecone indexes if they do not exist
-if TEXT_INDEX_NAME not in pinecone_client.list_indexes().names():
-    pinecone_client.create_index(
-        name=TEXT_INDEX_NAME,
-        dimension=1536,
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region="us-east-1")
+# Vector indexes: hosted Pinecone, or the backend's in-process LocalVectorIndex for offline runs
+if VECTOR_BACKEND == "local":
+    # The local index lives in the backend package, so backend/ must be on PYTHONPATH
+    from apis.vector_index import LocalVectorIndex
+    text_index = LocalVectorIndex(os.path.join(LOCAL_INDEX_DIR, TEXT_INDEX_NAME), dimension=1536)
+    image_index = LocalVectorIndex(os.path.join(LOCAL_INDEX_DIR, IMAGE_INDEX_NAME), dimension=512)
+else:
+    # Initialize Pinecone
+    pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+
+    # Create Pinecone indexes if they do not exist
+    if TEXT_INDEX_NAME not in pinecone_client.list_indexes().names():
+        pinecone_client.create_index(
+            name=TEXT_INDEX_NAME,
+            dimension=1536,
+            metric='cosine',
+            spec=ServerlessSpec(cloud='aws', region="us-east-1")
+        )
+
+    if IMAGE_INDEX_NAME not in pinecone_client.list_indexes().names():
+        pinecone_client.create_index(
+            name=IMAGE_INDEX_NAME,
+            dimension=512,
+            metric='cosine',
+            spec=ServerlessSpec(cloud='aws', region='us-east-1')
+        )
+
+    # Connect to existing Pinecone indexes using the full host URL
+    text_index = Index(
+        api_key=PINECONE_API_KEY,
+        index_name=TEXT_INDEX_NAME,
+        host=f"https://{TEXT_INDEX_NAME}-{PINECONE_ENVIRONMENT}"
     )
 
-if IMAGE_INDEX_NAME not in pinecone_client.list_indexes().names():
-    pinecone_client.create_index(
-        name=IMAGE_INDEX_NAME,
-        dimension=512,
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region='us-east-1')
+    image_index = Index(
+        api_key=PINECONE_API_KEY,
+        index_name=IMAGE_INDEX_NAME,
+        host=f"https://{IMAGE_INDEX_NAME}-{PINECONE_ENVIRONMENT}"
     )
 
-# Connect to existing Pinecone indexes using the full host URL
-text_index = Index(
-    api_key=PINECONE_API_KEY,
-    index_name=TEXT_INDEX_NAME,
-    host=f"https://{TEXT_INDEX_NAME}-{PINECONE_ENVIRONMENT}"
-)
-
-image_index = Index(
-    api_key=PINECONE_API_KEY,
-    index_name=IMAGE_INDEX_NAME,
-    host=f"https://{IMAGE_INDEX_NAME}-{PINECONE_ENVIRONMENT}"
-)
+    # Check if indexes are accessible
+    try:
+        _log.info("Connected to text index: %s", text_index.describe_index_stats())
+        _log.info("Connected to image index: %s", image_index.describe_index_stats())
+    except Exception as e:
+        _log.error(f"Failed to connect to Pinecone indexes: {e}")
 
-# Check if indexes are accessible
-try:
-    _log.info("Connected to text index: %s", text_index.describe_index_stats())
-    _log.info("Connected to image index: %s", image_index.describe_index_stats())
-except Exception as e:
-    _log.error(f"Failed to connect to Pinecone indexes: {e}")
+# Ingestion manifest: the ETag each stage last processed per S3 object, so daily runs skip unchanged documents.
+# Enabled by INGEST_MANIFEST_PATH, which every worker must see at the same absolute path.
+if INGEST_MANIFEST_PATH:
+    if not os.path.isabs(INGEST_MANIFEST_PATH):
+        raise ValueError(f"INGEST_MANIFEST_PATH must be an absolute path shared by all workers, got {INGEST_MANIFEST_PATH!r}")
+    # The manifest lives in the backend package, so backend/ must be on PYTHONPATH
+    from apis.ingest_manifest import CONVERTED, EMBEDDED, IngestManifest, fingerprint, force_reprocess
 
 # Initialize CLIP model
 clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
@@ -141,22 +161,47 @@ def split_text_into_chunks(text, chunk_size=500):
         chunks.append("\n".join(current_chunk))
     return chunks
 
+# Tell the backend to drop its cached S3 listings once this run has written to the bucket
+def notify_backend_of_s3_writes():
+    if not BACKEND_URL:
+        return
+    try:
+        response = requests.post(
+            f"{BACKEND_URL}/list-s3-files/invalidate",
+            headers={"Authorization": f"Bearer {BACKEND_ADMIN_TOKEN}"} if BACKEND_ADMIN_TOKEN else {},
+            timeout=5,
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        _log.warning(f"Could not invalidate the backend's S3 listing cache: {e}")
+
+def open_manifest():
+    """Open the ingestion manifest for one task run, or return None when it is disabled."""
+    return IngestManifest(INGEST_MANIFEST_PATH) if INGEST_MANIFEST_PATH else None
+
 # Task 1: Fetch PDFs from S3 and convert them
-def fetch_and_convert_pdfs():
+def fetch_and_convert_pdfs(**context):
     _log.info("Starting fetch_and_convert_pdfs task")
     s3_folder = "pdfs/"
     output_folder = "outputs/"
+    manifest = open_manifest()
 
     try:
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=s3_folder)
-        files = [item['Key'] for item in response.get('Contents', []) if item['Key'].endswith('.pdf')]
+        files = list_objects(BUCKET_NAME, s3_folder, suffix='.pdf')
         _log.info(f"Found {len(files)} PDF files")
 
         if not files:
             _log.info("No PDF files found in the S3 bucket.")
             return
 
-        for file_key in files:
+        # Only convert PDFs that are new or changed since their last conversion
+        pending = manifest.pending(files, CONVERTED, force=force_reprocess(context)) if manifest else files
+        _log.info(f"{len(pending)} new or changed PDFs to convert, {len(files) - len(pending)} unchanged")
+        if not pending:
+            return
+
+        for item in pending:
+            file_key = item['Key']
             _log.info(f"Processing file: {file_key}")
             pdf_filename = file_key.split('/')[-1]
             doc_name = pdf_filename.split('.')[0]
@@ -227,24 +272,45 @@ def fetch_and_convert_pdfs():
             s3_key_md = f"outputs/{doc_name}/{doc_name}.md"
             s3.upload_file(str(md_filename), BUCKET_NAME, s3_key_md)
             _log.info(f"Successfully uploaded {file_key}")
+            if manifest:
+                manifest.mark_done(file_key, fingerprint(item), CONVERTED, markdown=s3_key_md)
+
+        notify_backend_of_s3_writes()
     except Exception as e:
         _log.error(f"Error fetching PDFs from S3: {e}")
         raise
+    finally:
+        if manifest:
+            manifest.close()
 
 # Task 2: Process Markdown and store embeddings in Pinecone
-def process_and_store_embeddings():
+def process_and_store_embeddings(**context):
     folder_prefix = "outputs/"
+    manifest = open_manifest()
     try:
-        # List all subfolders inside the output folder
-        subfolders = list_subfolders(BUCKET_NAME, folder_prefix)
+        # Each output folder holds one converted document; its Markdown file's ETag identifies the version
+        md_files = list_objects(BUCKET_NAME, folder_prefix, suffix='.md')
+        pending = manifest.pending(md_files, EMBEDDED, force=force_reprocess(context)) if manifest else md_files
+        _log.info(f"{len(pending)} new or changed documents to embed, {len(md_files) - len(pending)} unchanged")
 
         # Process each folder
-        for subfolder in subfolders:
+        for item in pending:
+            subfolder = item['Key'].rsplit('/', 1)[0] + '/'
             _log.info(f"Processing folder: {subfolder}")
-            process_folder(subfolder)
+            # The ids written for the previous version, so the ones this version drops are deleted
+            previous_ids = manifest.details(item['Key'], EMBEDDED).get('ids') if manifest else None
+            ids = process_folder(subfolder, previous_ids)
+            if ids is not None and manifest:
+                manifest.mark_done(item['Key'], fingerprint(item), EMBEDDED, ids=ids)
+        build_local_ivf()
+        if manifest:
+            _log.info(f"Ingestion manifest: {manifest.stats()}")
     except Exception as e:
         _log.error(f"Error processing embeddings: {e}")
         raise
+    finally:
+        if manifest:
+            manifest.close()
 
 # Define Airflow Tasks
 task_fetch_and_convert_pdfs = PythonOperator(
@@ -14,7 +14,7 @@ from datetime import datetime
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from markdown import read_pdf_from_s3, process_pdf
-from airflow.extraction_files_embedd import process_folder, list_subfolders
+from airflow.extraction_files_embedd import process_folder, list_subfolders, list_objects, delete_vectors
 from pathlib import Path
 from dotenv import load_dotenv
 from pinecone import Pinecone, ServerlessSpec, Index
@@ -46,6 +46,12 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 COMBINED_INDEX_NAME = os.getenv("COMBINED_INDEX_NAME")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "data/indexes")
+BACKEND_URL = os.getenv("BACKEND_URL")
+BACKEND_ADMIN_TOKEN = os.getenv("BACKEND_ADMIN_TOKEN")
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH")
+SPARSE_INDEX_PATH = os.getenv("SPARSE_INDEX_PATH")
 
 # Set OpenAI API key
 openai.api_key = OPENAI_API_KEY
@@ -58,30 +64,51 @@ s3 = boto3.client(
     region_name=AWS_REGION
 )
 
-# Initialize Pinecone
-pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
-
-# Create Pinecone combined index if it does not exist
-if COMBINED_INDEX_NAME not in pinecone_client.list_indexes().names():
-    pinecone_client.create_index(
-        name=COMBINED_INDEX_NAME,
-        dimension=512,  # Adjust dimension if needed
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region="us-east-1")
+# Vector index: hosted Pinecone, or the backend's in-process LocalVectorIndex for offline runs
+if VECTOR_BACKEND == "local":
+    # The local index lives in the backend package, so backend/ must be on PYTHONPATH
+    from apis.vector_index import LocalVectorIndex
+    combined_index = LocalVectorIndex(os.path.join(LOCAL_INDEX_DIR, COMBINED_INDEX_NAME), dimension=512)
+else:
+    # Initialize Pinecone
+    pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+
+    # Create Pinecone combined index if it does not exist
+    if COMBINED_INDEX_NAME not in pinecone_client.list_indexes().names():
+        pinecone_client.create_index(
+            name=COMBINED_INDEX_NAME,
+            dimension=512,  # Adjust dimension if needed
+            metric='cosine',
+            spec=ServerlessSpec(cloud='aws', region="us-east-1")
+        )
+
+    # Connect to existing Pinecone combined index using the full host URL
+    combined_index = Index(
+        api_key=PINECONE_API_KEY,
+        index_name=COMBINED_INDEX_NAME,
+        host=f"https://{COMBINED_INDEX_NAME}{PINECONE_ENVIRONMENT}"
     )
 
-# Connect to existing Pinecone combined index using the full host URL
-combined_index = Index(
-    api_key=PINECONE_API_KEY,
-    index_name=COMBINED_INDEX_NAME,
-    host=f"https://{COMBINED_INDEX_NAME}{PINECONE_ENVIRONMENT}"
-)
-
-# Check if indexes are accessible
-try:
-    _log.info("Connected to combined index: %s", combined_index.describe_index_stats())
-except Exception as e:
-    _log.error(f"Failed to connect to Pinecone indexes: {e}")
+    # Check if indexes are accessible
+    try:
+        _log.info("Connected to combined index: %s", combined_index.describe_index_stats())
+    except Exception as e:
+        _log.error(f"Failed to connect to Pinecone indexes: {e}")
+
+# BM25 index over the text chunks, read by the backend for hybrid retrieval. Enabled by SPARSE_INDEX_PATH.
+sparse_index = None
+if SPARSE_INDEX_PATH:
+    # The BM25 index lives in the backend package, so backend/ must be on PYTHONPATH
+    from apis.sparse_index import BM25Index
+    sparse_index = BM25Index(SPARSE_INDEX_PATH)
+
+# Ingestion manifest: the ETag each stage last processed per S3 object, so daily runs skip unchanged documents.
+# Enabled by INGEST_MANIFEST_PATH, which every worker must see at the same absolute path.
+if INGEST_MANIFEST_PATH:
+    if not os.path.isabs(INGEST_MANIFEST_PATH):
+        raise ValueError(f"INGEST_MANIFEST_PATH must be an absolute path shared by all workers, got {INGEST_MANIFEST_PATH!r}")
+    # The manifest lives in the backend package, so backend/ must be on PYTHONPATH
+    from apis.ingest_manifest import CONVERTED, EMBEDDED, IngestManifest, fingerprint, force_reprocess
 
 # Initialize CLIP model
 clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
@@ -120,22 +147,47 @@ def split_text_into_chunks(text, chunk_size=500):
         chunks.append("\n".join(current_chunk))
     return chunks
 
+# Tell the backend to drop its cached S3 listings once this run has written to the bucket
+def notify_backend_of_s3_writes():
+    if not BACKEND_URL:
+        return
+    try:
+        response = requests.post(
+            f"{BACKEND_URL}/list-s3-files/invalidate",
+            headers={"Authorization": f"Bearer {BACKEND_ADMIN_TOKEN}"} if BACKEND_ADMIN_TOKEN else {},
+            timeout=5,
+        )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        _log.warning(f"Could not invalidate the backend's S3 listing cache: {e}")
+
+def open_manifest():
+    """Open the ingestion manifest for one task run, or return None when it is disabled."""
+    return IngestManifest(INGEST_MANIFEST_PATH) if INGEST_MANIFEST_PATH else None
+
 # Task 1: Fetch PDFs from S3 and convert to Markdown and images
-def fetch_and_convert_pdfs():
+def fetch_and_convert_pdfs(**context):
     _log.info("Starting fetch_and_convert_pdfs task")
     s3_folder = "pdfs/"
     output_folder = "outputs/"
+    manifest = open_manifest()
 
     try:
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=s3_folder)
-        files = [item['Key'] for item in response.get('Contents', []) if item['Key'].endswith('.pdf')]
+        files = list_objects(BUCKET_NAME, s3_folder, suffix='.pdf')
         _log.info(f"Found {len(files)} PDF files")
 
         if not files:
             _log.info("No PDF files found in the S3 bucket.")
             return
 
-        for file_key in files:
+        # Only convert PDFs that are new or changed since their last conversion
+        pending = manifest.pending(files, CONVERTED, force=force_reprocess(context)) if manifest else files
+        _log.info(f"{len(pending)} new or changed PDFs to convert, {len(files) - len(pending)} unchanged")
+        if not pending:
+            return
+
+        for item in pending:
+            file_key = item['Key']
             _log.info(f"Processing file: {file_key}")
             pdf_filename = file_key.split('/')[-1]
             doc_name = pdf_filename.split('.')[0]
@@ -206,28 +258,50 @@ def fetch_and_convert_pdfs():
             s3_key_md = f"outputs/{doc_name}/{doc_name}.md"
             s3.upload_file(str(md_filename), BUCKET_NAME, s3_key_md)
             _log.info(f"Successfully uploaded {file_key}")
+            if manifest:
+                manifest.mark_done(file_key, fingerprint(item), CONVERTED, markdown=s3_key_md)
+
+        notify_backend_of_s3_writes()
 
     except Exception as e:
         _log.error(f"Error fetching PDFs from S3: {e}")
         raise
+    finally:
+        if manifest:
+            manifest.close()
 
 # Task 2: Process Markdown and store embeddings in Pinecone
-def process_and_store_embeddings():
+def process_and_store_embeddings(**context):
     folder_prefix = "outputs/"
+    manifest = open_manifest()
     try:
         # List all objects under the 'outputs/' folder
-        response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=folder_prefix)
+        objects = list_objects(BUCKET_NAME, folder_prefix)
 
         # Extract Markdown files and image files from the response
-        md_files = [item['Key'] for item in response.get('Contents', []) if item['Key'].endswith('.md')]
-        image_files = [item['Key'] for item in response.get('Contents', []) if item['Key'].endswith('.png')]
+        md_objects = [item for item in objects if item['Key'].endswith('.md')]
+        image_objects = [item for item in objects if item['Key'].endswith('.png')]
 
-        if not md_files and not image_files:
+        if not md_objects and not image_objects:
             _log.info("No Markdown or image files found in the S3 bucket.")
             return
 
+        # Only embed files that are new or changed since they were last embedded
+        if manifest:
+            force = force_reprocess(context)
+            pending_md = manifest.pending(md_objects, EMBEDDED, force=force)
+            pending_images = {item['Key'] for item in manifest.pending(image_objects, EMBEDDED, force=force)}
+        else:
+            pending_md = md_objects
+            pending_images = {item['Key'] for item in image_objects}
+        _log.info(
+            f"{len(pending_md)} of {len(md_objects)} Markdown files and "
+            f"{len(pending_images)} of {len(image_objects)} images are new or changed"
+        )
+
         # Process each Markdown file
-        for md_file in md_files:
+        for md_object in pending_md:
+            md_file = md_object['Key']
             _log.info(f"Processing Markdown file: {md_file}")
 
             try:
@@ -240,6 +314,13 @@ def process_and_store_embeddings():
 
             # Split text into chunks and create embeddings using CLIP
             text_chunks = split_text_into_chunks(markdown_content)
+
+            # Index the chunks for BM25 under the same ids as their vectors
+            if sparse_index is not None:
+                sparse_index.add([
+                    (f"{md_file}-text-{idx}", chunk, {'type': 'text', 'content': chunk, 'file_name': md_file})
+                    for idx, chunk in enumerate(text_chunks)
+                ])
             for idx, chunk in enumerate(text_chunks):
                 inputs = clip_processor(text=[chunk], return_tensors="pt", truncation=True)
                 text_features = clip_model.get_text_features(**inputs).detach().numpy()
@@ -258,8 +339,22 @@ def process_and_store_embeddings():
                     }
                 }])
 
-        # Process each image file
-        for idx, image_file in enumerate(image_files):
+            # A shorter new version leaves the previous version's trailing chunks behind; delete them
+            if manifest:
+                previous_chunks = manifest.details(md_file, EMBEDDED).get('chunks', 0)
+                stale_ids = [f"{md_file}-text-{idx}" for idx in range(len(text_chunks), previous_chunks)]
+                if stale_ids:
+                    delete_vectors(stale_ids, combined_index)
+                    if sparse_index is not None:
+                        sparse_index.delete(stale_ids)
+                    _log.info(f"Deleted {len(stale_ids)} stale chunks of {md_file}")
+                manifest.mark_done(md_file, fingerprint(md_object), EMBEDDED, chunks=len(text_chunks))
+
+        # Process each image file; ids follow the listing position, so a re-embedded image may get a new one
+        for idx, image_object in enumerate(image_objects):
+            image_file = image_object['Key']
+            if image_file not in pending_images:
+                continue
             _log.info(f"Processing image file: {image_file}")
 
             try:
@@ -284,6 +379,12 @@ def process_and_store_embeddings():
                         'source': construct_s3_url(BUCKET_NAME, AWS_REGION, image_file)
                     }
                 }])
+                if manifest:
+                    # Delete the vector stored under the image's previous id, if it has moved
+                    previous_id = manifest.details(image_file, EMBEDDED).get('id')
+                    if previous_id and previous_id != image_vector_id:
+                        combined_index.delete(ids=[previous_id])
+                    manifest.mark_done(image_file, fingerprint(image_object), EMBEDDED, id=image_vector_id)
 
             except s3.exceptions.NoSuchKey:
                 _log.error(f"No such key found in S3 bucket for image: '{image_file}'")
@@ -293,9 +394,19 @@ def process_and_store_embeddings():
                 _log.error(f"Error processing image file '{image_file}': {e}")
                 continue
 
+        # Train the local index's IVF here, once per batch, so the API server loads it on refresh
+        if VECTOR_BACKEND == "local":
+            combined_index.ensure_ivf()
+
+        if manifest:
+            _log.info(f"Ingestion manifest: {manifest.stats()}")
+
     except Exception as e:
         _log.error(f"Error processing embeddings: {e}")
         raise
+    finally:
+        if manifest:
+            manifest.close()
 
 # Define Airflow Tasks
 task_fetch_and_convert_pdfs = PythonOperator(
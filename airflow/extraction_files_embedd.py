@@ -29,6 +29,9 @@ PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 TEXT_INDEX_NAME = os.getenv("TEXT_INDEX_NAME")
 IMAGE_INDEX_NAME = os.getenv("IMAGE_INDEX_NAME")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "data/indexes")
+SPARSE_INDEX_PATH = os.getenv("SPARSE_INDEX_PATH")
 
 # Set OpenAI API key
 openai.api_key = OPENAI_API_KEY
@@ -41,49 +44,62 @@ s3 = boto3.client(
     region_name=AWS_REGION
 )
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
+# Vector indexes: hosted Pinecone, or the backend's in-process LocalVectorIndex for offline runs
+if VECTOR_BACKEND == "local":
+    # The local index lives in the backend package, so backend/ must be on PYTHONPATH
+    from apis.vector_index import LocalVectorIndex
+    text_index = LocalVectorIndex(os.path.join(LOCAL_INDEX_DIR, TEXT_INDEX_NAME), dimension=1536)
+    image_index = LocalVectorIndex(os.path.join(LOCAL_INDEX_DIR, IMAGE_INDEX_NAME), dimension=512)
+else:
+    # Initialize Pinecone
+    pc = Pinecone(api_key=PINECONE_API_KEY)
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
+    # Initialize Pinecone
+    pc = Pinecone(api_key=PINECONE_API_KEY)
 
-# Create Pinecone indexes if they do not exist
-if TEXT_INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=TEXT_INDEX_NAME,
-        dimension=1536,
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region="us-east-1")
-    )
+    # Create Pinecone indexes if they do not exist
+    if TEXT_INDEX_NAME not in pc.list_indexes().names():
+        pc.create_index(
+            name=TEXT_INDEX_NAME,
+            dimension=1536,
+            metric='cosine',
+            spec=ServerlessSpec(cloud='aws', region="us-east-1")
+        )
 
-if IMAGE_INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=IMAGE_INDEX_NAME,
-        dimension=512,
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region='us-east-1')
-    )
+    if IMAGE_INDEX_NAME not in pc.list_indexes().names():
+        pc.create_index(
+            name=IMAGE_INDEX_NAME,
+            dimension=512,
+            metric='cosine',
+            spec=ServerlessSpec(cloud='aws', region='us-east-1')
+        )
 
-# Connect to existing Pinecone indexes using the specified environment and index names
-text_index = Index(
-    api_key=PINECONE_API_KEY,
-    index_name=TEXT_INDEX_NAME,
-    host=f"https://{TEXT_INDEX_NAME}{PINECONE_ENVIRONMENT}"
-)
+    # Connect to existing Pinecone indexes using the specified environment and index names
+    text_index = Index(
+        api_key=PINECONE_API_KEY,
+        index_name=TEXT_INDEX_NAME,
+        host=f"https://{TEXT_INDEX_NAME}{PINECONE_ENVIRONMENT}"
+    )
 
-image_index = Index(
-    api_key=PINECONE_API_KEY,
-    index_name=IMAGE_INDEX_NAME,
-    host=f"https://{IMAGE_INDEX_NAME}{PINECONE_ENVIRONMENT}"
-)
+    image_index = Index(
+        api_key=PINECONE_API_KEY,
+        index_name=IMAGE_INDEX_NAME,
+        host=f"https://{IMAGE_INDEX_NAME}{PINECONE_ENVIRONMENT}"
+    )
 
-# Check if indexes are accessible
-try:
-    _log.info("Connected to text index: %s", text_index.describe_index_stats())
-    _log.info("Connected to image index: %s", image_index.describe_index_stats())
-except Exception as e:
-    _log.error(f"Failed to connect to Pinecone indexes: {e}")
+    # Check if indexes are accessible
+    try:
+        _log.info("Connected to text index: %s", text_index.describe_index_stats())
+        _log.info("Connected to image index: %s", image_index.describe_index_stats())
+    except Exception as e:
+        _log.error(f"Failed to connect to Pinecone indexes: {e}")
 
+# BM25 index over the text chunks, read by the backend for hybrid retrieval. Enabled by SPARSE_INDEX_PATH.
+sparse_index = None
+if SPARSE_INDEX_PATH:
+    # The BM25 index lives in the backend package, so backend/ must be on PYTHONPATH
+    from apis.sparse_index import BM25Index
+    sparse_index = BM25Index(SPARSE_INDEX_PATH)
 
 # Initialize CLIP model
 clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
@@ -186,7 +202,8 @@ def process_markdown_content(md_content, folder_prefix, file_name):
     return text_embeddings, image_embeddings
 
 def upload_to_pinecone(embeddings, index, batch_size=10):
-    """Upload embeddings to Pinecone with metadata in batches."""
+    """Upload embeddings to Pinecone with metadata in batches. Returns the number of failed batches."""
+    failed = 0
     for i in range(0, len(embeddings), batch_size):
         batch = embeddings[i:i + batch_size]
         try:
@@ -198,6 +215,8 @@ def upload_to_pinecone(embeddings, index, batch_size=10):
             _log.info(f"Uploaded batch {i // batch_size + 1} to Pinecone.")
         except Exception as e:
             _log.error(f"Failed to upload batch {i // batch_size + 1}: {e}")
+            failed += 1
+    return failed
 
 def upload_to_pinecone_with_retry(embeddings, index, batch_size=10, max_retries=3):
     """Upload embeddings with retry logic."""
@@ -225,25 +244,83 @@ def list_subfolders(bucket, prefix):
     response = s3.list_objects_v2(Bucket=bucket, Prefix=prefix, Delimiter='/')
     subfolders = [item['Prefix'] for item in response.get('CommonPrefixes', [])]
     return subfolders
+
+def list_objects(bucket, prefix, suffix=""):
+    """List every object under a prefix, following continuation tokens past the 1000-key page limit."""
+    paginator = s3.get_paginator('list_objects_v2')
+    return [
+        item for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+        for item in page.get('Contents', []) if item['Key'].endswith(suffix)
+    ]
     
 
-def process_folder(folder_prefix):
-    """Process a single folder."""
+def delete_vectors(ids, index, batch_size=1000):
+    """Delete vectors by id in batches, within Pinecone's per-request id limit."""
+    for i in range(0, len(ids), batch_size):
+        index.delete(ids=ids[i:i + batch_size])
+
+def build_local_ivf():
+    """
+    Train the IVF index of local vector indexes that have grown large enough, once per batch, so
+    the API server loads it on refresh instead of training it inside a search.
+    """
+    if VECTOR_BACKEND != "local":
+        return
+    for index in (text_index, image_index):
+        index.ensure_ivf()
+
+def process_folder(folder_prefix, previous_ids=None):
+    """
+    Process a single folder. Vectors in previous_ids (the ids returned for the document's last
+    version) that this version no longer produces are deleted.
+
+    Returns the ids written, {"text": [...], "image": [...]}, or None if anything failed.
+    """
     response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=folder_prefix)
     md_file_key = next((item['Key'] for item in response.get('Contents', []) if item['Key'].endswith('.md')), None)
     
     if not md_file_key:
         _log.warning(f"No Markdown file found in {folder_prefix}")
-        return
+        return None
 
     md_content = read_markdown_from_s3(BUCKET_NAME, md_file_key)
+    if md_content is None:
+        return None
     folder_name = folder_prefix.split('/')[-2]
     text_embeddings, image_embeddings = process_markdown_content(md_content, folder_prefix, folder_name)
 
+    failed = 0
     if text_embeddings:
-        upload_to_pinecone(text_embeddings, text_index)
+        failed += upload_to_pinecone(text_embeddings, text_index)
+        if sparse_index is not None:
+            sparse_index.add([
+                (entry["id"], entry["metadata"]["content"], entry["metadata"]) for entry in text_embeddings
+            ])
     if image_embeddings:
-        upload_to_pinecone(image_embeddings, image_index)
+        failed += upload_to_pinecone(image_embeddings, image_index)
+
+    # Remove the chunks and images the previous version had but this one no longer produces
+    ids = {
+        "text": [entry["id"] for entry in text_embeddings],
+        "image": [entry["id"] for entry in image_embeddings],
+    }
+    previous_ids = previous_ids or {}
+    stale_text = sorted(set(previous_ids.get("text", [])) - set(ids["text"]))
+    stale_images = sorted(set(previous_ids.get("image", [])) - set(ids["image"]))
+    try:
+        if stale_text:
+            delete_vectors(stale_text, text_index)
+            if sparse_index is not None:
+                sparse_index.delete(stale_text)
+        if stale_images:
+            delete_vectors(stale_images, image_index)
+    except Exception as e:
+        _log.error(f"Failed to delete stale vectors for {folder_prefix}: {e}")
+        return None
+    if stale_text or stale_images:
+        _log.info(f"Deleted {len(stale_text)} stale text and {len(stale_images)} stale image vectors for {folder_prefix}")
+
+    return ids if failed == 0 else None
 
 
 def main():
@@ -257,6 +334,7 @@ def main():
     for subfolder in subfolders:
         _log.info(f"Processing folder: {subfolder}")
         process_folder(subfolder)
+    build_local_ivf()
 
 if __name__ == "__main__":
     main()
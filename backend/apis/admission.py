@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from collections import deque
+
+from apis import metrics
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+
+# Endpoint -> the upstream dependency whose limits it shares. Endpoints on the same slow
+# upstream compete for the same slots, so a slow NVIDIA cannot pile up /rag-search and
+# /rag-search/stream requests separately.
+ROUTE_GROUPS = {
+    "/rag-search": "nvidia",
+    "/rag-search/stream": "nvidia",
+    "/smart-query": "openai",
+    "/copilotkit_remote": "arxiv",
+    "/copilotkit_remote/stream": "arxiv",
+    "/copilotkit_remote/deep": "arxiv",
+    "/web-search": "tavily",
+    "/batch-search": "batch",
+}
+
+# Group -> (max concurrent requests, max queued requests, seconds a request may wait in the queue)
+DEFAULT_LIMITS = {
+    "nvidia": (16, 32, 5.0),
+    "openai": (32, 64, 5.0),
+    "arxiv": (16, 32, 5.0),
+    "tavily": (32, 64, 5.0),
+    "batch": (4, 8, 10.0),
+}
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is shed. `status` is 429 when the queue is full and 503 when the
+    request waited past the queue deadline.
+    """
+
+    def __init__(self, group: str, status: int, reason: str, retry_after: int):
+        super().__init__(f"{group} is overloaded: {reason}")
+        self.group = group
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Bounds the requests in flight for one group, with a FIFO wait queue of bounded length and a
+    deadline on time spent queued. Beyond either bound requests fail fast instead of piling up.
+
+    Slots are handed directly to the next waiter on release, so a burst cannot overtake the queue.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.service_time = 0.0  # Moving average of how long a request holds its slot
+        self._waiters = deque()
+        self._queue_depth = metrics.ADMISSION_QUEUED.labels(group=name)
+        self._shed = {
+            "queue_full": metrics.ADMISSION_SHED.labels(group=name, reason="queue_full"),
+            "deadline": metrics.ADMISSION_SHED.labels(group=name, reason="deadline"),
+        }
+
+    @classmethod
+    def from_env(cls, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            name,
+            max_concurrent=int(os.getenv(prefix + "CONCURRENCY", max_concurrent)),
+            max_queue=int(os.getenv(prefix + "QUEUE", max_queue)),
+            queue_timeout=float(os.getenv(prefix + "QUEUE_TIMEOUT", queue_timeout)),
+        )
+
+    def retry_after(self) -> int:
+        # Roughly how long until the queue ahead drains, at least one second
+        backlog = (len(self._waiters) + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(self.service_time * backlog))
+
+    async def acquire(self):
+        """
+        Waits for a slot.
+
+        Raises:
+            Overloaded: If the queue is full (429) or the queue deadline passes (503).
+        """
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            self._shed["queue_full"].inc()
+            raise Overloaded(self.name, 429, "queue full", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self._queue_depth.inc()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # On Python 3.12+ the deadline can win even though release() already handed this
+            # waiter the slot in the same loop iteration; keep the slot rather than leak it
+            if not (future.done() and not future.cancelled()):
+                self.shed_deadline += 1
+                self._shed["deadline"].inc()
+                raise Overloaded(self.name, 503, f"queued over {self.queue_timeout:g}s", self.retry_after())
+        except BaseException:
+            # Cancelled after the slot was handed over: pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self._queue_depth.dec()
+            try:
+                self._waiters.remove(future)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self, held: float = None):
+        if held is not None:
+            self.service_time = held if not self.service_time else 0.9 * self.service_time + 0.1 * held
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)  # The slot passes straight to this waiter
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_deadline": self.shed_deadline,
+            "service_time": self.service_time,
+        }
+
+
+limiters = {group: AdmissionLimiter.from_env(group, *limits) for group, limits in DEFAULT_LIMITS.items()}
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the group limiter of each limited endpoint before the request body
+    is read. A shed request gets 429 or 503 with a Retry-After header and a JSON error, in
+    microseconds, while admitted requests hold their slot until the response is fully sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        group = ROUTE_GROUPS.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        limiter = limiters.get(group) if group and ADMISSION_ENABLED else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            logger.warning(f"Shed {scope['path']}: {e}")
+            await shed_response(send, e)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - start)
+
+
+async def shed_response(send, error: Overloaded):
+    body = json.dumps({"error": str(error), "retry_after": error.retry_after}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": error.status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(error.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
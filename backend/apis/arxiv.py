@@ -1,20 +1,345 @@
-import requests
-import xmltodict
+import asyncio
+import json
+import httpx
+from xml.etree.ElementTree import XMLPullParser
 from langchain_core.tools import tool
-from openai import OpenAI
 import logging
 import os
+import time
+from apis.arxiv_mirror import ArxivMirror, feed_record
+from apis.summary_store import SummaryStore
+from apis.resources import lazy
+from apis import upstreams
+from apis import metrics
+from apis.tool_cache import cached_tool
 
 logger = logging.getLogger(__name__)
 
-# Load OpenAI API key
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Shared OpenAI client from the upstream registry; built on first use
+client = upstreams.openai_client
 
 ARXIV_API_URL = "http://export.arxiv.org/api/query"
 
+# Pooled keep-alive client, so Arxiv requests reuse connections and never block the event loop
+http_client = upstreams.http_clients["arxiv"]
+
+# Results per request for search_arxiv, and the page size and pause between pages for deep,
+# paginated searches (the Arxiv API asks for 3 seconds between consecutive calls)
+ARXIV_MAX_RESULTS = int(os.getenv("ARXIV_MAX_RESULTS", "5"))
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "200"))
+ARXIV_PAGE_DELAY = float(os.getenv("ARXIV_PAGE_DELAY", "3"))
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+
+# Summarization settings: "concurrent" sends one completion per abstract in parallel,
+# "batch" summarizes every abstract in a single completion
+SUMMARY_MODE = os.getenv("ARXIV_SUMMARY_MODE", "concurrent")
+SUMMARY_CONCURRENCY = int(os.getenv("ARXIV_SUMMARY_CONCURRENCY", "8"))
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_UNAVAILABLE = "Summary not available due to an error."
+
+# Durable per-paper summary store, keyed by Arxiv entry id and abstract hash
+summary_store = lazy("arxiv.summary_store", lambda: SummaryStore(
+    os.getenv("ARXIV_SUMMARY_STORE", "data/arxiv_summaries.db"),
+    max_entries=int(os.getenv("ARXIV_SUMMARY_STORE_MAX_ENTRIES", "50000")),
+    memory_entries=int(os.getenv("ARXIV_SUMMARY_STORE_MEMORY_ENTRIES", "1024")),
+))
+
+# Local metadata mirror answering searches before the Arxiv API; enabled by ARXIV_MIRROR_PATH.
+# A mirror not loaded for ARXIV_MIRROR_MAX_AGE_HOURS is stale and only the API is used (0: never stale).
+ARXIV_MIRROR_PATH = os.getenv("ARXIV_MIRROR_PATH")
+ARXIV_MIRROR_MAX_AGE = float(os.getenv("ARXIV_MIRROR_MAX_AGE_HOURS", "48")) * 3600
+mirror = lazy("arxiv.mirror", lambda: ArxivMirror(ARXIV_MIRROR_PATH) if ARXIV_MIRROR_PATH else None, required=False)
+
+class ArxivUnavailable(Exception):
+    """
+    Raised when the Arxiv API answers with an error status.
+    """
+
+def search_params(query: str, start: int = 0, max_results: int = None) -> dict:
+    """
+    Builds the Arxiv API query parameters for one page of results.
+    """
+    return {
+        "search_query": f"all:{query}",
+        "start": start,
+        "max_results": ARXIV_MAX_RESULTS if max_results is None else max_results,
+        "sortBy": "relevance",
+        "sortOrder": "descending"
+    }
+
+async def fetch_feed(query: str, start: int = 0, max_results: int = None) -> httpx.Response:
+    """
+    Sends the search request to the Arxiv API.
+
+    Args:
+        query (str): The search term or topic to look up.
+        start (int): Offset of the first result.
+        max_results (int): Results to return. Defaults to ARXIV_MAX_RESULTS.
+
+    Returns:
+        httpx.Response: The raw Atom feed response.
+    """
+    # Send request to Arxiv API
+    with metrics.ARXIV_FETCH.time():
+        response = await http_client.get().get(ARXIV_API_URL, params=search_params(query, start, max_results))
+    if response.status_code != 200:
+        metrics.ARXIV_FETCH.error()
+    return response
+
+class FeedParser:
+    """
+    Incremental Arxiv Atom feed parser.
+
+    Feed it the response body chunk by chunk; each call returns the entries completed so far as
+    compact records. Parsed entries are dropped from the tree straight away, so memory stays flat
+    however many entries the feed holds.
+
+        parser = FeedParser()
+        async for chunk in response.aiter_bytes():
+            for record in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self):
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._root = None
+        self.total_results = None
+        self.entries = 0
+
+    def feed(self, chunk) -> list:
+        self._parser.feed(chunk)
+        return self._records()
+
+    def close(self) -> list:
+        self._parser.close()
+        return self._records()
+
+    def _records(self) -> list:
+        records = []
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root is None:
+                    self._root = element
+                continue
+            if element.tag == OPENSEARCH + "totalResults":
+                self.total_results = int(element.text or 0)
+            elif element.tag == ATOM + "entry":
+                record = entry_record(element)
+                # Only direct children of the feed are entries; free them once read
+                self._root.remove(element)
+                if "/api/errors" in record["link"]:
+                    raise ValueError(f"Arxiv rejected the query: {record['abstract']}")
+                self.entries += 1
+                records.append(record)
+        return records
+
+def entry_record(entry) -> dict:
+    """
+    Turns one parsed Atom <entry> element into a compact paper record.
+    """
+    def text(tag):
+        return " ".join((entry.findtext(ATOM + tag) or "").split())
+
+    return {
+        "title": text("title"),
+        "authors": [author.findtext(ATOM + "name", "") for author in entry.iterfind(ATOM + "author")],
+        "published": text("published"),
+        "updated": text("updated"),
+        "link": text("id"),
+        "pdf_url": next(
+            (link.get("href", "") for link in entry.iterfind(ATOM + "link") if link.get("title") == "pdf"), None
+        ),
+        "abstract": text("summary"),
+    }
+
+def parse_papers(feed) -> tuple:
+    """
+    Parses an Arxiv Atom feed into paper records.
+
+    Args:
+        feed (str | bytes): The Atom feed XML.
+
+    Returns:
+        tuple: (papers, abstracts), where each paper's "summary" is still empty and
+            abstracts holds the matching full abstract texts.
+    """
+    parser = FeedParser()
+    return split_records(parser.feed(feed) + parser.close())
+
+def split_records(records: list) -> tuple:
+    """
+    Splits compact paper records into (papers, abstracts), as returned by parse_papers.
+    """
+    papers = []
+    abstracts = []
+
+    for record in records:
+        # Keep the full overview so every abstract can be summarized together
+        abstracts.append(record["abstract"])
+        papers.append({
+            "title": record["title"],
+            "summary": None,
+            "authors": record["authors"],
+            "published": record["published"],
+            "updated": record.get("updated") or record["published"],
+            "link": record["link"],
+            "pdf_url": record["pdf_url"],
+        })
+
+    return papers, abstracts
+
+async def search_mirror(query: str, limit: int):
+    """
+    Answers a search from the local mirror.
+
+    Returns:
+        tuple: (papers, abstracts) as from parse_papers, or None when the mirror is disabled,
+            stale, or has fewer than `limit` matches; the caller then asks the Arxiv API.
+    """
+    store = await mirror.aget()
+    if store is None:
+        return None
+    if ARXIV_MIRROR_MAX_AGE and time.time() - store.loaded_at() > ARXIV_MIRROR_MAX_AGE:
+        return None
+
+    with metrics.ARXIV_MIRROR.time():
+        records = await asyncio.to_thread(store.search, query, limit)
+    if len(records) < limit:
+        return None
+    return split_records(records)
+
+async def find_papers(query: str) -> tuple:
+    """
+    Finds papers for a query in the local mirror, falling back to the Arxiv API for misses.
+    Papers fetched from the API are added to the mirror, so it also picks up fresh papers.
+
+    Returns:
+        tuple: (papers, abstracts) as from parse_papers.
+
+    Raises:
+        ArxivUnavailable: If the mirror cannot answer and the API fails.
+    """
+    found = await search_mirror(query, ARXIV_MAX_RESULTS)
+    if found is not None:
+        return found
+
+    response = await fetch_feed(query)
+    if response.status_code != 200:
+        raise ArxivUnavailable(f"Failed to fetch data from Arxiv. Status code: {response.status_code}")
+    papers, abstracts = parse_papers(response.text)
+
+    store = await mirror.aget()
+    if store is not None and papers:
+        try:
+            await asyncio.to_thread(store.upsert, [feed_record(paper, abstract) for paper, abstract in zip(papers, abstracts)])
+        except Exception as e:
+            logger.warning(f"Could not add Arxiv results to the mirror: {e}")
+    return papers, abstracts
+
+async def fetch_pages(query: str, max_results: int, page_size: int = None, start: int = 0):
+    """
+    Pages through the Arxiv results for a query with start/max_results, streaming each page
+    and parsing it as it arrives. Only one page's unparsed bytes are ever held.
+
+    Args:
+        query (str): The search term or topic to look up.
+        max_results (int): Total results wanted.
+        page_size (int): Results per request. Defaults to ARXIV_PAGE_SIZE.
+        start (int): Offset of the first result.
+
+    Yields:
+        dict: Compact paper records with title, authors, published, link, pdf_url and abstract.
+
+    Raises:
+        httpx.HTTPStatusError: If Arxiv answers a page with an error status.
+    """
+    page_size = page_size or ARXIV_PAGE_SIZE
+    client = await http_client.aget()
+    fetched = 0
+
+    while fetched < max_results:
+        size = min(page_size, max_results - fetched)
+        request = client.build_request("GET", ARXIV_API_URL, params=search_params(query, start + fetched, size))
+        with metrics.ARXIV_FETCH.time():
+            response = await client.send(request, stream=True)
+
+        parser = FeedParser()
+        try:
+            if response.status_code != 200:
+                metrics.ARXIV_FETCH.error()
+                await response.aread()
+                response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                for record in parser.feed(chunk):
+                    yield record
+            for record in parser.close():
+                yield record
+        finally:
+            await response.aclose()
+
+        fetched += parser.entries
+        total = parser.total_results if parser.total_results is not None else start + fetched
+        # A short page means the results ran out
+        if parser.entries < size or start + fetched >= total:
+            return
+        await asyncio.sleep(ARXIV_PAGE_DELAY)
+
+async def search_arxiv_pages(query: str, max_results: int, summarize: bool = False, page_size: int = None):
+    """
+    Deep search over Arxiv: yields up to max_results papers, fetched page by page.
+
+    Without summarize, papers carry their abstract and no LLM is called. With it, papers are
+    summarized in windows of SUMMARY_CONCURRENCY (reusing stored summaries), so only one window
+    is held back at a time.
+
+    Args:
+        query (str): The search term or topic to look up.
+        max_results (int): Total results wanted.
+        summarize (bool): Add an LLM "summary" to each paper.
+        page_size (int): Results per Arxiv request. Defaults to ARXIV_PAGE_SIZE.
+
+    Yields:
+        dict: Either {"paper": ...} or {"error": ...}.
+    """
+    window = []
+
+    async def summarized(papers):
+        summaries = await summarize_entries([paper["link"] for paper in papers], [paper["abstract"] for paper in papers])
+        for paper, summary in zip(papers, summaries):
+            paper["summary"] = summary
+        return papers
+
+    try:
+        async for record in fetch_pages(query, max_results, page_size):
+            if not summarize:
+                yield {"paper": record}
+                continue
+            window.append(record)
+            if len(window) >= SUMMARY_CONCURRENCY:
+                for paper in await summarized(window):
+                    yield {"paper": paper}
+                window = []
+        if window:
+            for paper in await summarized(window):
+                yield {"paper": paper}
+
+    except Exception as e:
+        logger.error(f"Error in search_arxiv_pages: {str(e)}")
+        yield {"error": f"An error occurred while searching: {str(e)}"}
+
+def summaries_complete(result: dict) -> bool:
+    """
+    Whether every paper in a search_arxiv result got its summary. Failed summaries are not stored,
+    so they are retried; caching the result would serve the failure for the whole TTL instead.
+    """
+    return all(paper.get("summary") != SUMMARY_UNAVAILABLE for paper in result.get("results", []))
+
 @tool("search_arxiv")
-def search_arxiv(query: str) -> dict:
+@cached_tool("arxiv", ttl=float(os.getenv("TOOL_CACHE_TTL_ARXIV", "3600")), cacheable=summaries_complete)
+async def search_arxiv(query: str) -> dict:
     """
     Searches for research papers on Arxiv based on the provided query and summarizes the results.
     
@@ -25,58 +350,15 @@ def search_arxiv(query: str) -> dict:
         dict: A dictionary containing either the summarized search results or an error message.
     """
     try:
-        # Configure the search parameters
-        params = {
-            "search_query": f"all:{query}",
-            "start": 0,
-            "max_results": 5,
-            "sortBy": "relevance",
-            "sortOrder": "descending"
-        }
-
-        # Send request to Arxiv API
-        response = requests.get(ARXIV_API_URL, params=params)
-        
-        if response.status_code != 200:
-            return {"error": f"Failed to fetch data from Arxiv. Status code: {response.status_code}"}
-
-        # Parse the XML response
-        data = xmltodict.parse(response.text)
-        
-        # Check if we have any entries
-        entries = data.get('feed', {}).get('entry', [])
-        
-        # If there's only one entry, wrap it in a list
-        if isinstance(entries, dict):
-            entries = [entries]
-            
-        results = []
-        
-        for entry in entries:
-            # Handle authors - could be single author or list
-            authors = entry.get('author', [])
-            if isinstance(authors, dict):
-                authors = [authors]
-            
-            author_names = [author.get('name', '') for author in authors]
-            
-            # Summarize the paper's overview using OpenAI GPT
-            full_summary = entry.get('summary', '').replace('\n', ' ').strip()
-            summarized_text = summarize_text(full_summary)
-
-            # Extract other paper details
-            paper = {
-                "title": entry.get('title', '').replace('\n', ' ').strip(),
-                "summary": summarized_text,
-                "authors": author_names,
-                "published": entry.get('published', ''),
-                "link": entry.get('id', ''),
-                "pdf_url": next((link.get('@href', '') 
-                               for link in entry.get('link', []) 
-                               if isinstance(link, dict) and link.get('@title') == 'pdf'), 
-                              None)
-            }
-            results.append(paper)
+        try:
+            results, abstracts = await find_papers(query)
+        except ArxivUnavailable as e:
+            return {"error": str(e)}
+
+        # Summarize the papers' overviews using OpenAI GPT, reusing stored summaries
+        summaries = await summarize_entries([paper["link"] for paper in results], abstracts)
+        for paper, summarized_text in zip(results, summaries):
+            paper["summary"] = summarized_text
             
         if not results:
             return {"message": "No papers found matching your query."}
@@ -87,7 +369,59 @@ def search_arxiv(query: str) -> dict:
         logger.error(f"Error in search_arxiv: {str(e)}")
         return {"error": f"An error occurred while searching: {str(e)}"}
 
-def summarize_text(text: str) -> str:
+async def search_arxiv_stream(query: str):
+    """
+    Streaming variant of search_arxiv that yields each paper as soon as its summary is ready.
+
+    Stored summaries are yielded first; the rest are summarized concurrently (never batched,
+    since a batch would hold every paper back until the slowest one is done).
+
+    Args:
+        query (str): The search term or topic to look up.
+
+    Yields:
+        dict: Either {"paper": ...}, {"message": ...} or {"error": ...}.
+    """
+    try:
+        try:
+            papers, abstracts = await find_papers(query)
+        except ArxivUnavailable as e:
+            yield {"error": str(e)}
+            return
+
+        if not papers:
+            yield {"message": "No papers found matching your query."}
+            return
+
+        items = [(paper["link"], abstract) for paper, abstract in zip(papers, abstracts)]
+        store = await summary_store.aget()
+        cached = await asyncio.to_thread(store.get_many, items)
+
+        missing = []
+        for paper, abstract, summary in zip(papers, abstracts, cached):
+            if summary is None:
+                missing.append((paper, abstract))
+            else:
+                paper["summary"] = summary
+                yield {"paper": paper}
+
+        semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+        async def summarize_paper(paper, abstract):
+            async with semaphore:
+                paper["summary"] = await summarize_text(abstract)
+            if paper["summary"] != SUMMARY_UNAVAILABLE:
+                await asyncio.to_thread(store.put_many, [(paper["link"], abstract, paper["summary"])])
+            return paper
+
+        for next_done in asyncio.as_completed([summarize_paper(paper, abstract) for paper, abstract in missing]):
+            yield {"paper": await next_done}
+
+    except Exception as e:
+        logger.error(f"Error in search_arxiv_stream: {str(e)}")
+        yield {"error": f"An error occurred while searching: {str(e)}"}
+
+async def summarize_text(text: str) -> str:
     """
     Summarizes the text using OpenAI's GPT API with the preferred method.
     
@@ -98,12 +432,107 @@ def summarize_text(text: str) -> str:
         str: A summarized version of the text.
     """
     try:
-        completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": f"Summarize the following text to 40-80 words:\n{text}"}]
-        )
+        with metrics.SUMMARIZATION.time():
+            completion = await client.get().chat.completions.create(
+                model=SUMMARY_MODEL,
+                messages=[{"role": "user", "content": f"Summarize the following text to 40-80 words:\n{text}"}]
+            )
         return completion.choices[0].message.content
     except Exception as e:
         logger.error(f"Error in summarize_text: {str(e)}")
-        return "Summary not available due to an error."
+        return SUMMARY_UNAVAILABLE
+
+async def summarize_entries(entry_ids: list, abstracts: list) -> list:
+    """
+    Summarizes papers, looking each one up in the summary store before calling the LLM.
+
+    Args:
+        entry_ids (list): The Arxiv entry ids, one per paper.
+        abstracts (list): The full abstract texts, one per paper.
+
+    Returns:
+        list: One summary per paper, in the same order.
+    """
+    items = list(zip(entry_ids, abstracts))
+    store = await summary_store.aget()
+    summaries = await asyncio.to_thread(store.get_many, items)
+
+    missing = [idx for idx, summary in enumerate(summaries) if summary is None]
+    if missing:
+        fresh = await summarize_abstracts([abstracts[idx] for idx in missing])
+        for idx, summary in zip(missing, fresh):
+            summaries[idx] = summary
+
+        # Only keep real summaries so failed calls are retried next time
+        await asyncio.to_thread(store.put_many, [
+            (entry_ids[idx], abstracts[idx], summaries[idx])
+            for idx in missing if summaries[idx] != SUMMARY_UNAVAILABLE
+        ])
+
+    logger.info(f"Summary store: {len(items) - len(missing)} hits, {len(missing)} misses")
+    return summaries
+
+async def summarize_abstracts(abstracts: list, mode: str = None) -> list:
+    """
+    Summarizes several abstracts so the total latency is close to that of a single LLM call.
+
+    Args:
+        abstracts (list): The full abstract texts, one per paper.
+        mode (str): "concurrent" or "batch". Defaults to SUMMARY_MODE.
+
+    Returns:
+        list: One summary per abstract, in the same order.
+    """
+    if not abstracts:
+        return []
+
+    if (mode or SUMMARY_MODE) == "batch" and len(abstracts) > 1:
+        summaries = await summarize_batch(abstracts)
+        if summaries is not None:
+            return summaries
+        logger.warning("Batched summarization failed, falling back to concurrent summaries.")
+
+    # Bound the fan-out so large result sets do not flood the OpenAI API
+    semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+    async def bounded_summary(text):
+        async with semaphore:
+            return await summarize_text(text)
+
+    return await asyncio.gather(*(bounded_summary(text) for text in abstracts))
+
+async def summarize_batch(abstracts: list):
+    """
+    Summarizes every abstract in one completion and splits the result back per paper.
+
+    Args:
+        abstracts (list): The full abstract texts, one per paper.
+
+    Returns:
+        list: One summary per abstract, or None if the response could not be split.
+    """
+    numbered = "\n\n".join(f"[{idx}] {text}" for idx, text in enumerate(abstracts))
+    try:
+        with metrics.SUMMARIZATION.time():
+            completion = await client.get().chat.completions.create(
+                model=SUMMARY_MODEL,
+                response_format={"type": "json_object"},
+                messages=[{
+                    "role": "user",
+                    "content": (
+                        "Summarize each of the following numbered texts to 40-80 words. "
+                        'Reply with a JSON object of the form {"summaries": ["...", "..."]} '
+                        f"containing exactly {len(abstracts)} summaries in the same order.\n\n{numbered}"
+                    )
+                }]
+            )
+        summaries = json.loads(completion.choices[0].message.content).get("summaries")
+    except Exception as e:
+        logger.error(f"Error in summarize_batch: {str(e)}")
+        return None
+
+    if not isinstance(summaries, list) or len(summaries) != len(abstracts):
+        logger.error(f"Batched summary returned {len(summaries) if isinstance(summaries, list) else 'no'} items for {len(abstracts)} abstracts.")
+        return None
 
+    return [str(summary) for summary in summaries]
@@ -0,0 +1,362 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from xml.etree.ElementTree import iterparse
+
+from apis.sparse_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+OAI = "{http://www.openarchives.org/OAI/2.0/}"
+OAI_ARXIV = "{http://arxiv.org/OAI/arXiv/}"
+
+# Entry ids as they appear in Atom feeds: http://arxiv.org/abs/2401.00001v2
+ENTRY_ID_PATTERN = re.compile(r"arxiv\.org/abs/(.+?)(v\d+)?$")
+
+
+class ArxivMirror:
+    """
+    Local mirror of Arxiv metadata with a full-text index, kept in one SQLite file.
+
+    Papers live in a plain table keyed by Arxiv id. Two FTS5 indexes, one over titles alone and one
+    over title, authors and abstract, are kept in sync by triggers and ranked with BM25. Loading is an upsert that only replaces a
+    paper with a more recently updated version (or a changed one of the same date), so dumps and
+    incremental harvests can be loaded in any order, and reloading one rewrites nothing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS papers (
+                arxiv_id TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                title TEXT NOT NULL,
+                authors TEXT NOT NULL,
+                abstract TEXT NOT NULL,
+                categories TEXT NOT NULL,
+                published TEXT NOT NULL,
+                updated TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                title, authors, abstract, content='papers', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS titles_fts USING fts5(
+                title, content='papers', content_rowid='rowid', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts (rowid, title, authors, abstract) VALUES (new.rowid, new.title, new.authors, new.abstract);
+                INSERT INTO titles_fts (rowid, title) VALUES (new.rowid, new.title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, authors, abstract)
+                VALUES ('delete', old.rowid, old.title, old.authors, old.abstract);
+                INSERT INTO titles_fts (titles_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, authors, abstract)
+                VALUES ('delete', old.rowid, old.title, old.authors, old.abstract);
+                INSERT INTO titles_fts (titles_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+                INSERT INTO papers_fts (rowid, title, authors, abstract) VALUES (new.rowid, new.title, new.authors, new.abstract);
+                INSERT INTO titles_fts (rowid, title) VALUES (new.rowid, new.title);
+            END;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        self._conn.commit()
+        logger.info(f"Opened Arxiv mirror at {path}")
+
+    def load(self, records, batch_size: int = 5000) -> dict:
+        """
+        Loads a dump or harvest (e.g. from read_dump) and records the load time, which is what
+        callers check to decide whether the mirror is fresh enough to answer on its own.
+
+        Args:
+            records (iterable): Paper records; records with "deleted" set remove the paper instead.
+            batch_size (int): Records per transaction.
+
+        Returns:
+            dict: Counts of papers "loaded" (inserted or replaced), "skipped" (already mirrored,
+                or a more recent version is) and "deleted".
+        """
+        counts = self.upsert(records, batch_size)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('loaded_at', ?)", (str(time.time()),))
+            self._conn.commit()
+        logger.info(f"Loaded into the Arxiv mirror: {counts}")
+        return counts
+
+    def upsert(self, records, batch_size: int = 5000) -> dict:
+        """
+        Upserts paper records in batches of one transaction each, without touching the load time.
+        Returns the same counts as load().
+        """
+        counts = {"loaded": 0, "skipped": 0, "deleted": 0}
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                self._upsert_batch(batch, counts)
+                batch = []
+        if batch:
+            self._upsert_batch(batch, counts)
+        return counts
+
+    def _upsert_batch(self, batch: list, counts: dict):
+        deletes = [(record["arxiv_id"],) for record in batch if record.get("deleted")]
+        # Sources date papers differently, so dates are stored in one format that compares as text
+        rows = [
+            (
+                record["arxiv_id"], record.get("version", ""), record["title"], json.dumps(record["authors"]),
+                record["abstract"], record.get("categories", ""), iso_timestamp(record.get("published", "")),
+                iso_timestamp(record.get("updated") or record.get("published", "")),
+            )
+            for record in batch if not record.get("deleted")
+        ]
+        with self._lock:
+            # Cursor row counts leave out the FTS rows written by the triggers
+            loaded = self._conn.executemany(
+                "INSERT INTO papers (arxiv_id, version, title, authors, abstract, categories, published, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (arxiv_id) DO UPDATE SET version = excluded.version, title = excluded.title, "
+                "authors = excluded.authors, abstract = excluded.abstract, categories = excluded.categories, "
+                "published = excluded.published, updated = excluded.updated "
+                "WHERE excluded.updated > papers.updated OR (excluded.updated = papers.updated AND ("
+                "excluded.title <> papers.title OR excluded.abstract <> papers.abstract "
+                "OR excluded.authors <> papers.authors OR excluded.version <> papers.version))",
+                rows,
+            ).rowcount if rows else 0
+            deleted = self._conn.executemany("DELETE FROM papers WHERE arxiv_id = ?", deletes).rowcount if deletes else 0
+            self._conn.commit()
+        counts["loaded"] += loaded
+        counts["skipped"] += len(rows) - loaded
+        counts["deleted"] += deleted
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """
+        Full-text search over the mirror. Every query term must match; papers are ranked by BM25.
+
+        Titles are searched first: their postings are a small fraction of the abstracts', so common
+        terms stay fast, and title matches would rank first anyway. Only when fewer than `limit`
+        titles match is the full index (title, authors and abstract) searched.
+
+        Args:
+            query (str): Free-text query.
+            limit (int): Maximum number of papers to return.
+
+        Returns:
+            list: Paper records with title, authors, published, updated, link, pdf_url and abstract.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Quoted terms are plain tokens to FTS5, never query syntax
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+        with self._lock:
+            rows = self._ranked("titles_fts", "bm25(titles_fts)", match, limit)
+            if len(rows) < limit:
+                rows = self._ranked("papers_fts", "bm25(papers_fts, 10.0, 5.0, 1.0)", match, limit)
+            if len(rows) >= limit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return [
+            {
+                "title": title,
+                "authors": json.loads(authors),
+                "published": published,
+                "updated": updated,
+                "link": f"http://arxiv.org/abs/{arxiv_id}{version}",
+                "pdf_url": f"http://arxiv.org/pdf/{arxiv_id}{version}",
+                "abstract": abstract,
+            }
+            for arxiv_id, version, title, authors, abstract, published, updated in rows
+        ]
+
+    def _ranked(self, table: str, score: str, match: str, limit: int) -> list:
+        # Caller holds the lock. Ranking rowids before the join keeps unranked rows unread.
+        return self._conn.execute(
+            "SELECT p.arxiv_id, p.version, p.title, p.authors, p.abstract, p.published, p.updated "
+            f"FROM (SELECT rowid, {score} AS score FROM {table} WHERE {table} MATCH ? ORDER BY score LIMIT ?) AS hits "
+            "JOIN papers p ON p.rowid = hits.rowid ORDER BY hits.score",
+            (match, limit),
+        ).fetchall()
+
+    def loaded_at(self) -> float:
+        """
+        Returns when the mirror was last loaded, as a Unix timestamp (0 if never).
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'loaded_at'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def stats(self) -> dict:
+        """
+        Returns the mirror size, newest paper date, last load time and search hit and miss counters.
+        """
+        with self._lock:
+            size, newest = self._conn.execute("SELECT COUNT(*), MAX(updated) FROM papers").fetchone()
+        return {
+            "papers": size,
+            "newest": newest,
+            "loaded_at": self.loaded_at(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_dump(path: str):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def read_dump(path: str):
+    """
+    Streams paper records from a harvested metadata dump, optionally gzipped:
+
+    - JSON lines in the layout of the Arxiv metadata snapshot (one paper per line, with
+      authors_parsed, versions and update_date), or
+    - OAI-PMH ListRecords XML in the "arXiv" metadata format, where deleted records
+      remove papers. Daily harvests with from=<last date> give incremental updates.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    return read_oai(path) if name.endswith(".xml") else read_jsonl(path)
+
+
+def read_jsonl(path: str):
+    with open_dump(path) as lines:
+        for line in lines:
+            if line.strip():
+                yield snapshot_record(json.loads(line))
+
+
+def snapshot_record(paper: dict) -> dict:
+    versions = paper.get("versions") or []
+    if paper.get("authors_parsed"):
+        authors = [" ".join(part for part in (names[1:2] + names[:1]) if part) for names in paper["authors_parsed"]]
+    else:
+        authors = [name.strip() for name in re.split(r",| and ", paper.get("authors", "")) if name.strip()]
+    return {
+        "arxiv_id": paper["id"],
+        "version": versions[-1]["version"] if versions else "",
+        "title": " ".join(paper.get("title", "").split()),
+        "authors": authors,
+        "abstract": " ".join(paper.get("abstract", "").split()),
+        "categories": paper.get("categories", ""),
+        "published": iso_timestamp(versions[0]["created"]) if versions else "",
+        "updated": paper.get("update_date", ""),
+    }
+
+
+def read_oai(path: str):
+    with open_dump(path) as dump:
+        container = None
+        for event, element in iterparse(dump, events=("start", "end")):
+            if event == "start":
+                if element.tag == OAI + "ListRecords":
+                    container = element
+                continue
+            if element.tag != OAI + "record":
+                continue
+            header = element.find(OAI + "header")
+            if header.get("status") == "deleted":
+                identifier = header.findtext(OAI + "identifier", "")
+                yield {"arxiv_id": identifier.rsplit(":", 1)[-1], "deleted": True}
+            else:
+                yield oai_record(element.find(f"{OAI}metadata/{OAI_ARXIV}arXiv"))
+            # Drop parsed records so a large harvest is never held in memory
+            if container is not None:
+                container.remove(element)
+
+
+def oai_record(metadata) -> dict:
+    def text(tag):
+        return " ".join((metadata.findtext(OAI_ARXIV + tag) or "").split())
+
+    authors = [
+        " ".join(part for part in (author.findtext(OAI_ARXIV + "forenames"), author.findtext(OAI_ARXIV + "keyname")) if part)
+        for author in metadata.iterfind(f"{OAI_ARXIV}authors/{OAI_ARXIV}author")
+    ]
+    return {
+        "arxiv_id": text("id"),
+        "version": "",
+        "title": text("title"),
+        "authors": authors,
+        "abstract": text("abstract"),
+        "categories": text("categories"),
+        "published": text("created"),
+        "updated": text("updated") or text("created"),
+    }
+
+
+def feed_record(paper: dict, abstract: str) -> dict:
+    """
+    Turns a paper parsed from a live Atom feed (see arxiv.parse_papers) into a mirror record.
+    """
+    match = ENTRY_ID_PATTERN.search(paper["link"])
+    return {
+        "arxiv_id": match.group(1) if match else paper["link"],
+        "version": (match.group(2) or "") if match else "",
+        "title": paper["title"],
+        "authors": paper["authors"],
+        "abstract": abstract,
+        "published": paper["published"],
+        "updated": paper.get("updated") or paper["published"],
+    }
+
+
+def iso_timestamp(value: str) -> str:
+    """
+    Normalizes an Arxiv date to UTC "YYYY-MM-DDTHH:MM:SSZ": ISO 8601 timestamps from Atom feeds,
+    plain dates from OAI-PMH and update_date, and RFC 2822 dates from snapshot versions
+    ("Mon, 2 Apr 2007 19:18:42 GMT"). Values in none of these formats are returned unchanged.
+    """
+    if not value:
+        return ""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load harvested Arxiv metadata dumps into the local mirror.")
+    parser.add_argument("dumps", nargs="+", help="JSON lines or OAI-PMH XML dumps, optionally gzipped")
+    parser.add_argument("--path", default=os.getenv("ARXIV_MIRROR_PATH", "data/arxiv_mirror.db"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    mirror = ArxivMirror(args.path)
+    for dump in args.dumps:
+        logger.info(f"Loading {dump}")
+        mirror.load(read_dump(dump))
+    logger.info(f"Mirror stats: {mirror.stats()}")
+    mirror.close()
@@ -0,0 +1,285 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from apis import metrics
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache whose entries expire after a fixed time-to-live.
+
+    Keeps hit, miss, eviction and expiration counters so callers can report hit rates.
+    When `max_bytes` is set, the total size of the values (as measured by `sizeof`) is bounded too.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, name: str = "cache",
+                 max_bytes: int = None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: getattr(value, "nbytes", 0))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for `key`, or `default` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value, size = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        """
+        Stores `value` under `key`, evicting the least recently used entries over the limit.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._entries[key] = (expires_at, value, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._entries) > 1
+            ):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters, its current size and hit rate.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes a query for use as a cache key: surrounding and repeated whitespace removed.
+    """
+    return " ".join(text.split())
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps a LangChain embeddings model and caches query embeddings in a TTLCache.
+
+    Keys are the model name plus the normalized query, so repeated queries skip the embedding API.
+    Document embeddings are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: TTLCache):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    def embed_documents(self, texts: list) -> list:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list:
+        normalized = normalize_text(text)
+        key = (self.model, normalized)
+        vector = self.cache.get(key)
+        if vector is None:
+            with metrics.EMBEDDING.time():
+                vector = self.embeddings.embed_query(normalized)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> list:
+        normalized = normalize_text(text)
+        key = (self.model, normalized)
+        vector = self.cache.get(key)
+        if vector is None:
+            with metrics.EMBEDDING.time():
+                vector = await self.embeddings.aembed_query(normalized)
+            self.cache.set(key, vector)
+        return vector
+
+
+class SemanticAnswerCache:
+    """
+    Caches generated answers by query meaning rather than query text.
+
+    Each entry holds the query embedding, the ids of the documents the answer was generated from
+    and the answer. A lookup hits when a cached query is at least `threshold` cosine-similar to the
+    new one *and* retrieval for the new query returned the same documents, so a paraphrase reuses
+    the answer while a query whose context differs is regenerated.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, threshold: float = 0.95,
+                 name: str = "answers"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # entry id -> (expires_at, scope, document_ids, value)
+        self._vectors = {}             # entry id -> normalized query embedding
+        self._matrix = None
+        self._matrix_ids = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, embedding, document_ids, scope=None):
+        """
+        Returns the cached answer for a similar query with the same retrieved documents, or None.
+
+        Args:
+            embedding (list): The new query's embedding.
+            document_ids (Iterable): Ids of the documents retrieved for the new query.
+            scope (Optional): Extra key that must match exactly, such as the input image.
+        """
+        document_ids = frozenset(document_ids)
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            matrix = self._similarity_matrix()
+            if matrix is None:
+                self.misses += 1
+                return None
+
+            similarities = matrix @ query
+            found_similar = False
+            for position in np.argsort(similarities)[::-1]:
+                if similarities[position] < self.threshold:
+                    break
+                entry_id = self._matrix_ids[position]
+                expires_at, entry_scope, entry_documents, value = self._entries[entry_id]
+                if expires_at < now:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                if entry_scope != scope:
+                    continue
+                if entry_documents != document_ids:
+                    found_similar = True
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return value
+
+            if found_similar:
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def store(self, embedding, document_ids, value, scope=None):
+        """
+        Caches an answer, evicting the least recently used entries over the limit.
+        """
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (time.monotonic() + self.ttl, scope, frozenset(document_ids), value)
+            self._vectors[entry_id] = self._normalize(embedding)
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self):
+        """
+        Drops every cached answer, e.g. after new documents are ingested.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._vectors.clear()
+            self._matrix = None
+            self.invalidations += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, entry_id):
+        self._entries.pop(entry_id, None)
+        self._vectors.pop(entry_id, None)
+        self._matrix = None
+
+    def _similarity_matrix(self):
+        if not self._vectors:
+            return None
+        if self._matrix is None:
+            self._matrix_ids = list(self._vectors)
+            self._matrix = np.stack([self._vectors[entry_id] for entry_id in self._matrix_ids])
+        return self._matrix
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+import zlib
+
+import numpy as np
+from langchain_core.documents import Document
+
+from apis.resources import lazy
+from apis.sparse_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+TOKENIZER_ENCODING = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+
+# Below this many tokens of remaining budget, a chunk is not worth truncating to fit
+MIN_TRUNCATED_TOKENS = 64
+VECTOR_DIM = 1024
+SHINGLE_SIZE = 3
+
+
+def load_tokenizer():
+    """
+    Loads the tiktoken encoding used for budgeting. Returns None when it cannot be loaded (tiktoken
+    fetches its vocabulary on first use), in which case token counts are estimated instead.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        logger.warning(f"Tokenizer {TOKENIZER_ENCODING} unavailable, estimating token counts: {e}")
+        return None
+
+
+tokenizer = lazy("context.tokenizer", load_tokenizer, required=False)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with the configured tokenizer, or estimates about four characters per token without it.
+    """
+    encoding = tokenizer.get()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts text down to at most `max_tokens` tokens.
+    """
+    encoding = tokenizer.get()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def term_vector(text: str) -> np.ndarray:
+    """
+    Embeds text locally as a normalized, hashed set of its non-stopword terms. Terms count once,
+    so frequent filler words do not make unrelated chunks look alike.
+    """
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for term in set(tokenize(text)):
+        vector[zlib.crc32(term.encode("utf-8")) % VECTOR_DIM] = 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def shingles(text: str) -> set:
+    """
+    Returns the hashed word n-grams of a text, ignoring case and punctuation, for near-duplicate detection.
+    """
+    words = re.findall(r"\w+", text.lower())
+    return {
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+    }
+
+
+def pack_context(query: str, docs: list, token_budget: int = TOKEN_BUDGET, dedup_threshold: float = DEDUP_THRESHOLD,
+                 mmr_lambda: float = MMR_LAMBDA) -> list:
+    """
+    Selects which retrieved documents go into the prompt.
+
+    Near-duplicate chunks (by word-shingle Jaccard similarity) are dropped first, keeping the
+    better-ranked copy. The rest are ordered by maximal marginal relevance so each pick adds new
+    information, and packed greedily into the token budget. Similarities are computed locally, so
+    packing needs no API calls.
+
+    Args:
+        query (str): The user's query.
+        docs (list): Retrieved documents, best ranked first.
+        token_budget (int): Maximum total tokens of page content to keep.
+        dedup_threshold (float): Shingle Jaccard similarity above which two chunks count as duplicates.
+        mmr_lambda (float): Trade-off between relevance (1.0) and diversity (0.0).
+
+    Returns:
+        list: The selected documents in packing order. A chunk cut to fit the budget is a new Document.
+    """
+    docs = [doc for doc in docs if doc.page_content.strip()]
+    if not docs:
+        return []
+
+    # Drop near-duplicates, keeping the earlier (better-ranked) copy
+    kept = []
+    kept_shingles = []
+    for position, doc in enumerate(docs):
+        doc_shingles = shingles(doc.page_content)
+        if any(len(doc_shingles & other) / len(doc_shingles | other) >= dedup_threshold for other in kept_shingles):
+            continue
+        kept.append(position)
+        kept_shingles.append(doc_shingles)
+
+    vectors = {position: term_vector(docs[position].page_content) for position in kept}
+
+    # Relevance blends the retriever's rank with lexical similarity to the query
+    query_vector = term_vector(query)
+    relevance = {
+        position: 0.5 * (1.0 - rank / len(kept)) + 0.5 * float(vectors[position] @ query_vector)
+        for rank, position in enumerate(kept)
+    }
+
+    selected = []
+    remaining = list(kept)
+    budget = token_budget
+    while remaining and budget > 0:
+        def mmr(position):
+            redundancy = max((float(vectors[position] @ vectors[other]) for other in selected), default=0.0)
+            return mmr_lambda * relevance[position] - (1 - mmr_lambda) * redundancy
+
+        best = max(remaining, key=mmr)
+        remaining.remove(best)
+        tokens = count_tokens(docs[best].page_content)
+        if tokens <= budget:
+            selected.append(best)
+            budget -= tokens
+        elif budget >= MIN_TRUNCATED_TOKENS:
+            selected.append(best)
+            docs[best] = Document(
+                page_content=truncate_to_tokens(docs[best].page_content, budget),
+                metadata=docs[best].metadata,
+            )
+            budget = 0
+
+    logger.info(f"Packed {len(selected)} of {len(docs)} documents into {token_budget - budget} tokens")
+    return [docs[position] for position in selected]
@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Ingestion stages, in pipeline order. Each stage is recorded against the S3 object it reads:
+# "converted" for source PDFs, "embedded" for the Markdown and images produced from them.
+CONVERTED = "converted"
+EMBEDDED = "embedded"
+
+
+def fingerprint(item: dict) -> str:
+    """
+    Identifies one version of an S3 object from its listing entry. The ETag changes whenever the
+    content does (for single-part uploads it is the content's MD5), so unchanged objects are
+    recognized without downloading them. Entries without one fall back to last-modified time and size.
+
+    Args:
+        item (dict): An entry of a list_objects_v2 "Contents" list.
+
+    Returns:
+        str: The fingerprint.
+    """
+    etag = item.get("ETag", "").strip('"')
+    return etag or f"{item.get('LastModified')}:{item.get('Size')}"
+
+
+class IngestManifest:
+    """
+    Persistent record of which ingestion stages each S3 object has completed, and for which version.
+
+    Rows are keyed by S3 key and stage and hold the fingerprint of the object version the stage
+    last completed for, so a scheduled run only processes new and changed objects. The manifest
+    is one SQLite file that must outlive the Airflow workers (INGEST_MANIFEST_PATH); each task
+    opens it for the length of its run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stages ("
+            "key TEXT NOT NULL, "
+            "stage TEXT NOT NULL, "
+            "fingerprint TEXT NOT NULL, "
+            "completed_at REAL NOT NULL, "
+            "details TEXT NOT NULL, "
+            "PRIMARY KEY (key, stage))"
+        )
+        self._conn.commit()
+        logger.info(f"Opened ingestion manifest at {path}")
+
+    def pending(self, objects: list, stage: str, force: bool = False) -> list:
+        """
+        Picks the objects a stage still has to process: those it never completed, or completed
+        for a different version.
+
+        Args:
+            objects (list): Entries of a list_objects_v2 "Contents" list.
+            stage (str): The stage about to run.
+            force (bool): Reprocess every object regardless of the manifest.
+
+        Returns:
+            list: The entries to process, in listing order.
+        """
+        if force:
+            return list(objects)
+
+        with self._lock:
+            done = dict(self._conn.execute("SELECT key, fingerprint FROM stages WHERE stage = ?", (stage,)))
+        return [item for item in objects if done.get(item["Key"]) != fingerprint(item)]
+
+    def mark_done(self, key: str, version: str, stage: str, **details):
+        """
+        Records that a stage completed for this version (fingerprint) of an object. Call it only
+        once the stage's outputs are written, so a failed run is retried next time.
+
+        Args:
+            key (str): The S3 key of the object the stage read.
+            version (str): Its fingerprint.
+            stage (str): The stage that completed.
+            **details: JSON-serializable notes kept with the record, e.g. the output keys.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stages (key, stage, fingerprint, completed_at, details) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, version, time.time(), json.dumps(details)),
+            )
+            self._conn.commit()
+
+    def status(self, key: str) -> dict:
+        """
+        Returns the stages recorded for an object: stage -> {fingerprint, completed_at, details}.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, fingerprint, completed_at, details FROM stages WHERE key = ?", (key,)
+            ).fetchall()
+        return {
+            stage: {"fingerprint": version, "completed_at": completed_at, "details": json.loads(details)}
+            for stage, version, completed_at, details in rows
+        }
+
+    def details(self, key: str, stage: str) -> dict:
+        """
+        Returns the details recorded when a stage last completed for an object, or {} if it never did.
+        """
+        return self.status(key).get(stage, {}).get("details", {})
+
+    def stats(self) -> dict:
+        """
+        Returns the number of objects recorded per stage.
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT stage, COUNT(*) FROM stages GROUP BY stage"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def force_reprocess(context: dict = None) -> bool:
+    """
+    Whether a DAG run should ignore the manifest: set {"force": true} in the run's conf when
+    triggering it, or INGEST_FORCE=true for every run.
+    """
+    dag_run = (context or {}).get("dag_run")
+    conf = getattr(dag_run, "conf", None) or {}
+    return bool(conf.get("force")) or os.getenv("INGEST_FORCE", "false").lower() == "true"
@@ -1,42 +1,69 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from copilotkit import CopilotKitSDK, LangGraphAgent
 from langgraph.graph import StateGraph, START, END, MessagesState
-from apis.rag import rag_search
-from apis.arxiv import search_arxiv
+from langgraph.types import Send
+from langchain_core.messages import AIMessage
+from apis.rag import rag_search, rag_search_stream, query_embedding_cache, image_embedding_cache, answer_cache
+from apis.arxiv import search_arxiv, search_arxiv_stream, search_arxiv_pages, summary_store, mirror as arxiv_mirror
 from apis.web import search_web
-from apis.router import tool_node  # Updated router with both Arxiv and RAG tools
+from apis.query_router import QueryRouter
+from apis.ranking import reciprocal_rank_fusion
+from apis.tool_cache import tool_caches
+from apis.pdf_render import PdfRenderer, RenderQueueFull
+from apis.cache import TTLCache
+from apis.resources import lazy, warm_up, readiness
+from apis import upstreams
+from apis import admission, metrics, profiling
+from contextlib import asynccontextmanager
 import logging
 from fastapi.middleware.cors import CORSMiddleware
 import markdown
-import pdfkit
 from io import BytesIO
 import os
-from openai import OpenAI
+import asyncio
+import json
+import weakref
+import time
+from typing import Annotated
 import re
+import secrets
 import tempfile
 import shutil
-import boto3
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 from io import BytesIO
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts warming up clients and models in the background so the server accepts traffic immediately.
+    /ready reports 503 until every required resource has been built.
+    """
+    if os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true":
+        app.state.warm_up = asyncio.create_task(asyncio.to_thread(warm_up))
+        app.state.warm_connections = asyncio.create_task(upstreams.warm_connections())
+    yield
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Upstream clients come from the shared registry of pooled, keep-alive connections
+client = upstreams.openai_client
 
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Local fast-path router for /smart-query
+query_router = QueryRouter()
+
+# PDF exports: bounded render pool with a content-hash cache
+pdf_renderer = PdfRenderer()
 
 # Load environment variables
-aws_access_key_id = os.getenv("AWS_ACCESS_KEY")
-aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-aws_region = os.getenv("AWS_REGION")
 s3_bucket_name = os.getenv("BUCKET_NAME")
 
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key,
-    region_name=aws_region
-)
+s3_client = upstreams.s3_client
+
+# Per-dependency concurrency limits with bounded queues; excess requests get 429/503 and Retry-After.
+# Added first so it runs inside CORS and shed responses still carry CORS headers.
+app.add_middleware(admission.AdmissionMiddleware)
 
 # Enable CORS middleware to allow cross-origin requests
 app.add_middleware(
@@ -47,47 +74,149 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# Request counts, latencies and in-flight gauges per endpoint, served at /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Opt-in per-request profiling (X-Profile header or ?profile= flag carrying PROFILE_TOKEN, or sampled via /admin/profiling)
+app.add_middleware(profiling.ProfilingMiddleware)
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Define state graph using MessagesState
-state_graph = StateGraph(MessagesState)
+# Research graph settings
+GRAPH_BRANCH_TIMEOUT = float(os.getenv("GRAPH_BRANCH_TIMEOUT", "30"))
+GRAPH_MULTI_SOURCES = int(os.getenv("GRAPH_MULTI_SOURCES", "2"))
+
+# Graph node for each source
+SOURCE_NODES = {"arxiv": "fetch_arxiv", "rag": "rag_search", "web": "web_search"}
 
-def selector(state: MessagesState) -> str:
+
+def merge_dicts(left: dict, right: dict) -> dict:
     """
-    Selector function to determine which tool to use based on the last message.
+    Reducer for state keys written by parallel branches: each branch adds its own entries.
     """
-    last_message = state["messages"][-1].content.lower()
-    
-    if "arxiv" in last_message:
-        return "fetch_arxiv"
-    
-    if "rag" in last_message:
-        return "rag_search"
-    
-    if "web" in last_message:
-        return "web_search"
-    
-    return "finalAnswer"
+    return {**(left or {}), **(right or {})}
+
+
+class ResearchState(MessagesState):
+    query: str
+    mode: str  # "single" (default) or "multi" to query several sources at once
+    sources: list
+    results: Annotated[dict, merge_dicts]
+    timings: Annotated[dict, merge_dicts]
+
+
+async def graph_search_arxiv(query: str) -> list:
+    response = await search_arxiv.ainvoke(query)
+    if "error" in response:
+        return response
+    return [
+        {"title": paper["title"], "summary": paper["summary"], "link": paper.get("link")}
+        for paper in response.get("results", [])
+    ]
+
+
+async def graph_search_rag(query: str) -> list:
+    response = await rag_search(query)
+    return [{"title": "RAG Search Result", "summary": response.choices[0].message.content.strip()}]
+
+
+async def graph_search_web(query: str) -> list:
+    response = await search_web.ainvoke(query)
+    if "error" in response:
+        return response
+    return [{"title": "Web Search Result", "summary": response["context"]}]
 
 
-# Add nodes and edges to state graph based on architecture
+# Search function for each source; each returns a ranked list of items or an {"error": ...} dict
+GRAPH_TOOLS = {
+    "arxiv": graph_search_arxiv,
+    "rag": graph_search_rag,
+    "web": graph_search_web,
+}
+
+
+async def selector(state: ResearchState) -> dict:
+    """
+    Decides which sources to query. Sources named in the message ("arxiv", "rag", "web") are
+    used as given; otherwise the local query router picks one, or the best few in "multi" mode.
+    """
+    query = state["messages"][-1].content
+    sources = [source for source in SOURCE_NODES if re.search(rf"\b{source}\b", query, re.IGNORECASE)]
+
+    if not sources and state.get("mode") == "multi":
+        sources = query_router.rank(query)[:GRAPH_MULTI_SOURCES]
+    elif not sources:
+        sources = [(await query_router.route(query)).route]
+
+    logger.info(f"Graph selected sources {sources} for query: {query}")
+    return {"query": query, "sources": sources}
+
+
+def fan_out(state: ResearchState) -> list:
+    """
+    Sends the query to every selected source node at once; LangGraph runs the branches in parallel.
+    """
+    sends = [
+        Send(SOURCE_NODES[source], {"query": state["query"]})
+        for source in state.get("sources", [])
+        if source in SOURCE_NODES
+    ]
+    return sends or ["finalAnswer"]
+
+
+def search_node(source: str):
+    """
+    Builds the graph node for one source. A slow or failing source yields an error entry
+    instead of holding up or failing the other branches.
+    """
+    node = SOURCE_NODES[source]
+
+    async def run(state: dict) -> dict:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(GRAPH_TOOLS[source](state["query"]), GRAPH_BRANCH_TIMEOUT)
+        except asyncio.TimeoutError:
+            result = {"error": f"{source} search timed out after {GRAPH_BRANCH_TIMEOUT:.0f}s"}
+        except Exception as e:
+            logger.error(f"Error in {node}: {str(e)}")
+            result = {"error": str(e)}
+        return {"results": {source: result}, "timings": {node: time.perf_counter() - start}}
+
+    run.__name__ = node
+    return run
+
+
+def final_answer(state: ResearchState) -> dict:
+    """
+    Merges the results of every branch into one ranked list with reciprocal rank fusion.
+    """
+    results = state.get("results") or {}
+    timings = state.get("timings") or {}
+    ranked = [items for items in results.values() if isinstance(items, list)]
+    errors = {source: result["error"] for source, result in results.items() if isinstance(result, dict)}
+
+    merged = reciprocal_rank_fusion(ranked, key=lambda item: (item["title"], item.get("link")))
+    if timings:
+        slowest = max(timings, key=timings.get)
+        logger.info(f"Graph branches finished; slowest was {slowest} at {timings[slowest]:.2f}s")
+
+    content = json.dumps({"results": merged, "errors": errors, "timings": timings})
+    return {"messages": [AIMessage(content=content)]}
+
+
+state_graph = StateGraph(ResearchState)
 state_graph.add_node("selector", selector)
-state_graph.add_node("fetch_arxiv", tool_node)  # Run Arxiv search if selected by selector
-state_graph.add_node("rag_search", tool_node)  # Run RAG search if selected by selector
-state_graph.add_node("finalAnswer", lambda state: {"messages": state["messages"]})
+for source in SOURCE_NODES:
+    state_graph.add_node(SOURCE_NODES[source], search_node(source))
+state_graph.add_node("finalAnswer", final_answer)
 
 state_graph.add_edge(START, "selector")
-state_graph.add_edge("selector", "fetch_arxiv")
-state_graph.add_edge("selector", "rag_search")
-state_graph.add_edge("selector", "finalAnswer")
-state_graph.add_edge("fetch_arxiv", "finalAnswer")
-state_graph.add_edge("rag_search", "finalAnswer")
-
-state_graph.add_node("web_search", tool_node)  # Run Web Search if selected by selector
-state_graph.add_edge("selector", "web_search")
-state_graph.add_edge("web_search", "finalAnswer")
+state_graph.add_conditional_edges("selector", fan_out, [*SOURCE_NODES.values(), "finalAnswer"])
+for node in SOURCE_NODES.values():
+    state_graph.add_edge(node, "finalAnswer")
+state_graph.add_edge("finalAnswer", END)
 
 
 # Compile workflow into runnable graph
@@ -184,20 +313,56 @@ feedback link: https://example.com/feedback
 #         logger.error(f"Unexpected error: {str(e)}")
 #         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+# Short-lived cache of S3 listing pages, cleared when the ingestion pipeline writes to the bucket
+S3_LIST_MAX_KEYS = 1000  # S3's own page-size limit
+# Prefixes clients may list; the rest of the bucket (converted outputs, images) stays private
+S3_LIST_PREFIXES = [prefix for prefix in os.getenv("S3_LIST_PREFIXES", "pdfs/").split(",") if prefix]
+# Shared with the ingestion pipeline, which sends it as a bearer token to invalidate caches
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+s3_listing_cache = TTLCache(
+    max_entries=256,
+    ttl=float(os.getenv("S3_LIST_CACHE_TTL", "30")),
+    name="s3_listing",
+)
+
 @app.get("/list-s3-files/")
-async def list_s3_files():
-    try:
-        # List objects within the specified S3 bucket
-        response = s3_client.list_objects_v2(Bucket=s3_bucket_name)
+async def list_s3_files(prefix: str = "pdfs/", cursor: str = None, limit: int = S3_LIST_MAX_KEYS):
+    """
+    Lists one page of keys under a prefix, filtered by S3 itself rather than after listing the whole bucket.
 
-        if "Contents" not in response:
+    Args:
+        prefix (str): Key prefix to list, one of S3_LIST_PREFIXES. Defaults to the uploaded PDFs.
+        cursor (str): The next_cursor of the previous page, to continue listing.
+        limit (int): Keys per page, at most 1000.
+
+    Returns:
+        dict: {"files": [...], "next_cursor": str or None}. next_cursor is None on the last page.
+    """
+    if prefix not in S3_LIST_PREFIXES:
+        raise HTTPException(status_code=400, detail=f"prefix must be one of {S3_LIST_PREFIXES}")
+    limit = max(1, min(limit, S3_LIST_MAX_KEYS))
+    cache_key = (prefix, cursor, limit)
+    try:
+        page = s3_listing_cache.get(cache_key)
+        if page is None:
+            params = {"Bucket": s3_bucket_name, "Prefix": prefix, "MaxKeys": limit}
+            if cursor:
+                params["ContinuationToken"] = cursor
+
+            # boto3 is blocking, so run it in a worker thread
+            s3 = await s3_client.aget()
+            response = await asyncio.to_thread(s3.list_objects_v2, **params)
+            page = {
+                "files": [content["Key"] for content in response.get("Contents", [])],
+                "next_cursor": response.get("NextContinuationToken"),
+            }
+            s3_listing_cache.set(cache_key, page)
+
+        if not page["files"] and cursor is None:
             return {"message": "No files found in the bucket."}
 
-        # Filter only files in the pdfs/ folder
-        file_names = [content["Key"] for content in response["Contents"] if content["Key"].startswith("pdfs/")]
+        return page
 
-        return {"files": file_names}
-    
     except NoCredentialsError:
         raise HTTPException(status_code=500, detail="AWS credentials not found.")
     except PartialCredentialsError:
@@ -205,24 +370,27 @@ async def list_s3_files():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/smart-query")
-async def smart_query_endpoint(payload: dict):
+@app.post("/list-s3-files/invalidate")
+def invalidate_s3_listing(authorization: Annotated[str, Header()] = None):
+    """
+    Drops cached listing pages. Called by the ingestion pipeline after it writes to the bucket.
     """
-    Smart endpoint that uses an LLM to decide which search method to use based on user query.
+    require_admin_token(authorization)
+    s3_listing_cache.clear()
+    return {"invalidated": True}
+
+async def llm_select_search_method(user_query: str) -> str:
+    """
+    Asks the LLM which search method fits the query. Used when the local router is not confident.
 
     Args:
-        payload (dict): A dictionary containing the user's query.
+        user_query (str): The user's query.
 
     Returns:
-        dict: The response from the selected search endpoint.
+        str: 'web', 'rag' or 'arxiv' (or whatever the LLM replied with).
     """
-    try:
-        user_query = payload.get("query", "")
-        if not user_query:
-            raise HTTPException(status_code=400, detail="No query provided")
-
-        # Use OpenAI LLM to decide which search method to use
-        llm_response = client.chat.completions.create(
+    with metrics.ROUTING_LLM.time():
+        llm_response = await client.get().chat.completions.create(
             model="gpt-4o",
             messages=[
                 {
@@ -239,9 +407,34 @@ async def smart_query_endpoint(payload: dict):
             ],
         )
 
-        # Extract and log the LLM's decision
-        decision = re.sub(r'^["\']|["\']$', '', llm_response.choices[0].message.content.strip().lower())
-        logger.info(f"LLM Decision: '{decision}'")
+    # Extract and log the LLM's decision
+    decision = re.sub(r'^["\']|["\']$', '', llm_response.choices[0].message.content.strip().lower())
+    logger.info(f"LLM Decision: '{decision}'")
+    return decision
+
+@app.post("/smart-query")
+async def smart_query_endpoint(payload: dict):
+    """
+    Smart endpoint that decides which search method to use based on user query.
+
+    A local router answers most queries in well under a millisecond; the LLM is only consulted
+    when its confidence is low.
+
+    Args:
+        payload (dict): A dictionary containing the user's query.
+
+    Returns:
+        dict: The response from the selected search endpoint.
+    """
+    try:
+        user_query = payload.get("query", "")
+        if not user_query:
+            raise HTTPException(status_code=400, detail="No query provided")
+
+        # Route locally (keyword rules, then nearest centroid); only low-confidence queries reach the LLM
+        routing = await query_router.route(user_query, fallback=llm_select_search_method)
+        decision = routing.route
+        logger.info(f"Routing Decision: '{decision}' via {routing.source} (confidence {routing.confidence:.2f})")
 
         # Call the appropriate endpoint based on the decision
         if decision == "arxiv":
@@ -284,7 +477,7 @@ async def web_search_endpoint(payload: dict):
     
     try:
         # Perform web search
-        response = search_web.invoke(query)
+        response = await search_web.ainvoke(query)
         
         logger.info(f"Web search response: {response}")
         
@@ -314,7 +507,7 @@ async def rag_search_endpoint(payload: dict):
 
     try:
         # Perform RAG search
-        response = rag_search(query)
+        response = await rag_search(query)
 
         # Extract the response content from the ChatCompletion object
         content = response.choices[0].message.content.strip()
@@ -352,8 +545,8 @@ async def handle_copilotkit_remote(payload: dict):
         if user_query:
             logger.info(f"Searching for papers related to: {user_query}")
             
-            # Use the invoke method to get the search results
-            search_results = search_arxiv.invoke(user_query)
+            # Use the async invoke method to get the search results
+            search_results = await search_arxiv.ainvoke(user_query)
             
             logger.info(f"Search results returned: {search_results}")
             return search_results  # Return the search results
@@ -365,6 +558,254 @@ async def handle_copilotkit_remote(payload: dict):
         logger.error(f"Error invoking Arxiv tool: {str(e)}")
         return {"error": str(e)}
 
+def format_sse(event: str, data: dict) -> str:
+    """
+    Formats one server-sent event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events) -> StreamingResponse:
+    """
+    Wraps an async generator of formatted events in an unbuffered text/event-stream response.
+    """
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/rag-search/stream")
+async def rag_search_stream_endpoint(payload: dict):
+    """
+    Streaming variant of /rag-search using server-sent events.
+
+    Emits a "token" event for each chunk generated by Llama3, then a "done" event carrying
+    the same shape as /rag-search, or an "error" event.
+
+    Args:
+        payload (dict): A dictionary containing the user's query.
+
+    Returns:
+        StreamingResponse: The text/event-stream response.
+    """
+    logger.info(f"Received payload: {payload}")
+
+    query = payload.get("query", "")
+
+    if not query:
+        return {"error": "No query provided"}
+
+    async def events():
+        content = ""
+        try:
+            async for token in rag_search_stream(query):
+                content += token
+                yield format_sse("token", {"text": token})
+            yield format_sse("done", {"results": [{"title": "RAG Search Result", "summary": content.strip()}]})
+        except Exception as e:
+            logger.error(f"Error streaming RAG search: {str(e)}")
+            yield format_sse("error", {"error": str(e)})
+
+    return sse_response(events())
+
+@app.post("/copilotkit_remote/stream")
+async def copilotkit_remote_stream_endpoint(payload: dict):
+    """
+    Streaming variant of /copilotkit_remote using server-sent events.
+
+    Emits a "paper" event as soon as each paper's summary is ready, then a "done" event with
+    the number of papers sent. "message" and "error" events mirror the JSON endpoint.
+
+    Args:
+        payload (dict): A dictionary containing the user's query.
+
+    Returns:
+        StreamingResponse: The text/event-stream response.
+    """
+    logger.info(f"Received payload: {payload}")
+
+    user_query = payload.get('query', '')
+
+    if not user_query:
+        logger.error("No query provided in the payload.")
+        return {"error": "No query provided"}
+
+    async def events():
+        count = 0
+        async for item in search_arxiv_stream(user_query):
+            if "paper" in item:
+                count += 1
+                yield format_sse("paper", item["paper"])
+            elif "message" in item:
+                yield format_sse("message", item)
+            else:
+                yield format_sse("error", item)
+        yield format_sse("done", {"count": count})
+
+    return sse_response(events())
+
+# Deep Arxiv search: results per request are capped; Arxiv itself serves at most 30000 per query
+ARXIV_DEEP_MAX_RESULTS = int(os.getenv("ARXIV_DEEP_MAX_RESULTS", "2000"))
+
+@app.post("/copilotkit_remote/deep")
+async def copilotkit_remote_deep_endpoint(payload: dict):
+    """
+    Deep Arxiv search over server-sent events: pages through up to max_results papers and
+    emits a "paper" event per paper as each page is parsed, then a "done" event with the count.
+
+    Papers carry their abstract; set "summarize" to also get LLM summaries, at the cost of one
+    completion per paper not already in the summary store.
+
+    Args:
+        payload (dict): {"query": str, "max_results": int (default 100), "summarize": bool (default false)}.
+
+    Returns:
+        StreamingResponse: The text/event-stream response.
+    """
+    logger.info(f"Received payload: {payload}")
+
+    user_query = payload.get("query", "")
+    if not user_query:
+        return {"error": "No query provided"}
+
+    try:
+        max_results = int(payload.get("max_results", 100))
+    except (TypeError, ValueError):
+        return {"error": "max_results must be an integer"}
+    if not 0 < max_results <= ARXIV_DEEP_MAX_RESULTS:
+        return {"error": f"max_results must be between 1 and {ARXIV_DEEP_MAX_RESULTS}"}
+
+    async def events():
+        count = 0
+        async for item in search_arxiv_pages(user_query, max_results, summarize=bool(payload.get("summarize", False))):
+            if "paper" in item:
+                count += 1
+                yield format_sse("paper", item["paper"])
+            else:
+                yield format_sse("error", item)
+        yield format_sse("done", {"count": count})
+
+    return sse_response(events())
+
+# Batch search: per-upstream concurrency limits shared by all batches
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "100"))
+BATCH_CONCURRENCY = {
+    "web": int(os.getenv("BATCH_WEB_CONCURRENCY", "8")),
+    "rag": int(os.getenv("BATCH_RAG_CONCURRENCY", "4")),
+    "arxiv": int(os.getenv("BATCH_ARXIV_CONCURRENCY", "2")),
+}
+BATCH_TOOLS = {
+    "web": web_search_endpoint,
+    "rag": rag_search_endpoint,
+    "arxiv": handle_copilotkit_remote,
+}
+_batch_semaphores = weakref.WeakKeyDictionary()
+
+def batch_semaphore(tool: str) -> asyncio.Semaphore:
+    """
+    Returns the semaphore limiting concurrent batch calls to one upstream, created per event loop.
+    """
+    loop = asyncio.get_running_loop()
+    semaphores = _batch_semaphores.get(loop)
+    if semaphores is None:
+        semaphores = _batch_semaphores[loop] = {
+            name: asyncio.Semaphore(limit) for name, limit in BATCH_CONCURRENCY.items()
+        }
+    return semaphores[tool]
+
+async def run_batch_query(query: str, tool: str = None) -> tuple:
+    """
+    Runs one deduplicated batch query, routing it first if no tool was given.
+
+    Returns:
+        tuple: (tool used, response in the same shape as the single-query endpoint).
+    """
+    if tool is None:
+        tool = (await query_router.route(query, fallback=llm_select_search_method)).route
+    handler = BATCH_TOOLS.get(tool)
+    if handler is None:
+        return tool, {"error": f"Unknown tool: {tool}"}
+    async with batch_semaphore(tool):
+        return tool, await handler({"query": query})
+
+def batch_item(item, default_tool) -> tuple:
+    """
+    Normalizes one /batch-search entry to (query, tool, error), where error is None for a valid entry.
+    """
+    if isinstance(item, str):
+        item = {"query": item}
+    if not isinstance(item, dict):
+        return None, None, f"Each query must be a string or an object, not {type(item).__name__}"
+    query, tool = item.get("query"), item.get("tool", default_tool)
+    if tool is not None and not isinstance(tool, str):
+        return None, None, "tool must be a string"
+    if not isinstance(query, str):
+        return None, tool, "query must be a string"
+    query = " ".join(query.split())
+    return query, tool, None if query else "No query provided"
+
+@app.post("/batch-search")
+async def batch_search_endpoint(payload: dict):
+    """
+    Endpoint to answer many queries in one request.
+
+    Identical queries are run once and all unique queries run concurrently, bounded per upstream.
+    Results come back in request order, either as one JSON response or, with "stream": true,
+    as a "result" server-sent event per query followed by a "done" event.
+
+    Args:
+        payload (dict): {"queries": [...], "tool": optional default tool, "stream": optional bool}.
+            Each query is a string or {"query": str, "tool": "web" | "rag" | "arxiv"}; queries
+            without a tool are routed like /smart-query.
+
+    Returns:
+        dict | StreamingResponse: {"results": [...], "unique": n} or the event stream.
+    """
+    queries = payload.get("queries") or []
+    if not isinstance(queries, list):
+        return {"error": "queries must be a list"}
+    if not queries:
+        return {"error": "No queries provided"}
+    if len(queries) > BATCH_MAX_QUERIES:
+        return {"error": f"At most {BATCH_MAX_QUERIES} queries per batch"}
+
+    default_tool = payload.get("tool")
+    if default_tool is not None and not isinstance(default_tool, str):
+        return {"error": "tool must be a string"}
+    batch = [batch_item(item, default_tool) for item in queries]
+
+    # Run each distinct (query, tool) pair once
+    tasks = {}
+    for query, tool, error in batch:
+        if error is None and (query, tool) not in tasks:
+            tasks[(query, tool)] = asyncio.create_task(run_batch_query(query, tool))
+    logger.info(f"Batch of {len(batch)} queries, {len(tasks)} unique")
+
+    async def result(index, query, tool, error):
+        if error is not None:
+            return {"index": index, "query": query, "tool": tool, "result": {"error": error}}
+        try:
+            used_tool, response = await tasks[(query, tool)]
+        except Exception as e:
+            logger.error(f"Error in batch query '{query}': {str(e)}")
+            used_tool, response = tool, {"error": str(e)}
+        return {"index": index, "query": query, "tool": used_tool, "result": response}
+
+    if not payload.get("stream"):
+        results = [await result(index, *item) for index, item in enumerate(batch)]
+        return {"results": results, "unique": len(tasks)}
+
+    async def events():
+        try:
+            for index, item in enumerate(batch):
+                yield format_sse("result", await result(index, *item))
+            yield format_sse("done", {"count": len(batch), "unique": len(tasks)})
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    return sse_response(events())
+
 @app.get("/")
 def read_root():
     """
@@ -372,34 +813,155 @@ def read_root():
     """
     return {"message": "Hello from Combined Agent!"}
 
+@app.get("/ready")
+def readiness_probe():
+    """
+    Readiness check, separate from the / health check: 200 once every required client and
+    model has been initialized, 503 (with per-resource status) until then.
+    """
+    ready, resources = readiness()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, "resources": resources})
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """
+    Exposes request, stage and upstream metrics in the Prometheus text format.
+    """
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+def require_bearer_token(token: str, authorization: str, name: str):
+    """
+    Guards an admin endpoint. It is not served unless `token` is set, and then only to requests
+    carrying it as "Authorization: Bearer <token>".
+    """
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(status_code=403, detail=f"Invalid {name} token")
+
+def require_profile_token(authorization: str):
+    """
+    Guards the profiling admin endpoints with PROFILE_TOKEN.
+    """
+    require_bearer_token(profiling.PROFILE_TOKEN, authorization, "profiling")
+
+def require_admin_token(authorization: str):
+    """
+    Guards the cache invalidation endpoints with ADMIN_TOKEN.
+    """
+    require_bearer_token(ADMIN_TOKEN, authorization, "admin")
+
+@app.get("/admin/profiling")
+def get_profiling_settings(authorization: Annotated[str, Header()] = None):
+    """
+    Reports the automatic profiling settings.
+    """
+    require_profile_token(authorization)
+    return profiling.settings.as_dict()
+
+@app.post("/admin/profiling")
+def update_profiling_settings(payload: dict, authorization: Annotated[str, Header()] = None):
+    """
+    Changes the share of /smart-query and /rag-search requests profiled automatically.
+
+    Args:
+        payload (dict): {"sample_rate": float between 0 and 1, "sample_paths": optional list of paths}.
+    """
+    require_profile_token(authorization)
+    sample_rate = payload.get("sample_rate", profiling.settings.sample_rate)
+    if not isinstance(sample_rate, (int, float)) or not 0 <= sample_rate <= 1:
+        raise HTTPException(status_code=400, detail="sample_rate must be a number between 0 and 1")
+    profiling.settings.sample_rate = float(sample_rate)
+    if "sample_paths" in payload:
+        profiling.settings.sample_paths = list(payload["sample_paths"])
+    logger.info(f"Profiling settings updated: {profiling.settings.as_dict()}")
+    return profiling.settings.as_dict()
+
+@app.get("/upstream-stats")
+def upstream_stats():
+    """
+    Reports requests, connections opened and connection reuse for each upstream pool.
+    """
+    return upstreams.registry.stats()
+
+@app.get("/admission-stats")
+def admission_stats():
+    """
+    Reports the limits, in-flight and queued requests and shed counts of each admission group.
+    """
+    return {group: limiter.stats() for group, limiter in admission.limiters.items()}
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """
+    Reports hit, miss and eviction counters for the backend caches.
+    """
+    mirror = await arxiv_mirror.aget()
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "image_embeddings": image_embedding_cache.stats(),
+        "rag_answers": answer_cache.stats(),
+        "tools": {name: cache.stats() for name, cache in tool_caches.items()},
+        "pdf": pdf_renderer.stats(),
+        "s3_listing": s3_listing_cache.stats(),
+        "arxiv_summaries": await asyncio.to_thread((await summary_store.aget()).stats),
+        "arxiv_mirror": await asyncio.to_thread(mirror.stats) if mirror is not None else None,
+    }
+
+@app.post("/rag-cache/invalidate")
+def invalidate_rag_cache(authorization: Annotated[str, Header()] = None):
+    """
+    Drops all cached RAG answers and RAG tool results. Call after ingesting documents when the BM25 index is not in use,
+    since that index is what otherwise signals new documents to the cache. Requires ADMIN_TOKEN, since a flush
+    sends every following query to NVIDIA at once.
+    """
+    require_admin_token(authorization)
+    answer_cache.invalidate()
+    tool_caches["rag"].clear()
+    return {"invalidated": True}
+
 @app.post("/convert-text-to-pdf")
 async def convert_text_to_pdf(payload: dict):
     """
     Endpoint to convert raw text to markdown and then convert markdown to PDF.
-    
+
+    Rendering runs on a bounded worker pool, and identical documents are served from a
+    content-hash cache without rendering again.
+
     Args:
         payload (dict): A dictionary containing the raw text.
-    
+
     Returns:
-        PDF file as a byte stream.
+        Response: The PDF as application/pdf, with an ETag of its content hash.
     """
-    logger.info(f"Received payload for text-to-pdf conversion: {payload}")
-    
     raw_text = payload.get("text", "")
-    
+    logger.info(f"Received text-to-pdf conversion request ({len(raw_text)} characters)")
+
     if not raw_text:
         raise HTTPException(status_code=400, detail="No text provided")
-    
+
     try:
         # Convert raw text to markdown
         markdown_content = markdown.markdown(raw_text)
-        
-        # Convert markdown to PDF using pdfkit
-        pdf_output = pdfkit.from_string(markdown_content, False)
-        
-        # Return PDF as a byte stream in response
-        return {"filename": "output.pdf", "pdf": pdf_output}
-    
+
+        # Convert markdown to PDF using pdfkit on the render pool
+        pdf_output, content_hash, cached = await pdf_renderer.render(markdown_content)
+
+        return Response(
+            content=pdf_output,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": 'attachment; filename="output.pdf"',
+                "ETag": f'"{content_hash}"',
+                "X-Cache": "hit" if cached else "miss",
+            },
+        )
+
+    except RenderQueueFull as e:
+        logger.warning(f"Rejected text-to-pdf conversion: {str(e)}")
+        raise HTTPException(status_code=503, detail="PDF rendering is busy, try again shortly", headers={"Retry-After": "2"})
+
     except Exception as e:
         logger.error(f"Error converting text to PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error converting text to PDF: {str(e)}")
@@ -0,0 +1,147 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Match
+
+# Upstream calls range from milliseconds (cache-backed embeddings) to tens of seconds (LLM generation)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by endpoint and status.", ["method", "endpoint", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time from request start until the last response byte is sent.",
+    ["method", "endpoint"], buckets=STAGE_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled.", ["endpoint"])
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds", "Time spent in each stage of a request.", ["stage"], buckets=STAGE_BUCKETS
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed calls to upstream services.", ["upstream", "stage"])
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Calls to upstream services in progress.", ["upstream"])
+ADMISSION_QUEUED = Gauge("admission_queued_requests", "Requests waiting for an admission slot.", ["group"])
+ADMISSION_SHED = Counter("admission_shed_total", "Requests rejected by admission control.", ["group", "reason"])
+
+UNMATCHED = "unmatched"
+
+
+class Stage:
+    """
+    A timed stage of request handling, optionally backed by an upstream service.
+
+    Label lookups happen once, here, so timing a call costs two clock reads and a few
+    lock-protected increments:
+
+        with metrics.GENERATION.time():
+            completion = await client.chat.completions.create(...)
+
+    An exception escaping the block counts as an upstream error; failures that are returned
+    rather than raised can be counted with error().
+    """
+
+    def __init__(self, name: str, upstream: str = None):
+        self.name = name
+        self.upstream = upstream
+        self.duration = STAGE_LATENCY.labels(stage=name)
+        self.errors = UPSTREAM_ERRORS.labels(upstream=upstream or "local", stage=name)
+        self.in_flight = UPSTREAM_IN_FLIGHT.labels(upstream=upstream) if upstream else None
+
+    def time(self):
+        return _StageTimer(self)
+
+    def error(self):
+        self.errors.inc()
+
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: Stage):
+        self.stage = stage
+
+    def __enter__(self):
+        if self.stage.in_flight is not None:
+            self.stage.in_flight.inc()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stage.duration.observe(time.perf_counter() - self.start)
+        if self.stage.in_flight is not None:
+            self.stage.in_flight.dec()
+        # Cancellation and generator shutdown are not upstream failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.stage.errors.inc()
+        return False
+
+
+ROUTING_LLM = Stage("routing_llm", upstream="openai")
+RETRIEVAL = Stage("retrieval")
+EMBEDDING = Stage("embedding", upstream="openai")
+IMAGE_EMBEDDING = Stage("image_embedding")
+GENERATION = Stage("generation", upstream="nvidia")
+ARXIV_FETCH = Stage("arxiv_fetch", upstream="arxiv")
+ARXIV_MIRROR = Stage("arxiv_mirror")
+SUMMARIZATION = Stage("summarization", upstream="openai")
+TAVILY = Stage("tavily", upstream="tavily")
+PDF_RENDER = Stage("pdf_render")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per endpoint.
+
+    Endpoints are labelled by route template ("/items/{id}", not "/items/42") so label
+    cardinality stays bounded; paths that match no route share the "unmatched" label.
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._static = {}  # path -> template, for routes without path parameters
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        endpoint = self.endpoint(scope)
+        status = "500"
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(endpoint=endpoint)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(time.perf_counter() - start)
+            REQUESTS.labels(method=method, endpoint=endpoint, status=status).inc()
+            in_flight.dec()
+
+    def endpoint(self, scope) -> str:
+        path = scope["path"]
+        template = self._static.get(path)
+        if template is not None:
+            return template
+
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match != Match.NONE:
+                if "{" not in route.path:
+                    self._static[path] = route.path
+                return route.path
+        return UNMATCHED
+
+
+def render_latest() -> tuple:
+    """
+    Returns the current metrics in the Prometheus text format, with its content type.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from apis import metrics
+from apis.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_QUEUE = int(os.getenv("PDF_RENDER_QUEUE", "16"))
+CACHE_BYTES = int(os.getenv("PDF_CACHE_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("PDF_CACHE_TTL", "86400"))
+
+
+class RenderQueueFull(Exception):
+    """Raised when every render worker is busy and the wait queue is at its limit."""
+
+
+def render_with_pdfkit(html: str) -> bytes:
+    import pdfkit
+
+    return pdfkit.from_string(html, False)
+
+
+class PdfRenderer:
+    """
+    Renders HTML to PDF on a bounded worker pool with a content-hash cache in front.
+
+    At most `workers` wkhtmltopdf processes run at once and at most `max_queue` renders wait
+    for a worker; beyond that, render() fails fast with RenderQueueFull instead of piling up.
+    Identical documents are rendered once: later requests are served from the cache and
+    concurrent ones share the in-flight render.
+    """
+
+    def __init__(self, render=render_with_pdfkit, workers: int = RENDER_WORKERS, max_queue: int = RENDER_QUEUE,
+                 cache_bytes: int = CACHE_BYTES, cache_ttl: float = CACHE_TTL):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.cache = TTLCache(max_entries=4096, ttl=cache_ttl, name="pdf", max_bytes=cache_bytes, sizeof=len)
+        self.renders = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self._render = render
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-render")
+        self._pending = 0
+        self._inflight = {}
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+    async def render(self, html: str) -> tuple:
+        """
+        Returns the PDF for `html`, rendering it only if it is not cached.
+
+        Args:
+            html (str): The document to render.
+
+        Returns:
+            tuple: (pdf bytes, content hash, whether it was served without rendering).
+
+        Raises:
+            RenderQueueFull: If the render would exceed the pool's queue limit.
+        """
+        key = self.content_hash(html)
+        pdf = self.cache.get(key)
+        if pdf is not None:
+            return pdf, key, True
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), key, True
+
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise RenderQueueFull(f"{self._pending} PDF renders already running or queued")
+
+        # Counted before the task starts so a burst of requests sees the queue fill up
+        self._pending += 1
+        task = asyncio.ensure_future(self._run(key, html))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), key, False
+
+    def stats(self) -> dict:
+        return {
+            "renders": self.renders,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "pending": self._pending,
+            "cache": self.cache.stats(),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, key, html):
+        try:
+            start = time.perf_counter()
+            with metrics.PDF_RENDER.time():
+                pdf = await asyncio.get_running_loop().run_in_executor(self._executor, self._render, html)
+            self.renders += 1
+            logger.info(f"Rendered PDF {key[:12]} ({len(pdf)} bytes) in {time.perf_counter() - start:.2f}s")
+        finally:
+            self._pending -= 1
+        self.cache.set(key, pdf)
+        return pdf
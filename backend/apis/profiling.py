@@ -0,0 +1,244 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import time
+import uuid
+from urllib.parse import parse_qs
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+# Profiling on request is off unless this is set, and the header or flag must then carry it as
+# "<mode>:<token>". The /admin/profiling endpoints are likewise only served when it is set, to
+# requests sending it as a bearer token.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+HEADER = b"x-profile"
+SUMMARY = "summary"
+
+
+class ProfilingSettings:
+    """
+    Runtime settings for automatic profiling, changed through the admin endpoint.
+    """
+
+    def __init__(self):
+        self.sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.sample_paths = [
+            path for path in os.getenv("PROFILE_SAMPLE_PATHS", "/smart-query,/rag-search").split(",") if path
+        ]
+
+    def as_dict(self) -> dict:
+        return {"sample_rate": self.sample_rate, "sample_paths": self.sample_paths, "directory": PROFILE_DIR}
+
+
+settings = ProfilingSettings()
+
+
+def load_profiler():
+    """
+    Returns the pyinstrument Profiler class, or None when pyinstrument is not installed.
+    """
+    try:
+        from pyinstrument import Profiler
+
+        return Profiler
+    except ImportError:
+        return None
+
+
+def await_seconds(frame) -> float:
+    """
+    Totals the time a profiled request spent waiting in awaits (upstream I/O, sleeps, locks).
+    """
+    from pyinstrument.frame import AWAIT_FRAME_IDENTIFIER
+
+    if frame is None:
+        return 0.0
+    if frame.identifier == AWAIT_FRAME_IDENTIFIER:
+        return frame.time
+    return sum(await_seconds(child) for child in frame.children)
+
+
+def summarize(profile_id: str, path: str, profiler, session) -> dict:
+    """
+    Builds the profile summary: wall time, CPU time, time spent awaiting and the call tree as text.
+    """
+    return {
+        "id": profile_id,
+        "path": path,
+        "duration": session.duration,
+        "cpu_time": session.cpu_time,
+        "await_time": await_seconds(session.root_frame()),
+        "call_tree": profiler.output_text(unicode=False, color=False),
+    }
+
+
+def save_profile(summary: dict, html: str, directory: str = None, max_files: int = None):
+    """
+    Writes a profile as an HTML flame view plus a JSON summary, then prunes the oldest profiles.
+    """
+    directory = directory or PROFILE_DIR
+    max_files = max_files or PROFILE_MAX_FILES
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{summary['id']}.html"), "w") as f:
+        f.write(html)
+    with open(os.path.join(directory, f"{summary['id']}.json"), "w") as f:
+        json.dump(summary, f)
+
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in profiles[:max(len(profiles) - max_files, 0)]:
+        for suffix in (".json", ".html"):
+            try:
+                os.remove(entry.path[:-len(".json")] + suffix)
+            except FileNotFoundError:
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles single requests on demand.
+
+    A request is profiled when it sends an `X-Profile` header or a `profile` query flag carrying
+    PROFILE_TOKEN ("summary:<token>"), or when it is picked by the admin-controlled sample rate. With "summary" as the value the response is
+    replaced by {"response": ..., "profile": ...}; otherwise the profile is saved to PROFILE_DIR
+    and its id returned in the `X-Profile-Id` header. pyinstrument runs in async mode, so time
+    spent awaiting upstreams is attributed to the request rather than lost.
+
+    Unprofiled requests only pay for a header scan. One request is profiled at a time; others
+    that ask while a profile is running are served normally with `X-Profile-Skipped: busy`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mode = self.requested_mode(scope)
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        Profiler = load_profiler()
+        if Profiler is None or self._busy:
+            reason = b"busy" if Profiler is not None else b"unavailable"
+            await self.app(scope, receive, with_headers(send, [(b"x-profile-skipped", reason)]))
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        self._busy = True
+        try:
+            if mode == SUMMARY:
+                await self.profile_summary(scope, receive, send, profiler, profile_id)
+            else:
+                await self.profile_saved(scope, receive, send, profiler, profile_id)
+        finally:
+            self._busy = False
+
+    def requested_mode(self, scope):
+        """
+        Returns "summary", "save" or None (do not profile) for a request.
+        """
+        value = None
+        for name, header in scope["headers"]:
+            if name == HEADER:
+                value = header.decode("latin-1")
+                break
+        if value is None and b"profile=" in scope["query_string"]:
+            value = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+
+        if value is not None:
+            mode, _, token = value.partition(":")
+            # Profiles expose source paths and hold the only profiler slot, so callers need the token
+            if not PROFILE_TOKEN or not secrets.compare_digest(token, PROFILE_TOKEN):
+                return None
+            if mode.lower() in ("0", "false", "off", ""):
+                return None
+            return SUMMARY if mode.lower() == SUMMARY else "save"
+
+        if settings.sample_rate > 0 and scope["path"] in settings.sample_paths and random.random() < settings.sample_rate:
+            return "save"
+        return None
+
+    async def profile_saved(self, scope, receive, send, profiler, profile_id):
+        profiler.start()
+        try:
+            await self.app(scope, receive, with_headers(send, [(b"x-profile-id", profile_id.encode())]))
+        finally:
+            session = profiler.stop()
+            summary = summarize(profile_id, scope["path"], profiler, session)
+            await asyncio.to_thread(save_profile, summary, profiler.output_html())
+            logger.info(
+                f"Profiled {scope['path']} as {profile_id}: {summary['duration']:.3f}s wall, "
+                f"{summary['cpu_time']:.3f}s CPU, {summary['await_time']:.3f}s awaiting"
+            )
+
+    async def profile_summary(self, scope, receive, send, profiler, profile_id):
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            session = profiler.stop()
+        summary = summarize(profile_id, scope["path"], profiler, session)
+
+        body = b"".join(chunks)
+        try:
+            original = json.loads(body)
+        except ValueError:
+            original = body.decode("utf-8", errors="replace")
+        payload = json.dumps({
+            "status": start.get("status", 500),
+            "response": original,
+            "profile": summary,
+        }).encode("utf-8")
+
+        # Keep the headers the app set (CORS, caching, ...), replacing only those describing the body
+        headers = [
+            (name, value) for name, value in start.get("headers", [])
+            if name.lower() not in (b"content-type", b"content-length")
+        ]
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                *headers,
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"x-profile-id", profile_id.encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+
+def with_headers(send, headers: list):
+    """
+    Wraps an ASGI send callable to add headers to the response start message.
+    """
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), *headers]}
+        await send(message)
+
+    return wrapped
@@ -0,0 +1,220 @@
+import logging
+import os
+import re
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ("web", "rag", "arxiv")
+
+# Keyword rules, checked first. A query that matches exactly one route is routed without scoring.
+KEYWORD_RULES = {
+    "arxiv": re.compile(r"\b(arxiv|papers?|preprints?|publications?|research on|literature|citations?|survey of)\b"),
+    "rag": re.compile(r"\b(rag|documents?|docs|pdfs?|uploaded|our files|knowledge base|in the report|figure|table \d+)\b"),
+    "web": re.compile(r"\b(web|news|latest|today|current(ly)?|prices?|cost|how much|weather|website|online|google|near me|opening hours)\b"),
+}
+
+# Seed queries for the nearest-centroid classifier. Each route's centroid is the mean of its embeddings.
+ROUTE_EXAMPLES = {
+    "web": [
+        "what is the weather in boston tomorrow",
+        "who won the game last night",
+        "stock price of nvidia",
+        "how do i install python on windows",
+        "best restaurants near me",
+        "when is the next apple event",
+        "how tall is the eiffel tower",
+        "release date of the new iphone",
+        "who is the ceo of openai",
+        "how to reset my router",
+        "what time is it in tokyo",
+        "cheap flights to london",
+        "what is the capital of australia",
+        "what are the rules of cricket",
+        "when does the world cup start",
+        "top rated headphones this year",
+    ],
+    "rag": [
+        "summarize the uploaded document",
+        "what does the report say about revenue",
+        "explain figure 3 in the file",
+        "what are the key findings in chapter two",
+        "list the recommendations from the handbook",
+        "what does section 4 of the guide describe",
+        "find the definition in our notes",
+        "what is the conclusion of the case study",
+        "according to the manual how do i configure it",
+        "what does the annual report say about risk",
+        "show the data from table 2",
+        "give me the main points of the whitepaper",
+    ],
+    "arxiv": [
+        "recent research on transformer architectures",
+        "state of the art in graph neural networks",
+        "studies on reinforcement learning from human feedback",
+        "academic work on diffusion models",
+        "new methods for protein structure prediction",
+        "theoretical analysis of stochastic gradient descent",
+        "benchmarks for large language model reasoning",
+        "approaches to federated learning privacy",
+        "quantum error correction algorithms",
+        "self supervised learning for computer vision",
+        "neural scaling laws",
+        "contrastive learning representation theory",
+    ],
+}
+
+EMBEDDING_DIM = 512
+MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.15"))
+MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.04"))
+MEMO_SIZE = int(os.getenv("ROUTER_MEMO_SIZE", "4096"))
+
+
+@dataclass
+class RouteDecision:
+    route: str
+    confidence: float
+    source: str  # "rules", "centroid", "llm" or "memo"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query for memoization: lowercase, punctuation stripped, whitespace collapsed.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+def embed_query(normalized: str) -> np.ndarray:
+    """
+    Embeds a normalized query with feature hashing over words, word bigrams and character trigrams.
+
+    This runs locally in microseconds, unlike a round trip to an embedding API.
+
+    Args:
+        normalized (str): A query already passed through normalize_query.
+
+    Returns:
+        np.ndarray: An L2-normalized vector of size EMBEDDING_DIM.
+    """
+    words = normalized.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature in features:
+        digest = zlib.crc32(feature.encode("utf-8"))
+        vector[digest % EMBEDDING_DIM] += 1.0 if digest & 0x80000000 else -1.0
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QueryRouter:
+    """
+    Picks 'web', 'rag' or 'arxiv' locally: keyword rules first, then a nearest-centroid
+    classifier. Only low-confidence queries are escalated to the LLM, and every decision
+    is memoized per normalized query.
+    """
+
+    def __init__(self, examples: dict = None, min_similarity: float = MIN_SIMILARITY,
+                 min_margin: float = MIN_MARGIN, memo_size: int = MEMO_SIZE):
+        examples = examples or ROUTE_EXAMPLES
+        self.routes = list(examples)
+        self.centroids = np.stack([
+            self._centroid([embed_query(normalize_query(text)) for text in examples[route]])
+            for route in self.routes
+        ])
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self.stats = {"rules": 0, "centroid": 0, "llm": 0, "memo": 0}
+
+    def classify(self, query: str):
+        """
+        Routes a query locally without any network call.
+
+        Args:
+            query (str): The user's query.
+
+        Returns:
+            RouteDecision: The local decision, or None when confidence is too low.
+        """
+        normalized = normalize_query(query)
+
+        matched = [route for route, pattern in KEYWORD_RULES.items() if pattern.search(normalized)]
+        if len(matched) == 1:
+            return RouteDecision(matched[0], 1.0, "rules")
+
+        scores = self.centroids @ embed_query(normalized)
+        order = np.argsort(scores)[::-1]
+        best, runner_up = float(scores[order[0]]), float(scores[order[1]])
+        if best < self.min_similarity or best - runner_up < self.min_margin:
+            return None
+        return RouteDecision(self.routes[order[0]], best - runner_up, "centroid")
+
+    def rank(self, query: str) -> list:
+        """
+        Orders every route by how well it fits the query: keyword-rule matches first, then by
+        centroid similarity. Used to pick several sources for one query.
+
+        Args:
+            query (str): The user's query.
+
+        Returns:
+            list: Route names, best first.
+        """
+        normalized = normalize_query(query)
+        scores = self.centroids @ embed_query(normalized)
+        matched = {route for route, pattern in KEYWORD_RULES.items() if pattern.search(normalized)}
+        order = sorted(
+            range(len(self.routes)),
+            key=lambda index: (self.routes[index] in matched, float(scores[index])),
+            reverse=True,
+        )
+        return [self.routes[index] for index in order]
+
+    async def route(self, query: str, fallback=None) -> RouteDecision:
+        """
+        Routes a query, escalating to `fallback` only when the local decision is not confident.
+
+        Args:
+            query (str): The user's query.
+            fallback (Optional): Async callable taking the query and returning a route name.
+
+        Returns:
+            RouteDecision: The chosen route and where the decision came from.
+        """
+        normalized = normalize_query(query)
+        if normalized in self._memo:
+            self._memo.move_to_end(normalized)
+            self.stats["memo"] += 1
+            decision = self._memo[normalized]
+            return RouteDecision(decision.route, decision.confidence, "memo")
+
+        decision = self.classify(query)
+        if decision is None and fallback is not None:
+            route = await fallback(query)
+            decision = RouteDecision(route, 0.0, "llm")
+        elif decision is None:
+            # No fallback available: take the nearest centroid anyway
+            scores = self.centroids @ embed_query(normalized)
+            decision = RouteDecision(self.routes[int(np.argmax(scores))], 0.0, "centroid")
+
+        self.stats[decision.source] += 1
+        if decision.route in ROUTES:
+            self._memo[normalized] = decision
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return decision
+
+    @staticmethod
+    def _centroid(vectors):
+        centroid = np.mean(vectors, axis=0)
+        return centroid / np.linalg.norm(centroid)
@@ -1,13 +1,23 @@
 import os
+import asyncio
+import hashlib
+import io
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 import logging
-from openai import OpenAI
-from pinecone import Pinecone  # Correct import for Pinecone v3.0+
-from langchain_pinecone import Pinecone as PineconeVectorStore  # Correct import for LangChain Pinecone
-from langchain_openai import OpenAIEmbeddings  # Updated import
-from transformers import CLIPProcessor, CLIPModel
-import torch
-import boto3  # Add for S3 integration
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from apis.cache import TTLCache, CachedQueryEmbeddings, SemanticAnswerCache
+from apis.resources import lazy
+from apis import upstreams
+from apis import metrics
+from apis.tool_cache import cached_tool
+from apis.ranking import reciprocal_rank_fusion
+from apis.context import pack_context
+from apis.sparse_index import BM25Index
+from langchain_core.documents import Document
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,124 +25,274 @@ load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Initialize Pinecone client using the new object-oriented approach (v3.0+)
-api_key = os.getenv("PINECONE_API_KEY")
-if not api_key:
-    logging.error("PINECONE_API_KEY is not set in the environment variables.")
-    raise ValueError("PINECONE_API_KEY is missing.")
-else:
-    logging.info("Pinecone API key loaded successfully.")
+# Clients, indexes and models below are built lazily (on first use or during warm-up), so importing
+# this module is fast and one unreachable service does not take the whole app down.
 
-pc = Pinecone(api_key=api_key)
-logging.info("Initialized Pinecone client.")
+# Vector backend: "pinecone" for the hosted indexes, "local" for the in-process LocalVectorIndex
+vector_backend = os.getenv("VECTOR_BACKEND", "pinecone")
+local_index_dir = os.getenv("LOCAL_INDEX_DIR", "data/indexes")
+
+def create_pinecone_client():
+    from pinecone import Pinecone  # Correct import for Pinecone v3.0+
+
+    # Initialize Pinecone client using the new object-oriented approach (v3.0+)
+    api_key = os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        logging.error("PINECONE_API_KEY is not set in the environment variables.")
+        raise ValueError("PINECONE_API_KEY is missing.")
+    else:
+        logging.info("Pinecone API key loaded successfully.")
+
+    pc = Pinecone(api_key=api_key)
+    logging.info("Initialized Pinecone client.")
+    return pc
+
+if vector_backend == "pinecone":
+    pinecone_client = lazy("rag.pinecone_client", create_pinecone_client)
 
 # Define index names
 image_index_name = "md-images"
 text_index_name = "md-text"
 
-# Initialize S3 client
-s3_client = boto3.client('s3')
+# Shared S3 client from the upstream registry
+s3_client = upstreams.s3_client
 s3_bucket_name = os.getenv('S3_BUCKET_NAME')
 
+# Function to look up the current ETag of an image in S3 without downloading it
+def get_image_etag(image_key):
+    try:
+        return s3_client.get().head_object(Bucket=s3_bucket_name, Key=image_key)['ETag']
+    except Exception as e:
+        logging.error(f"Failed to read image metadata from S3: {e}")
+        return None
+
 # Function to retrieve an image from S3
 def get_image_from_s3(image_key):
     try:
         logging.info(f"Retrieving image with key: {image_key} from S3.")
-        s3_object = s3_client.get_object(Bucket=s3_bucket_name, Key=image_key)
+        s3_object = s3_client.get().get_object(Bucket=s3_bucket_name, Key=image_key)
         return s3_object['Body'].read()  # Returns image binary data
     except Exception as e:
         logging.error(f"Failed to retrieve image from S3: {e}")
         return None
 
-# Check if image index exists, if not, create it
-if image_index_name not in pc.list_indexes().names():
-    logging.info(f"Index '{image_index_name}' does not exist. Creating a new index...")
-    pc.create_index(
-        name=image_index_name,
-        dimension=512,  # Dimension for image embeddings
-        metric='cosine'
-    )
-    logging.info(f"Index '{image_index_name}' created successfully.")
-else:
-    logging.info(f"Index '{image_index_name}' already exists.")
-
-# Connect to the existing Pinecone image index
-image_index = pc.Index(image_index_name)
-logging.info(f"Connected to Pinecone index: {image_index_name}")
-
-# Check if text index exists, if not, create it
-if text_index_name not in pc.list_indexes().names():
-    logging.info(f"Index '{text_index_name}' does not exist. Creating a new index...")
-    pc.create_index(
-        name=text_index_name,
-        dimension=1536,  # Dimension for text embeddings
-        metric='cosine'
-    )
-    logging.info(f"Index '{text_index_name}' created successfully.")
-else:
-    logging.info(f"Index '{text_index_name}' already exists.")
+def open_index(index_name: str, dimension: int):
+    """
+    Opens a vector index for the configured backend, creating it if it does not exist.
 
-# Connect to the existing Pinecone text index
-text_index = pc.Index(text_index_name)
-logging.info(f"Connected to Pinecone index: {text_index_name}")
+    Args:
+        index_name (str): The index name (a subdirectory of LOCAL_INDEX_DIR for the local backend).
+        dimension (int): The embedding dimension.
+
+    Returns:
+        The Pinecone Index or LocalVectorIndex, both usable by PineconeVectorStore.
+    """
+    if vector_backend == "local":
+        from apis.vector_index import LocalVectorIndex
+
+        index = LocalVectorIndex(os.path.join(local_index_dir, index_name), dimension=dimension, metric='cosine')
+        logging.info(f"Opened local vector index: {index_name}")
+        return index
+
+    pc = pinecone_client.get()
+
+    # Check if index exists, if not, create it
+    if index_name not in pc.list_indexes().names():
+        logging.info(f"Index '{index_name}' does not exist. Creating a new index...")
+        pc.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric='cosine'
+        )
+        logging.info(f"Index '{index_name}' created successfully.")
+    else:
+        logging.info(f"Index '{index_name}' already exists.")
+
+    # Connect to the existing Pinecone index
+    index = pc.Index(index_name)
+    logging.info(f"Connected to Pinecone index: {index_name}")
+    return index
+
+image_index = lazy("rag.image_index", lambda: open_index(image_index_name, 512))  # Dimension for image embeddings
+text_index = lazy("rag.text_index", lambda: open_index(text_index_name, 1536))  # Dimension for text embeddings
+
+# Initialize text embeddings using OpenAI's Ada model, caching query embeddings so repeated queries skip the API
+text_embedding_model = "text-embedding-ada-002"
+query_embedding_cache = TTLCache(
+    max_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "86400")),
+    name="query_embeddings",
+)
 
-# Initialize text embeddings using OpenAI's Ada model
-text_embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+def create_text_embeddings():
+    from langchain_openai import OpenAIEmbeddings  # Updated import
+
+    return CachedQueryEmbeddings(
+        OpenAIEmbeddings(model=text_embedding_model),
+        model=text_embedding_model,
+        cache=query_embedding_cache,
+    )
+
+text_embeddings = lazy("rag.text_embeddings", create_text_embeddings)
 
 # Load CLIP model and processor directly for image embeddings
 model_name = "openai/clip-vit-base-patch16"
-processor = CLIPProcessor.from_pretrained(model_name)
-clip_model = CLIPModel.from_pretrained(model_name)
+
+def load_clip():
+    from transformers import CLIPProcessor, CLIPModel
+
+    processor = CLIPProcessor.from_pretrained(model_name)
+    clip_model = CLIPModel.from_pretrained(model_name)
+    logging.info("CLIP model and processor loaded for image embeddings.")
+    return processor, clip_model
+
+clip = lazy("rag.clip", load_clip)
+
+# Image embeddings keyed by (S3 key, ETag), so a changed object is never served a stale embedding
+image_embedding_cache = TTLCache(
+    max_entries=int(os.getenv("IMAGE_EMBEDDING_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("IMAGE_EMBEDDING_CACHE_TTL", "86400")),
+    max_bytes=int(os.getenv("IMAGE_EMBEDDING_CACHE_BYTES", str(16 * 1024 * 1024))),
+    name="image_embeddings",
+)
+
+def decode_image(image_bytes: bytes):
+    """
+    Decodes raw image bytes from S3 into an RGB PIL image that the CLIP processor accepts.
+
+    Args:
+        image_bytes (bytes): The encoded image (PNG, JPEG, ...).
+
+    Returns:
+        PIL.Image.Image: The decoded image, or None if the bytes are not a readable image.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.convert("RGB")
+    except (UnidentifiedImageError, OSError) as e:
+        logging.error(f"Failed to decode image: {e}")
+        return None
 
 # Function to generate image embeddings using CLIP model
 def get_image_embedding(image):
+    import torch
+
+    processor, clip_model = clip.get()
     inputs = processor(images=image, return_tensors="pt")
     with torch.no_grad():
         embedding = clip_model.get_image_features(**inputs)
     return embedding.cpu().numpy().flatten()  # Flatten to 512-dimension vector
 
-logging.info("CLIP model and processor loaded for image embeddings.")
+def get_s3_image_embedding(image_key):
+    """
+    Returns the CLIP embedding of an image in S3, served from cache while its ETag is unchanged.
 
-# Initialize LangChain's Pinecone vector store for text
-text_vector_store = PineconeVectorStore(index=text_index, embedding=text_embeddings)
-logging.info("Initialized LangChain's Pinecone vector store for text.")
+    A HEAD request checks the ETag; only on a cache miss is the image downloaded, decoded and embedded.
 
-# Initialize LangChain's Pinecone vector store for images
-def image_embeddings(image):
-    embedding = get_image_embedding(image)
-    return embedding
+    Args:
+        image_key (str): The key of the image in S3.
 
-logging.info("Initialized custom image embeddings function for images.")
+    Returns:
+        np.ndarray: The 512-dimension embedding, or None if the image could not be read.
+    """
+    etag = get_image_etag(image_key)
+    if etag is None:
+        return None
 
-# Create retrievers using the vector stores' as_retriever method
-text_retriever = text_vector_store.as_retriever()
-logging.info("Text retriever created from the text vector store.")
+    cache_key = (image_key, etag)
+    embedding = image_embedding_cache.get(cache_key)
+    if embedding is not None:
+        logging.info(f"Image embedding for {image_key} served from cache.")
+        return embedding
 
-image_vector_store = PineconeVectorStore(index=image_index, embedding=image_embeddings)
-logging.info("Initialized LangChain's Pinecone vector store for images.")
+    image_bytes = get_image_from_s3(image_key)
+    if not image_bytes:
+        return None
+    image = decode_image(image_bytes)
+    if image is None:
+        return None
 
-# Create image retriever using the vector store's as_retriever method
-image_retriever = image_vector_store.as_retriever()
-logging.info("Image retriever created from the image vector store.")
+    with metrics.IMAGE_EMBEDDING.time():
+        embedding = get_image_embedding(image)
+    image_embedding_cache.set(cache_key, embedding)
+    return embedding
 
-# NVIDIA API Key and Client Initialization
-nvidia_api_key = os.getenv("NVIDIA_API_KEY")
-if not nvidia_api_key:
-    logging.error("NVIDIA_API_KEY is not set in the environment variables.")
-    raise ValueError("NVIDIA_API_KEY is missing.")
-else:
-    logging.info("NVIDIA API key loaded successfully.")
+# Custom embeddings function for the image vector store
+def image_embeddings(image):
+    embedding = get_image_embedding(image)
+    return embedding
+
+def create_text_retriever():
+    from langchain_pinecone import Pinecone as PineconeVectorStore  # Correct import for LangChain Pinecone
+
+    # Initialize LangChain's Pinecone vector store for text
+    text_vector_store = PineconeVectorStore(index=text_index.get(), embedding=text_embeddings.get())
+    logging.info("Initialized LangChain's Pinecone vector store for text.")
+
+    # Create retriever using the vector store's as_retriever method
+    retriever = text_vector_store.as_retriever()
+    logging.info("Text retriever created from the text vector store.")
+    return retriever
+
+def create_image_retriever():
+    from langchain_pinecone import Pinecone as PineconeVectorStore  # Correct import for LangChain Pinecone
+
+    # Initialize LangChain's Pinecone vector store for images
+    image_vector_store = PineconeVectorStore(index=image_index.get(), embedding=image_embeddings)
+    logging.info("Initialized LangChain's Pinecone vector store for images.")
+
+    # Create image retriever using the vector store's as_retriever method
+    retriever = image_vector_store.as_retriever()
+    logging.info("Image retriever created from the image vector store.")
+    return retriever
+
+text_retriever = lazy("rag.text_retriever", create_text_retriever)
+image_retriever = lazy("rag.image_retriever", create_image_retriever)
+
+# Hybrid retrieval: a local BM25 index over the same chunks, written by the ingestion pipeline,
+# catches exact-term queries (titles, acronyms, table labels) that dense retrieval misses
+hybrid_search = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+sparse_index_path = os.getenv("SPARSE_INDEX_PATH", "data/indexes/md-text-bm25.sqlite")
+sparse_top_k = int(os.getenv("SPARSE_TOP_K", "10"))
+hybrid_top_k = int(os.getenv("HYBRID_TOP_K", "6"))
+# How often the local indexes (BM25, and LocalVectorIndex with VECTOR_BACKEND=local) look for chunks
+# written by the ingestion pipeline in another process
+sparse_refresh_seconds = float(os.getenv("SPARSE_REFRESH_SECONDS", "30"))
+
+sparse_index = lazy("rag.sparse_index", lambda: BM25Index(sparse_index_path), required=False)
+_refreshed_at = {}
+_refresh_lock = threading.Lock()
+
+# Context packing: near-duplicate removal, MMR ordering and a token budget for the prompt
+context_packing = os.getenv("CONTEXT_PACKING", "true").lower() == "true"
+
+# Semantic answer cache: paraphrased queries that retrieve the same documents reuse the generated answer
+answer_cache_enabled = os.getenv("ANSWER_CACHE", "true").lower() == "true"
+answer_cache = SemanticAnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+)
 
-nvidia_api_url = "https://integrate.api.nvidia.com/v1"
 nvidia_model_name = "meta/llama3-8b-instruct"
 
-# Initialize the NVIDIA client using OpenAI's interface
-client = OpenAI(
-    base_url=nvidia_api_url,
-    api_key=nvidia_api_key
-)
+def create_nvidia_client():
+    # NVIDIA API Key and Client Initialization
+    nvidia_api_key = os.getenv("NVIDIA_API_KEY")
+    if not nvidia_api_key:
+        logging.error("NVIDIA_API_KEY is not set in the environment variables.")
+        raise ValueError("NVIDIA_API_KEY is missing.")
+    else:
+        logging.info("NVIDIA API key loaded successfully.")
 
-def call_nvidia_llama_api(prompt: str) -> dict:
+    # Initialize the async NVIDIA client using OpenAI's interface, on the pooled NVIDIA connections
+    return upstreams.create_openai_client("nvidia", nvidia_api_key)
+
+client = lazy("rag.nvidia_client", create_nvidia_client)
+
+async def call_nvidia_llama_api(prompt: str) -> dict:
     """
     Sends a prompt to the NVIDIA Llama3-8B-Instruct API and retrieves a response.
 
@@ -145,23 +305,239 @@ def call_nvidia_llama_api(prompt: str) -> dict:
     logging.info(f"Calling NVIDIA Llama3 API with prompt: {prompt[:50]}...")
 
     try:
-        completion = client.chat.completions.create(
+        with metrics.GENERATION.time():
+            completion = await client.get().chat.completions.create(
+                model=nvidia_model_name,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                max_tokens=200
+            )
+
+        return completion
+
+    except Exception as e:
+        logging.error(f"Failed to call NVIDIA API: {str(e)}")
+        return {"error": str(e)}
+
+async def stream_nvidia_llama_api(prompt: str):
+    """
+    Streams a response from the NVIDIA Llama3-8B-Instruct API token by token.
+
+    Args:
+        prompt (str): The input prompt for the Llama3-8B-Instruct model.
+
+    Yields:
+        str: Each chunk of generated text as soon as it arrives.
+    """
+    logging.info(f"Streaming NVIDIA Llama3 API with prompt: {prompt[:50]}...")
+
+    # Timed until the last token, so the histogram covers the whole generation
+    with metrics.GENERATION.time():
+        stream = await client.get().chat.completions.create(
             model=nvidia_model_name,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
-            max_tokens=200
+            max_tokens=200,
+            stream=True
         )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
-        return completion
+def refresh_index(name: str, index):
+    """
+    Picks up chunks ingested into a local index since its last refresh, at most once per refresh interval.
 
+    Args:
+        name (str): Which index, to track when it was last refreshed.
+        index: A BM25Index or LocalVectorIndex.
+    """
+    # Retrieval runs in worker threads; the first one due claims the refresh and the others skip it
+    with _refresh_lock:
+        if time.monotonic() - _refreshed_at.get(name, 0.0) <= sparse_refresh_seconds:
+            return
+        _refreshed_at[name] = time.monotonic()
+
+    if index.refresh():
+        # Newly ingested chunks can change what a query should be answered from. A rag_search call
+        # in flight (possibly this one) is not cached once it completes, since the clear comes first.
+        answer_cache.invalidate()
+        rag_search.cache.clear()
+
+async def retrieve_text_docs(query: str) -> list:
+    """
+    Retrieves relevant text documents from Pinecone. The query embedding is served from cache when possible.
+    """
+    retriever = await text_retriever.aget()
+    if vector_backend == "local":
+        await asyncio.to_thread(refresh_index, "text", text_index.get())
+    relevant_text_docs = await asyncio.to_thread(retriever.get_relevant_documents, query)
+    if relevant_text_docs:
+        logging.info(f"Retrieved {len(relevant_text_docs)} relevant text documents from Pinecone.")
+    else:
+        logging.warning("No relevant text documents found for the query.")
+    return relevant_text_docs
+
+def search_sparse_docs(query: str) -> list:
+    """
+    Searches the local BM25 index, first picking up chunks ingested since the last refresh.
+    """
+    index = sparse_index.get()
+    refresh_index("sparse", index)
+    return [
+        Document(page_content=metadata.get("content", ""), metadata={**metadata, "id": chunk_id})
+        for chunk_id, _, metadata in index.search(query, top_k=sparse_top_k)
+    ]
+
+async def retrieve_sparse_docs(query: str) -> list:
+    """
+    Retrieves text chunks by BM25 over the local inverted index. Returns nothing if hybrid search is off
+    or the index is unavailable, so dense retrieval still works on its own.
+    """
+    if not hybrid_search:
+        return []
+    try:
+        relevant_sparse_docs = await asyncio.to_thread(search_sparse_docs, query)
     except Exception as e:
-        logging.error(f"Failed to call NVIDIA API: {str(e)}")
-        return {"error": str(e)}
+        logging.error(f"BM25 retrieval failed: {e}")
+        return []
+    logging.info(f"Retrieved {len(relevant_sparse_docs)} text documents from the BM25 index.")
+    return relevant_sparse_docs
+
+async def retrieve_image_docs(image_key) -> list:
+    """
+    Retrieves relevant image documents from Pinecone for an input image stored in S3.
+    """
+    if image_key is None:
+        return []
+
+    logging.info("Image key provided. Embedding image from S3.")
+    image_embedding = await asyncio.to_thread(get_s3_image_embedding, image_key)
+    if image_embedding is None:
+        logging.error("Failed to retrieve image from S3.")
+        return []
+
+    logging.info("Image embedded. Performing image-based retrieval.")
+    retriever = await image_retriever.aget()
+    if vector_backend == "local":
+        await asyncio.to_thread(refresh_index, "image", image_index.get())
+    # Search by the embedding directly so CLIP does not run a second time inside the retriever
+    relevant_image_docs = await asyncio.to_thread(
+        retriever.vectorstore.similarity_search_by_vector,
+        image_embedding.tolist(),
+        **retriever.search_kwargs,
+    )
+    if relevant_image_docs:
+        logging.info(f"Retrieved {len(relevant_image_docs)} relevant image documents from Pinecone.")
+    else:
+        logging.warning("No relevant image documents found for the provided image.")
+    return relevant_image_docs
+
+async def retrieve_documents(query: str, image_key=None) -> tuple:
+    """
+    Retrieves relevant text and image documents for the query.
+
+    The dense text, BM25 and image branches run concurrently. Their Pinecone, S3 and CLIP calls are
+    blocking, so they are run in worker threads to keep the event loop free. Dense and BM25 text
+    results are merged with reciprocal rank fusion, then deduplicated and packed into the context
+    token budget.
+
+    Args:
+        query (str): The user's query.
+        image_key (Optional): The key of the input image in S3 for image-based retrieval.
+
+    Returns:
+        tuple: (text documents, image documents).
+    """
+    with metrics.RETRIEVAL.time():
+        dense_text_docs, sparse_text_docs, relevant_image_docs = await asyncio.gather(
+            retrieve_text_docs(query),
+            retrieve_sparse_docs(query),
+            retrieve_image_docs(image_key),
+        )
+
+    # Fuse dense and BM25 results by rank; the same chunk found by both counts once
+    relevant_text_docs = dense_text_docs
+    if sparse_text_docs:
+        relevant_text_docs = reciprocal_rank_fusion(
+            [dense_text_docs, sparse_text_docs], key=lambda doc: doc.page_content
+        )[:hybrid_top_k]
+
+    if context_packing:
+        # Deduplicate, rank by MMR and fit text and image documents into one token budget
+        image_docs = [Document(page_content=doc.page_content, metadata={**doc.metadata, "type": "image"})
+                      for doc in relevant_image_docs]
+        # Tokenizing, shingling and MMR are CPU-bound, so they run off the event loop
+        packed = await asyncio.to_thread(pack_context, query, relevant_text_docs + image_docs)
+        relevant_text_docs = [doc for doc in packed if doc.metadata.get("type") != "image"]
+        relevant_image_docs = [doc for doc in packed if doc.metadata.get("type") == "image"]
+    return relevant_text_docs, relevant_image_docs
+
+def format_rag_prompt(query: str, text_docs: list, image_docs: list) -> str:
+    """
+    Combines the query, text documents and image documents (if any) into the prompt for Llama3-8B-Instruct.
+    """
+    text_content = "\n".join([doc.page_content for doc in text_docs])
+    image_content = "\n".join([doc.page_content for doc in image_docs])
+    return f"Query: {query}\nText Documents: {text_content}\nImage Documents: {image_content}"
+
+async def build_rag_prompt(query: str, image_key=None) -> str:
+    """
+    Retrieves relevant text and image documents and combines them into a prompt.
 
-def rag_search(query: str, image_key=None) -> dict:
+    Args:
+        query (str): The user's query.
+        image_key (Optional): The key of the input image in S3 for image-based retrieval.
+
+    Returns:
+        str: The prompt for Llama3-8B-Instruct.
+    """
+    text_docs, image_docs = await retrieve_documents(query, image_key)
+    return format_rag_prompt(query, text_docs, image_docs)
+
+def document_key(doc) -> str:
+    """
+    Identifies a retrieved document: its vector id when known, otherwise a hash of its content.
+    """
+    return doc.metadata.get("id") or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+async def embed_query_for_answer_cache(query: str):
+    """
+    Embeds the query for the semantic answer cache. Retrieval embeds the same query right after,
+    and that call is then served by the query embedding cache.
+
+    Returns:
+        list: The query embedding, or None if the answer cache is disabled or embedding failed.
+    """
+    if not answer_cache_enabled:
+        return None
+    try:
+        embeddings = await text_embeddings.aget()
+        return await embeddings.aembed_query(query)
+    except Exception as e:
+        logging.error(f"Failed to embed query for the answer cache: {e}")
+        return None
+
+def completion_from_text(text: str) -> ChatCompletion:
+    """
+    Wraps a streamed answer in a ChatCompletion so it can be cached and served like a non-streamed one.
+    """
+    return ChatCompletion(
+        id=f"cached-{uuid.uuid4().hex}",
+        object="chat.completion",
+        created=int(time.time()),
+        model=nvidia_model_name,
+        choices=[Choice(index=0, finish_reason="stop", message=ChatCompletionMessage(role="assistant", content=text))],
+    )
+
+@cached_tool("rag", ttl=float(os.getenv("TOOL_CACHE_TTL_RAG", "300")))
+async def rag_search(query: str, image_key=None) -> dict:
     """
     Retrieves relevant text and image documents from Pinecone based on the query and generates a response using NVIDIA Llama3-8B-Instruct API.
 
+    A paraphrase of an earlier query that retrieves the same documents is answered from the semantic
+    answer cache without calling the LLM.
+
     Args:
         query (str): The user's query.
         image_key (Optional): The key of the input image in S3 for image-based retrieval.
@@ -170,36 +546,51 @@ def rag_search(query: str, image_key=None) -> dict:
         dict: The generated response from Llama3-8B-Instruct.
     """
     logging.info(f"Performing RAG search for query: {query}")
+    query_embedding = await embed_query_for_answer_cache(query)
+    text_docs, image_docs = await retrieve_documents(query, image_key)
+    document_ids = [document_key(doc) for doc in text_docs + image_docs]
 
-    # Retrieve relevant text documents from Pinecone
-    relevant_text_docs = text_retriever.get_relevant_documents(query)
-    if relevant_text_docs:
-        logging.info(f"Retrieved {len(relevant_text_docs)} relevant text documents from Pinecone.")
-    else:
-        logging.warning("No relevant text documents found for the query.")
-
-    # Retrieve relevant image documents if an image is provided
-    relevant_image_docs = []
-    if image_key is not None:
-        logging.info("Image key provided. Retrieving image from S3.")
-        image = get_image_from_s3(image_key)
-        if image:
-            logging.info("Image retrieved from S3. Performing image-based retrieval.")
-            image_embedding = get_image_embedding(image)
-            relevant_image_docs = image_retriever.get_relevant_documents(image_embedding)
-            if relevant_image_docs:
-                logging.info(f"Retrieved {len(relevant_image_docs)} relevant image documents from Pinecone.")
-            else:
-                logging.warning("No relevant image documents found for the provided image.")
-        else:
-            logging.error("Failed to retrieve image from S3.")
-
-    # Prepare the prompt by combining query, text documents, and image documents (if any)
-    text_content = "\n".join([doc.page_content for doc in relevant_text_docs])
-    image_content = "\n".join([doc.page_content for doc in relevant_image_docs])
-    prompt = f"Query: {query}\nText Documents: {text_content}\nImage Documents: {image_content}"
+    if query_embedding is not None:
+        cached_response = answer_cache.lookup(query_embedding, document_ids, scope=image_key)
+        if cached_response is not None:
+            logging.info("RAG answer served from the semantic answer cache.")
+            return cached_response
 
     # Call NVIDIA Llama3-8B-Instruct API to generate a response based on the combined prompt
-    llama_response = call_nvidia_llama_api(prompt)
+    llama_response = await call_nvidia_llama_api(format_rag_prompt(query, text_docs, image_docs))
 
+    if query_embedding is not None and not isinstance(llama_response, dict):
+        answer_cache.store(query_embedding, document_ids, llama_response, scope=image_key)
     return llama_response
+
+async def rag_search_stream(query: str, image_key=None):
+    """
+    Streaming variant of rag_search: retrieval runs first, then Llama3 tokens are yielded as they are generated.
+    A cached answer is yielded as a single chunk.
+
+    Args:
+        query (str): The user's query.
+        image_key (Optional): The key of the input image in S3 for image-based retrieval.
+
+    Yields:
+        str: Chunks of the generated response.
+    """
+    logging.info(f"Performing streaming RAG search for query: {query}")
+    query_embedding = await embed_query_for_answer_cache(query)
+    text_docs, image_docs = await retrieve_documents(query, image_key)
+    document_ids = [document_key(doc) for doc in text_docs + image_docs]
+
+    if query_embedding is not None:
+        cached_response = answer_cache.lookup(query_embedding, document_ids, scope=image_key)
+        if cached_response is not None:
+            logging.info("RAG answer served from the semantic answer cache.")
+            yield cached_response.choices[0].message.content
+            return
+
+    tokens = []
+    async for token in stream_nvidia_llama_api(format_rag_prompt(query, text_docs, image_docs)):
+        tokens.append(token)
+        yield token
+
+    if query_embedding is not None:
+        answer_cache.store(query_embedding, document_ids, completion_from_text("".join(tokens)), scope=image_key)
@@ -0,0 +1,22 @@
+def reciprocal_rank_fusion(result_lists: list, key=lambda item: item, k: int = 60) -> list:
+    """
+    Merges ranked result lists with reciprocal rank fusion: each item scores sum(1 / (k + rank))
+    over the lists it appears in. Only ranks are used, so lists with incomparable scores
+    (BM25 and cosine similarity, say) can be fused directly.
+
+    Args:
+        result_lists (list): Ranked lists, best first.
+        key (callable): Maps an item to the identity used to merge duplicates across lists.
+        k (int): Damping constant; larger values flatten the contribution of top ranks.
+
+    Returns:
+        list: The distinct items, best fused score first. The first occurrence of each item is kept.
+    """
+    scores = {}
+    items = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            identity = key(item)
+            scores[identity] = scores.get(identity, 0.0) + 1.0 / (k + rank)
+            items.setdefault(identity, item)
+    return [items[identity] for identity in sorted(scores, key=scores.get, reverse=True)]
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class LazyResource:
+    """
+    Builds an expensive client or model on first use, exactly once, even when several
+    threads ask for it at the same time. A failed build is not cached, so the next call retries.
+    """
+
+    def __init__(self, name: str, factory, required: bool = True):
+        self.name = name
+        self.required = required
+        self.error = None
+        self.init_seconds = None
+        self._factory = factory
+        self._value = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self):
+        """
+        Returns the resource, building it first if needed. Blocks while it is being built.
+        """
+        if self._ready:
+            return self._value
+
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"Failed to initialize {self.name}: {self.error}")
+                    raise
+                self.init_seconds = time.perf_counter() - start
+                self.error = None
+                self._ready = True
+                logger.info(f"Initialized {self.name} in {self.init_seconds:.2f}s")
+        return self._value
+
+    async def aget(self):
+        """
+        Async variant of get() that builds the resource in a worker thread instead of on the event loop.
+        """
+        if self._ready:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def status(self) -> dict:
+        return {
+            "ready": self._ready,
+            "required": self.required,
+            "error": self.error,
+            "init_seconds": self.init_seconds,
+        }
+
+
+# Every resource created through lazy(), in creation order
+registry = {}
+
+
+def lazy(name: str, factory, required: bool = True) -> LazyResource:
+    """
+    Creates a LazyResource and registers it for warm_up() and readiness().
+
+    Args:
+        name (str): A unique, human-readable name such as "rag.clip_model".
+        factory (callable): Builds the resource. Called at most once on success.
+        required (bool): Whether the service is not ready until this resource is.
+
+    Returns:
+        LazyResource: The registered resource.
+    """
+    resource = LazyResource(name, factory, required)
+    registry[name] = resource
+    return resource
+
+
+def warm_up(names: list = None, max_workers: int = 8) -> dict:
+    """
+    Builds the registered resources in parallel. Failures are logged and reported, not raised.
+
+    Args:
+        names (list): Resource names to build. Defaults to all registered resources.
+        max_workers (int): Number of resources built at the same time.
+
+    Returns:
+        dict: The status of every resource that was warmed up.
+    """
+    resources = [registry[name] for name in (names or list(registry))]
+    start = time.perf_counter()
+
+    def build(resource):
+        try:
+            resource.get()
+        except Exception:
+            pass
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warm-up") as pool:
+        list(pool.map(build, resources))
+
+    logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+    return {resource.name: resource.status() for resource in resources}
+
+
+def readiness() -> tuple:
+    """
+    Reports whether every required resource has been built.
+
+    Returns:
+        tuple: (ready, statuses) where statuses maps resource names to their status.
+    """
+    statuses = {name: resource.status() for name, resource in registry.items()}
+    ready = all(status["ready"] for status in statuses.values() if status["required"])
+    return ready, statuses
@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+# Very common English words carry almost no BM25 weight but have the longest posting lists
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with"
+    .split()
+)
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits text into lowercase terms. Dotted and hyphenated tokens such as "gpt-4" or "2401.00001"
+    are kept whole so exact identifiers still match.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Local inverted index with BM25 scoring over text chunks.
+
+    Postings are kept in memory for millisecond lookups and mirrored to SQLite so the index
+    survives restarts. Every change gets an increasing sequence number, which lets a reader in
+    another process (the API server) pick up chunks written by the ingestion pipeline with refresh().
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id TEXT PRIMARY KEY, "
+            "seq INTEGER NOT NULL, "
+            "terms TEXT NOT NULL, "
+            "metadata TEXT NOT NULL, "
+            "deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_seq ON chunks (seq)")
+        self._conn.commit()
+
+        self._ids = []            # row -> chunk id
+        self._rows = {}           # chunk id -> row, live chunks only
+        self._lengths = []        # row -> number of terms (0 once deleted)
+        self._metadata = []       # row -> metadata dict
+        self._doc_terms = []      # row -> terms of the chunk, to remove its postings on update
+        self._postings = {}       # term -> {row: term frequency}
+        self._arrays = {}         # term -> (rows, frequencies) as arrays, rebuilt lazily after changes
+        self._lengths_array = None
+        self._total_length = 0
+        self.seq = 0
+        self.refresh()
+
+    def add(self, chunks: list) -> int:
+        """
+        Indexes chunks, replacing any chunk with the same id.
+
+        Args:
+            chunks (list): (id, text, metadata) tuples.
+
+        Returns:
+            int: The number of chunks indexed.
+        """
+        records = []
+        with self._lock:
+            seq = self._next_seq()
+            for chunk_id, text, metadata in chunks:
+                terms = dict(Counter(tokenize(text)))
+                metadata = dict(metadata or {})
+                records.append((chunk_id, seq, json.dumps(terms), json.dumps(metadata)))
+                self._apply(chunk_id, terms, metadata)
+                seq += 1
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (id, seq, terms, metadata, deleted) VALUES (?, ?, ?, ?, 0)",
+                    records,
+                )
+            self.seq = seq - 1 if records else self.seq
+        return len(records)
+
+    def delete(self, ids: list) -> int:
+        """
+        Removes chunks by id. Unknown ids are ignored.
+
+        Returns:
+            int: The number of chunks removed.
+        """
+        with self._lock:
+            live = [chunk_id for chunk_id in ids if chunk_id in self._rows]
+            seq = self._next_seq()
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE chunks SET deleted = 1, seq = ? WHERE id = ?",
+                    [(seq + offset, chunk_id) for offset, chunk_id in enumerate(live)],
+                )
+            for chunk_id in live:
+                self._apply(chunk_id, None, None)
+            self.seq = seq + len(live) - 1 if live else self.seq
+        return len(live)
+
+    def refresh(self) -> int:
+        """
+        Loads chunks written to the SQLite file since the last load, e.g. by another process.
+
+        Returns:
+            int: The number of changed chunks picked up.
+        """
+        with self._lock:
+            changes = self._conn.execute(
+                "SELECT id, seq, terms, metadata, deleted FROM chunks WHERE seq > ? ORDER BY seq", (self.seq,)
+            ).fetchall()
+            for chunk_id, seq, terms, metadata, deleted in changes:
+                if deleted:
+                    self._apply(chunk_id, None, None)
+                else:
+                    self._apply(chunk_id, json.loads(terms), json.loads(metadata))
+                self.seq = seq
+        if changes:
+            logger.info(f"Loaded {len(changes)} changed chunks into the BM25 index at {self.path}")
+        return len(changes)
+
+    def search(self, query: str, top_k: int = 10) -> list:
+        """
+        Scores chunks against the query with BM25.
+
+        Args:
+            query (str): The user's query.
+            top_k (int): The number of results to return.
+
+        Returns:
+            list: (id, score, metadata) tuples, best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            if not self._rows or not terms:
+                return []
+
+            lengths = self._lengths_vector()
+            live = len(self._rows)
+            average_length = self._total_length / live
+            norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+
+            for term in terms:
+                postings = self._posting_arrays(term)
+                if postings is None:
+                    continue
+                rows, frequencies = postings
+                idf = np.log(1 + (live - len(rows) + 0.5) / (len(rows) + 0.5))
+                scores[rows] += idf * frequencies * (self.k1 + 1) / (frequencies + norms[rows])
+
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(scores[candidates], -top_k)[-top_k:]]
+            candidates = candidates[np.argsort(scores[candidates])[::-1]]
+            return [(self._ids[row], float(scores[row]), self._metadata[row]) for row in candidates]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"chunks": len(self._rows), "terms": len(self._postings), "seq": self.seq}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _next_seq(self) -> int:
+        stored = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM chunks").fetchone()[0]
+        return max(stored, self.seq) + 1
+
+    def _apply(self, chunk_id, terms, metadata):
+        """Updates the in-memory postings for one chunk. `terms` of None removes the chunk."""
+        row = self._rows.get(chunk_id)
+        if row is not None:
+            for term in self._doc_terms[row]:
+                postings = self._postings[term]
+                del postings[row]
+                if not postings:
+                    del self._postings[term]
+                self._arrays.pop(term, None)
+            self._total_length -= self._lengths[row]
+            self._lengths[row] = 0
+            self._doc_terms[row] = ()
+            self._metadata[row] = None
+
+        if terms is None:
+            if row is not None:
+                del self._rows[chunk_id]
+            self._lengths_array = None
+            return
+
+        if row is None:
+            row = len(self._ids)
+            self._ids.append(chunk_id)
+            self._lengths.append(0)
+            self._metadata.append(None)
+            self._doc_terms.append(())
+            self._rows[chunk_id] = row
+
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[row] = frequency
+            self._arrays.pop(term, None)
+        length = sum(terms.values())
+        self._lengths[row] = length
+        self._total_length += length
+        self._doc_terms[row] = tuple(terms)
+        self._metadata[row] = metadata
+        self._lengths_array = None
+
+    def _posting_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            rows = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            frequencies = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            arrays = self._arrays[term] = (rows, frequencies)
+        return arrays
+
+    def _lengths_vector(self):
+        if self._lengths_array is None:
+            self._lengths_array = np.asarray(self._lengths, dtype=np.float32)
+        return self._lengths_array
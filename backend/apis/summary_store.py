@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def abstract_hash(abstract: str) -> str:
+    """
+    Hashes an abstract so a summary is invalidated when the paper's text changes.
+
+    Args:
+        abstract (str): The full abstract text.
+
+    Returns:
+        str: The hex SHA-256 digest of the abstract.
+    """
+    return hashlib.sha256(abstract.encode("utf-8")).hexdigest()
+
+
+class SummaryStore:
+    """
+    Durable store for per-paper summaries: an in-memory LRU in front of a SQLite table.
+
+    Entries are keyed by Arxiv entry id plus a hash of the abstract, both tiers are
+    size-bounded with least-recently-used eviction, and the SQLite file survives restarts.
+    """
+
+    def __init__(self, path: str, max_entries: int = 50000, memory_entries: int = 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "entry_id TEXT NOT NULL, "
+            "abstract_hash TEXT NOT NULL, "
+            "summary TEXT NOT NULL, "
+            "last_used REAL NOT NULL, "
+            "PRIMARY KEY (entry_id, abstract_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries (last_used)")
+        self._conn.commit()
+        logger.info(f"Opened summary store at {path}")
+
+    def get_many(self, items: list) -> list:
+        """
+        Looks up summaries for several papers at once.
+
+        Args:
+            items (list): (entry_id, abstract) pairs.
+
+        Returns:
+            list: The cached summary for each pair, or None where there is none.
+        """
+        keys = [(entry_id, abstract_hash(abstract)) for entry_id, abstract in items]
+        results = [None] * len(keys)
+        now = time.time()
+
+        with self._lock:
+            disk_keys = []
+            for idx, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[idx] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    disk_keys.append((idx, key))
+
+            found = []
+            for idx, key in disk_keys:
+                row = self._conn.execute(
+                    "SELECT summary FROM summaries WHERE entry_id = ? AND abstract_hash = ?", key
+                ).fetchone()
+                if row:
+                    results[idx] = row[0]
+                    found.append(key)
+                    self._remember(key, row[0])
+
+            # Refresh recency so popular papers are the last to be evicted from disk
+            hit_keys = [key for key, result in zip(keys, results) if result is not None]
+            if hit_keys:
+                self._conn.executemany(
+                    "UPDATE summaries SET last_used = ? WHERE entry_id = ? AND abstract_hash = ?",
+                    [(now, *key) for key in hit_keys],
+                )
+                self._conn.commit()
+
+            self.hits += len(hit_keys)
+            self.misses += len(keys) - len(hit_keys)
+
+        return results
+
+    def put_many(self, items: list):
+        """
+        Stores summaries for several papers and evicts the least recently used ones over the limit.
+
+        Args:
+            items (list): (entry_id, abstract, summary) triples.
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = [(entry_id, abstract_hash(abstract), summary, now) for entry_id, abstract, summary in items]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO summaries (entry_id, abstract_hash, summary, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            for entry_id, digest, summary, _ in rows:
+                self._remember((entry_id, digest), summary)
+
+            overflow = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE rowid IN "
+                    "(SELECT rowid FROM summaries ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+                logger.info(f"Evicted {overflow} summaries from the summary store.")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Returns hit, miss and eviction counters plus the current size of both tiers.
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "evictions": self.evictions,
+                "memory_size": len(self._memory),
+                "size": size,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, key, summary):
+        # Caller holds the lock
+        self._memory[key] = summary
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from apis.cache import TTLCache, normalize_text
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Optional on-disk tier shared by all tools; disabled unless a directory is configured
+CACHE_DIR = os.getenv("TOOL_CACHE_DIR")
+MEMORY_ENTRIES = int(os.getenv("TOOL_CACHE_SIZE", "2048"))
+
+
+class DiskTier:
+    """
+    SQLite-backed second tier for JSON-serializable tool results, so cached results survive restarts.
+    """
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            if row[1] < time.time():
+                with self._conn:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return _MISSING
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: float):
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError):
+            return  # Not JSON-serializable (e.g. a ChatCompletion); kept in memory only
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, encoded, time.time() + ttl),
+            )
+
+    def clear(self, prefix: str = ""):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results WHERE key LIKE ?", (prefix + "%",))
+
+
+class ToolResultCache:
+    """
+    Caches the results of one tool with an in-memory tier, an optional on-disk tier and
+    single-flight coalescing: concurrent calls with the same arguments share one upstream call.
+
+    Results carrying an "error" key, or rejected by the optional `cacheable` predicate, are
+    returned but never cached. clear() bumps a generation
+    number, and a call that started before the clear is returned to its callers but not cached,
+    since it may have been computed from the data the clear invalidated.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int = MEMORY_ENTRIES, disk: DiskTier = None,
+                 cacheable=None):
+        self.name = name
+        self.ttl = ttl
+        self.cacheable = cacheable
+        self.memory = TTLCache(max_entries=max_entries, ttl=ttl, name=name)
+        self.disk = disk
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.upstream_calls = 0
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> (task, generation it started in)
+
+    async def call(self, key: str, compute):
+        """
+        Returns the cached result for `key`, or awaits `compute()` once for all concurrent callers.
+
+        Args:
+            key (str): Identifies the call's arguments.
+            compute (callable): Zero-argument coroutine function that calls the upstream.
+        """
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # A call started before the last clear() may be stale, so it is not joined
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[1] == self.generation:
+            self.coalesced += 1
+            return await asyncio.shield(inflight[0])
+
+        generation = self.generation
+        task = asyncio.ensure_future(self._load(key, compute, generation))
+        self._inflight[key] = (task, generation)
+        task.add_done_callback(lambda done: self._forget(key, done))
+        # Shielded so one caller giving up does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def clear(self):
+        """
+        Drops every cached result. Safe to call from worker threads and from inside a call being cached.
+        """
+        with self._lock:
+            self.generation += 1
+            self.memory.clear()
+            if self.disk is not None:
+                self.disk.clear(f"{self.name}:")
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        # Every call is counted once by the memory tier; coalesced and disk-served calls are memory misses
+        lookups = memory["hits"] + memory["misses"]
+        served = memory["hits"] + self.disk_hits + self.coalesced
+        return {
+            "hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "misses": lookups - served,
+            "upstream_calls": self.upstream_calls,
+            "size": memory["size"],
+            "hit_rate": served / lookups if lookups else 0.0,
+        }
+
+    async def _load(self, key, compute, generation):
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not _MISSING:
+                self.disk_hits += 1
+                self._store(key, value, generation, disk=False)
+                return value
+
+        self.upstream_calls += 1
+        value = await compute()
+        if self._is_cacheable(value):
+            if self.disk is not None:
+                await asyncio.to_thread(self._store, key, value, generation)
+            else:
+                self._store(key, value, generation)
+        return value
+
+    def _is_cacheable(self, value) -> bool:
+        if isinstance(value, dict) and "error" in value:
+            return False
+        return self.cacheable is None or self.cacheable(value)
+
+    def _store(self, key, value, generation, disk=True):
+        # Checked under the lock so a clear() from another thread cannot land between the check and the write
+        with self._lock:
+            if generation != self.generation:
+                return
+            self.memory.set(key, value)
+            if disk and self.disk is not None:
+                self.disk.set(key, value, self.ttl)
+
+    def _forget(self, key, task):
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] is task:
+            del self._inflight[key]
+
+
+# Every tool cache, by tool name, for /cache-stats
+tool_caches = {}
+_disk = DiskTier(os.path.join(CACHE_DIR, "tool_results.sqlite")) if CACHE_DIR else None
+
+
+def cache_key(name: str, arguments: dict) -> str:
+    """
+    Builds a cache key from a tool's bound arguments, with string arguments whitespace-normalized.
+    """
+    normalized = {
+        key: normalize_text(value) if isinstance(value, str) else value
+        for key, value in sorted(arguments.items())
+    }
+    return f"{name}:{json.dumps(normalized, default=str)}"
+
+
+def cached_tool(name: str, ttl: float, cacheable=None):
+    """
+    Decorates an async tool function with a shared ToolResultCache.
+
+    Apply it below @tool so LangChain still sees the original signature and docstring.
+    The REST endpoints and the LangGraph ToolNode then share the same cache.
+
+    Args:
+        name (str): The tool name, used in keys and in /cache-stats.
+        ttl (float): Seconds a result stays fresh.
+        cacheable (callable): Optional predicate on a result; results it rejects are not cached,
+            e.g. partial results whose failed parts should be retried on the next call.
+    """
+    cache = tool_caches[name] = ToolResultCache(name, ttl, disk=_disk, cacheable=cacheable)
+
+    def decorator(function):
+        signature = inspect.signature(function)
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            # Bind to the signature so positional and keyword calls share a key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return await cache.call(cache_key(name, bound.arguments), lambda: function(*args, **kwargs))
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
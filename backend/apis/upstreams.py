@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+import httpx
+
+from apis.resources import lazy
+
+logger = logging.getLogger(__name__)
+
+# Extra requests per upstream at startup so the first real requests find open connections
+WARM_CONNECTIONS = int(os.getenv("UPSTREAM_WARM_CONNECTIONS", "2"))
+
+
+@dataclass
+class UpstreamConfig:
+    """
+    Pool and timeout settings for one upstream, overridable per upstream with UPSTREAM_<NAME>_* variables.
+    """
+
+    name: str
+    base_url: str
+    max_connections: int = 50
+    max_keepalive: int = 20
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 60.0
+
+    @classmethod
+    def from_env(cls, name: str, base_url: str, **defaults):
+        config = cls(name=name, base_url=base_url, **defaults)
+        prefix = f"UPSTREAM_{name.upper()}_"
+        config.base_url = os.getenv(prefix + "BASE_URL", config.base_url)
+        config.max_connections = int(os.getenv(prefix + "MAX_CONNECTIONS", config.max_connections))
+        config.max_keepalive = int(os.getenv(prefix + "MAX_KEEPALIVE", config.max_keepalive))
+        config.keepalive_expiry = float(os.getenv(prefix + "KEEPALIVE_EXPIRY", config.keepalive_expiry))
+        config.connect_timeout = float(os.getenv(prefix + "CONNECT_TIMEOUT", config.connect_timeout))
+        config.read_timeout = float(os.getenv(prefix + "READ_TIMEOUT", config.read_timeout))
+        return config
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an httpx transport to count requests and the connections opened to serve them.
+    A request that opens no TCP connection reused a pooled one.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        upstream_trace = request.extensions.get("trace")
+
+        async def trace(event, info):
+            if event == "connection.connect_tcp.complete":
+                self.connections += 1
+            elif event == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+            if upstream_trace is not None:
+                await upstream_trace(event, info)
+
+        request.extensions["trace"] = trace
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def stats(self) -> dict:
+        reused = max(self.requests - self.connections, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "tls_handshakes": self.tls_handshakes,
+            "reused": reused,
+            "reuse_rate": reused / self.requests if self.requests else 0.0,
+        }
+
+
+class UpstreamRegistry:
+    """
+    Owns one pooled, keep-alive HTTP client per upstream so every module shares its connections.
+    """
+
+    def __init__(self):
+        self.configs = {}
+        self._transports = {}
+        self._lock = threading.Lock()
+
+    def register(self, config: UpstreamConfig):
+        self.configs[config.name] = config
+
+    def http_client(self, name: str, **kwargs) -> httpx.AsyncClient:
+        """
+        Builds the pooled client for an upstream. Called once per upstream by its lazy resource.
+        """
+        config = self.configs[name]
+        transport = CountingTransport(httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+        ))
+        with self._lock:
+            self._transports[name] = transport
+        return httpx.AsyncClient(base_url=config.base_url, timeout=config.timeout, transport=transport, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            transports = dict(self._transports)
+        return {
+            name: {
+                **(transports[name].stats() if name in transports else {"requests": 0}),
+                "max_connections": config.max_connections,
+                "max_keepalive": config.max_keepalive,
+            }
+            for name, config in self.configs.items()
+        }
+
+    async def warm(self, clients: dict, connections: int = WARM_CONNECTIONS) -> dict:
+        """
+        Opens `connections` keep-alive connections to each upstream with HEAD requests, so the
+        TCP and TLS handshakes happen at startup instead of on the first user request.
+
+        Args:
+            clients (dict): Upstream name -> lazy resource of its pooled httpx client.
+
+        Returns:
+            dict: Upstream name -> True if it answered, or the error message.
+        """
+        async def warm_one(name, resource):
+            client = await resource.aget()
+            try:
+                await asyncio.gather(*[client.head("/") for _ in range(connections)])
+                return name, True
+            except Exception as e:
+                logger.warning(f"Could not pre-connect to {name}: {e}")
+                return name, str(e)
+
+        results = dict(await asyncio.gather(*[warm_one(name, resource) for name, resource in clients.items()]))
+        logger.info(f"Pre-connected upstream pools: {results}")
+        return results
+
+
+registry = UpstreamRegistry()
+registry.register(UpstreamConfig.from_env("openai", "https://api.openai.com/v1"))
+registry.register(UpstreamConfig.from_env("nvidia", "https://integrate.api.nvidia.com/v1", read_timeout=120.0))
+registry.register(UpstreamConfig.from_env("tavily", "https://api.tavily.com", read_timeout=180.0))
+registry.register(UpstreamConfig.from_env("arxiv", "http://export.arxiv.org", read_timeout=30.0))
+
+# boto3 manages its own urllib3 pool; only its pool size and timeouts come from here
+s3_config = UpstreamConfig.from_env("s3", "")
+
+
+def create_openai_client(name: str, api_key: str):
+    from openai import AsyncOpenAI
+
+    config = registry.configs[name]
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=config.base_url,
+        timeout=config.timeout,
+        http_client=http_clients[name].get(),
+    )
+
+
+def create_tavily_client(api_key: str):
+    """
+    Builds an AsyncTavilyClient that borrows the pooled client. Left alone, the SDK opens and
+    closes a new httpx client for every search and pays a TLS handshake each time.
+
+    This replaces the SDK's private _client_creator, which is why tavily-python is pinned to
+    the exact version this was verified against.
+    """
+    from tavily import AsyncTavilyClient
+
+    http_client = http_clients["tavily"].get()
+
+    @asynccontextmanager
+    async def borrowed():
+        yield http_client
+
+    client = AsyncTavilyClient(api_key=api_key)
+    if not hasattr(client, "_client_creator"):
+        logger.warning("AsyncTavilyClient has no _client_creator; Tavily searches will not use the connection pool")
+        return client
+    client._client_creator = borrowed
+    return client
+
+
+def create_s3_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_REGION"),
+        config=Config(
+            max_pool_connections=s3_config.max_connections,
+            connect_timeout=s3_config.connect_timeout,
+            read_timeout=s3_config.read_timeout,
+            tcp_keepalive=True,
+            retries={"max_attempts": 3, "mode": "standard"},
+        ),
+    )
+
+
+# Pooled HTTP clients, by upstream
+http_clients = {
+    "openai": lazy("upstreams.openai_http", lambda: registry.http_client("openai")),
+    "nvidia": lazy("upstreams.nvidia_http", lambda: registry.http_client("nvidia")),
+    "tavily": lazy("upstreams.tavily_http", lambda: registry.http_client(
+        "tavily", headers={"Content-Type": "application/json"}
+    )),
+    "arxiv": lazy("upstreams.arxiv_http", lambda: registry.http_client("arxiv")),
+}
+
+# Upstream API clients shared by every module
+openai_client = lazy("upstreams.openai", lambda: create_openai_client("openai", os.getenv("OPENAI_API_KEY")))
+tavily_client = lazy("upstreams.tavily", lambda: create_tavily_client(os.getenv("TAVILY_API_KEY")))
+s3_client = lazy("upstreams.s3", create_s3_client)
+
+
+async def warm_connections() -> dict:
+    """
+    Pre-connects every HTTP upstream pool; see UpstreamRegistry.warm.
+    """
+    return await registry.warm(http_clients)
@@ -0,0 +1,538 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Below this many vectors "auto" mode uses exact search; above it, the IVF index
+IVF_THRESHOLD = int(os.getenv("LOCAL_INDEX_IVF_THRESHOLD", "50000"))
+DEFAULT_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "16"))
+
+
+class LocalVectorIndex:
+    """
+    In-process vector index with the same upsert/query/delete/describe_index_stats surface
+    as a Pinecone Index, so it can be passed to LangChain's PineconeVectorStore or to the
+    Airflow upload helpers unchanged.
+
+    Vectors live in a memory-mapped .npy file and ids/metadata in SQLite, so reopening an
+    index is instant. Search is exact NumPy brute force for small corpora and an inverted-file
+    (IVF) approximate search, trained with spherical k-means, for large ones. The ingestion
+    pipeline trains the IVF index with ensure_ivf(); a reader that finds none trains it in a
+    background thread and searches exactly until it is swapped in.
+
+    Every upsert and delete stamps its rows with an increasing sequence number, so a reader in
+    another process (the API server) can pick up vectors written by the ingestion pipeline with refresh(),
+    along with the IVF index it saved.
+    """
+
+    def __init__(self, path: str, dimension: int, metric: str = "cosine", mode: str = "auto",
+                 nprobe: int = DEFAULT_NPROBE, ivf_threshold: int = IVF_THRESHOLD):
+        if metric not in ("cosine", "dotproduct"):
+            raise ValueError(f"Unsupported metric: {metric}")
+        if mode not in ("auto", "exact", "ivf"):
+            raise ValueError(f"Unsupported search mode: {mode}")
+
+        self.path = path
+        self.dimension = dimension
+        self.metric = metric
+        self.mode = mode
+        self.nprobe = nprobe
+        self.ivf_threshold = ivf_threshold
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self._check_manifest()
+
+        self._conn = sqlite3.connect(os.path.join(path, "items.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            "row INTEGER PRIMARY KEY, "
+            "id TEXT NOT NULL UNIQUE, "
+            "metadata TEXT NOT NULL, "
+            "deleted INTEGER NOT NULL DEFAULT 0, "
+            "seq INTEGER NOT NULL DEFAULT 0)"
+        )
+        if "seq" not in {column[1] for column in self._conn.execute("PRAGMA table_info(items)")}:
+            # Indexes created before refresh() existed
+            self._conn.execute("ALTER TABLE items ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_items_seq ON items (seq)")
+        self._conn.commit()
+
+        self.seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM items").fetchone()[0]
+        items = self._conn.execute("SELECT row, id, deleted FROM items ORDER BY row").fetchall()
+        self._count = items[-1][0] + 1 if items else 0
+        self._ids = [None] * self._count
+        self._rows = {}
+
+        self._vectors = self._open_vectors(max(self._count, 1024))
+        # Rows with no live item (deleted, or vacated by a re-inserted id) are tombstoned
+        self._deleted = np.ones(self._vectors.shape[0], dtype=bool)
+        self._deleted[self._count:] = False
+        for row, item_id, deleted in items:
+            self._ids[row] = item_id
+            if not deleted:
+                self._rows[item_id] = row
+                self._deleted[row] = False
+
+        self._centroids = None
+        self._assignments = None
+        self._lists = None
+        self._ivf_version = None
+        self._ivf_thread = None
+        self._load_ivf()
+        logger.info(f"Opened local vector index at {path} with {len(self._rows)} vectors")
+
+    # Pinecone-compatible API
+
+    def upsert(self, vectors: list, namespace: str = None, **kwargs) -> dict:
+        """
+        Inserts or overwrites vectors.
+
+        Args:
+            vectors (list): Dicts with "id", "values" and optional "metadata", or (id, values[, metadata]) tuples.
+
+        Returns:
+            dict: {"upserted_count": n}, as returned by Pinecone.
+        """
+        self._check_namespace(namespace)
+        records = [self._as_record(vector) for vector in vectors]
+        if not records:
+            return {"upserted_count": 0}
+
+        values = self._prepare(np.asarray([record[1] for record in records], dtype=np.float32))
+
+        with self._lock:
+            rows = []
+            seq = self._next_seq()
+            for item_id, _, metadata in records:
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = self._count
+                    self._count += 1
+                    self._ids.append(item_id)
+                    self._rows[item_id] = row
+                    self._conn.execute(
+                        "INSERT INTO items (row, id, metadata, seq) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET row = excluded.row, metadata = excluded.metadata, "
+                        "deleted = 0, seq = excluded.seq",
+                        (row, item_id, json.dumps(metadata), seq),
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE items SET metadata = ?, seq = ? WHERE row = ?", (json.dumps(metadata), seq, row)
+                    )
+                rows.append(row)
+                seq += 1
+            self.seq = seq - 1
+
+            self._ensure_capacity(self._count)
+            self._vectors[rows] = values
+            self._deleted[rows] = False
+            self._vectors.flush()
+            self._conn.commit()
+
+            if self._centroids is not None:
+                self._assignments = self._grow(self._assignments, self._count, fill=-1)
+                self._assignments[rows] = self._assign(values)
+                self._lists = None
+
+        return {"upserted_count": len(records)}
+
+    def query(self, vector=None, top_k: int = 10, include_metadata: bool = False, include_values: bool = False,
+              namespace: str = None, filter: dict = None, id: str = None, **kwargs) -> dict:
+        """
+        Finds the top_k most similar vectors.
+
+        Args:
+            vector (list): The query vector. Alternatively pass `id` to query by a stored vector.
+            top_k (int): Number of matches to return.
+            include_metadata (bool): Attach each match's metadata.
+            include_values (bool): Attach each match's stored vector.
+            filter (dict): Equality filter on metadata fields, applied to the candidates.
+
+        Returns:
+            dict: {"matches": [{"id", "score", ...}], "namespace": ""}.
+        """
+        self._check_namespace(namespace)
+        with self._lock:
+            if vector is None:
+                if id not in self._rows:
+                    return {"matches": [], "namespace": ""}
+                query = np.array(self._vectors[self._rows[id]])
+            else:
+                query = self._prepare(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+
+            # Over-fetch when filtering, since the filter is applied after scoring
+            fetch_k = top_k if not filter else max(top_k * 10, 100)
+            if self._use_ivf():
+                rows, scores = self._search_ivf(query, fetch_k)
+            else:
+                rows, scores = self._search_exact(query, fetch_k)
+
+            matches = []
+            metadata = self._metadata(rows) if (include_metadata or filter) else {}
+            for row, score in zip(rows, scores):
+                row_metadata = metadata.get(row, {})
+                if filter and any(row_metadata.get(key) != value for key, value in filter.items()):
+                    continue
+                match = {"id": self._ids[row], "score": float(score)}
+                if include_metadata:
+                    match["metadata"] = row_metadata
+                if include_values:
+                    match["values"] = self._vectors[row].tolist()
+                matches.append(match)
+                if len(matches) == top_k:
+                    break
+
+        return {"matches": matches, "namespace": ""}
+
+    def fetch(self, ids: list, namespace: str = None) -> dict:
+        """
+        Returns the stored values and metadata for the given ids.
+        """
+        self._check_namespace(namespace)
+        with self._lock:
+            rows = [self._rows[item_id] for item_id in ids if item_id in self._rows]
+            metadata = self._metadata(rows)
+            return {"vectors": {
+                self._ids[row]: {"id": self._ids[row], "values": self._vectors[row].tolist(), "metadata": metadata.get(row, {})}
+                for row in rows
+            }}
+
+    def delete(self, ids: list = None, delete_all: bool = False, namespace: str = None, **kwargs) -> dict:
+        """
+        Deletes vectors by id (or all of them). Rows are tombstoned and skipped by search.
+        """
+        self._check_namespace(namespace)
+        with self._lock:
+            targets = list(self._rows) if delete_all else [item_id for item_id in (ids or []) if item_id in self._rows]
+            rows = [self._rows.pop(item_id) for item_id in targets]
+            self._deleted[rows] = True
+            seq = self._next_seq()
+            self._conn.executemany(
+                "UPDATE items SET deleted = 1, seq = ? WHERE row = ?",
+                [(seq + offset, row) for offset, row in enumerate(rows)],
+            )
+            self._conn.commit()
+            self.seq = seq + len(rows) - 1 if rows else self.seq
+        return {}
+
+    def refresh(self) -> int:
+        """
+        Loads vectors upserted or deleted since the last load, e.g. by the ingestion pipeline in another process.
+
+        Returns:
+            int: The number of changed vectors picked up.
+        """
+        with self._lock:
+            changes = self._conn.execute(
+                "SELECT row, id, deleted, seq FROM items WHERE seq > ? ORDER BY seq", (self.seq,)
+            ).fetchall()
+            if changes:
+                self._apply_changes(changes)
+            # A writer that built or saved the IVF index replaced ivf.npz
+            if self._file_version(self._ivf_path()) not in (None, self._ivf_version):
+                self._load_ivf()
+                logger.info(f"Loaded the IVF index saved for the local vector index at {self.path}")
+
+        if changes:
+            logger.info(f"Loaded {len(changes)} changed vectors into the local vector index at {self.path}")
+        return len(changes)
+
+    def describe_index_stats(self, **kwargs) -> dict:
+        with self._lock:
+            return {
+                "dimension": self.dimension,
+                "index_fullness": 0.0,
+                "total_vector_count": len(self._rows),
+                "namespaces": {"": {"vector_count": len(self._rows)}},
+                "search_mode": "ivf" if self._use_ivf() else "exact",
+            }
+
+    # Approximate search
+
+    def ensure_ivf(self):
+        """
+        Builds the IVF index once the index is large enough for search to use it. The ingestion
+        pipeline calls this after writing, so readers load the trained index instead of training it.
+        """
+        with self._lock:
+            needed = self._wants_ivf() and self._centroids is None
+        if needed:
+            self.build_ivf()
+
+    def build_ivf(self, nlist: int = None, iterations: int = 10, sample_size: int = 100000, seed: int = 0):
+        """
+        Trains the IVF coarse quantizer with spherical k-means and assigns every vector to a list.
+
+        Training runs on a snapshot without holding the index lock, so searches and writes carry on
+        meanwhile; the trained index is swapped in and saved in one step at the end.
+
+        Args:
+            nlist (int): Number of inverted lists. Defaults to 4 * sqrt(N).
+            iterations (int): k-means iterations.
+            sample_size (int): Maximum number of vectors used for training.
+        """
+        with self._lock:
+            live = np.flatnonzero(~self._deleted[:self._count])
+            if len(live) == 0:
+                return
+            count, seq = self._count, self.seq
+            nlist = min(nlist or int(4 * np.sqrt(len(live))), len(live))
+            rng = np.random.default_rng(seed)
+            sample = np.array(self._vectors[np.sort(rng.choice(live, size=min(sample_size, len(live)), replace=False))])
+
+        centroids = np.array(sample[rng.choice(len(sample), size=nlist, replace=False)])
+        for _ in range(iterations):
+            labels = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            centroids = self._normalize(sums)
+        centroids = centroids.astype(np.float32)
+
+        assignments = np.full(count, -1, dtype=np.int32)
+        for start in range(0, count, 65536):
+            end = min(start + 65536, count)
+            with self._lock:
+                chunk = np.array(self._vectors[start:end])
+            assignments[start:end] = self._nearest(chunk, centroids)
+
+        with self._lock:
+            # Rows written while training were assigned to the old lists, or to none
+            stale = set(range(count, self._count))
+            stale.update(row for (row,) in self._conn.execute(
+                "SELECT row FROM items WHERE seq > ? AND row < ?", (seq, self._count)
+            ))
+            assignments = self._grow(assignments, self._count, fill=-1)
+            if stale:
+                stale = sorted(stale)
+                assignments[stale] = self._nearest(self._vectors[stale], centroids)
+            self._centroids = centroids
+            self._assignments = assignments
+            self._lists = None
+            self._save_ivf()
+        logger.info(f"Built IVF index with {nlist} lists over {len(live)} vectors")
+
+    def save(self):
+        """
+        Persists the IVF assignments for vectors added since the index was built.
+        """
+        with self._lock:
+            self._vectors.flush()
+            if self._centroids is not None:
+                self._save_ivf()
+
+    def close(self):
+        if self._ivf_thread is not None:
+            self._ivf_thread.join()
+        self.save()
+        with self._lock:
+            self._conn.close()
+
+    # Internals
+
+    def _next_seq(self) -> int:
+        stored = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM items").fetchone()[0]
+        return max(stored, self.seq) + 1
+
+    def _apply_changes(self, changes):
+        # The writer may have grown the vectors file, which replaces it, so map it again
+        self._vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r+")
+        self._deleted = self._grow(self._deleted, self._vectors.shape[0], fill=False)
+        count = max(self._count, max(row for row, _, _, _ in changes) + 1)
+        # New rows stay tombstoned unless a live item claims them
+        self._deleted[self._count:count] = True
+        self._ids.extend([None] * (count - self._count))
+        self._count = count
+
+        for row, item_id, deleted, seq in changes:
+            previous = self._rows.get(item_id)
+            if previous is not None and previous != row:
+                self._deleted[previous] = True
+            self._ids[row] = item_id
+            if deleted:
+                self._rows.pop(item_id, None)
+            else:
+                self._rows[item_id] = row
+            self._deleted[row] = bool(deleted)
+            self.seq = seq
+
+        if self._centroids is not None:
+            live = sorted({row for row, _, deleted, _ in changes if not deleted})
+            self._assignments = self._grow(self._assignments, self._count, fill=-1)
+            if live:
+                self._assignments[live] = self._assign(self._vectors[live])
+            self._lists = None
+
+    def _wants_ivf(self) -> bool:
+        if self.mode == "exact":
+            return False
+        return self.mode == "ivf" or len(self._rows) >= self.ivf_threshold
+
+    def _use_ivf(self) -> bool:
+        if not self._wants_ivf():
+            return False
+        if self._centroids is None:
+            # Training takes seconds to minutes at scale; search exactly until it is swapped in
+            if self._ivf_thread is None or not self._ivf_thread.is_alive():
+                logger.info(f"No IVF index for the local vector index at {self.path}; training one in the background")
+                self._ivf_thread = threading.Thread(target=self.build_ivf, name="build-ivf", daemon=True)
+                self._ivf_thread.start()
+            return False
+        return True
+
+    def _search_exact(self, query, top_k):
+        scores = self._vectors[:self._count] @ query
+        scores[self._deleted[:self._count]] = -np.inf
+        return self._top(np.arange(self._count), scores, top_k)
+
+    def _search_ivf(self, query, top_k):
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.searchsorted(self._assignments[order], np.arange(len(self._centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+
+        probes = np.argsort(self._centroids @ query)[::-1][:self.nprobe]
+        candidates = np.concatenate([self._lists[probe] for probe in probes])
+        candidates = candidates[~self._deleted[candidates]]
+        scores = self._vectors[np.sort(candidates)] @ query
+        return self._top(np.sort(candidates), scores, top_k)
+
+    @staticmethod
+    def _top(rows, scores, top_k):
+        if len(rows) == 0:
+            return [], []
+        top_k = min(top_k, len(rows))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        best = best[np.isfinite(scores[best])]
+        return rows[best].tolist(), scores[best].tolist()
+
+    def _assign(self, values):
+        return self._nearest(values, self._centroids).astype(np.int32)
+
+    @staticmethod
+    def _nearest(values, centroids):
+        return np.argmax(values @ centroids.T, axis=1)
+
+    def _prepare(self, values):
+        if values.ndim != 2 or values.shape[1] != self.dimension:
+            raise ValueError(f"Expected vectors of dimension {self.dimension}, got shape {values.shape}")
+        return self._normalize(values) if self.metric == "cosine" else values
+
+    @staticmethod
+    def _normalize(values):
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (values / norms).astype(np.float32)
+
+    def _metadata(self, rows):
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        return {
+            row: json.loads(metadata)
+            for row, metadata in self._conn.execute(
+                f"SELECT row, metadata FROM items WHERE row IN ({placeholders})", list(rows)
+            )
+        }
+
+    def _check_manifest(self):
+        manifest_path = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["dimension"] != self.dimension or manifest["metric"] != self.metric:
+                raise ValueError(f"Index at {self.path} was created with {manifest}, not dimension={self.dimension}, metric={self.metric}")
+        else:
+            with open(manifest_path, "w") as f:
+                json.dump({"dimension": self.dimension, "metric": self.metric}, f)
+
+    def _open_vectors(self, capacity):
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        if os.path.exists(vectors_path):
+            return np.load(vectors_path, mmap_mode="r+")
+        return np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32, shape=(capacity, self.dimension))
+
+    def _ensure_capacity(self, needed):
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        tmp_path = os.path.join(self.path, "vectors.tmp.npy")
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(new_capacity, self.dimension))
+        grown[:capacity] = self._vectors
+        grown.flush()
+        del grown
+        self._vectors._mmap.close()
+        os.replace(tmp_path, vectors_path)
+        self._vectors = np.load(vectors_path, mmap_mode="r+")
+        self._deleted = self._grow(self._deleted, new_capacity, fill=False)
+
+    @staticmethod
+    def _grow(array, size, fill):
+        if len(array) >= size:
+            return array
+        grown = np.full(size, fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def _ivf_path(self):
+        return os.path.join(self.path, "ivf.npz")
+
+    @staticmethod
+    def _file_version(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _save_ivf(self):
+        # Written aside and renamed, so a reader never loads a half-written file
+        tmp_path = os.path.join(self.path, "ivf.tmp.npz")
+        np.savez(tmp_path, centroids=self._centroids, assignments=self._assignments, seq=self.seq)
+        os.replace(tmp_path, self._ivf_path())
+        self._ivf_version = self._file_version(self._ivf_path())
+
+    def _load_ivf(self):
+        version = self._file_version(self._ivf_path())
+        if version is None:
+            return
+        with np.load(self._ivf_path()) as ivf:
+            self._centroids = ivf["centroids"]
+            self._assignments = self._grow(ivf["assignments"][:self._count], self._count, fill=-1)
+            saved_seq = int(ivf["seq"]) if "seq" in ivf else None
+        self._lists = None
+        self._ivf_version = version
+        # Vectors upserted after the last save are not assigned yet, or assigned by their old values
+        stale = set(np.flatnonzero(self._assignments < 0).tolist())
+        if saved_seq is not None:
+            stale.update(row for (row,) in self._conn.execute(
+                "SELECT row FROM items WHERE seq > ? AND row < ?", (saved_seq, self._count)
+            ))
+        if stale:
+            stale = sorted(stale)
+            self._assignments[stale] = self._assign(self._vectors[stale])
+
+    @staticmethod
+    def _check_namespace(namespace):
+        if namespace:
+            raise ValueError("Namespaces are not supported by the local vector index")
+
+    @staticmethod
+    def _as_record(vector):
+        if isinstance(vector, dict):
+            return vector["id"], vector["values"], vector.get("metadata") or {}
+        item_id, values, *rest = vector
+        return item_id, values, rest[0] if rest else {}
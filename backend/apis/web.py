@@ -1,22 +1,24 @@
-from tavily import TavilyClient
 from langchain_core.tools import tool
 import os
 import logging
 import re
 
 from dotenv import load_dotenv
+from apis import upstreams
+from apis import metrics
+from apis.tool_cache import cached_tool
 
 logger = logging.getLogger(__name__)
 load_dotenv()
 
 
-# Step 1: Initialize TavilyClient
-api_key=os.getenv("TAVILY_API_KEY")
-tavily_client = TavilyClient(api_key=api_key)
+# Step 1: Use the shared Tavily client from the upstream registry (built on first use)
+tavily_client = upstreams.tavily_client
 
 
 @tool("web_search")
-def search_web(query: str) -> dict:
+@cached_tool("web", ttl=float(os.getenv("TOOL_CACHE_TTL_WEB", "600")))
+async def search_web(query: str) -> dict:
     """
     Searches the web using TavilyClient and retrieves context based on the provided query.
     
@@ -28,7 +30,8 @@ def search_web(query: str) -> dict:
     """
     try:
         # Step 2: Execute a context search query using Tavily
-        context = tavily_client.get_search_context(query=query)
+        with metrics.TAVILY.time():
+            context = await tavily_client.get().get_search_context(query=query)
         
         # Step 3: Clean the response using regex to remove unwanted characters
         cleaned_context = re.sub(r"[\\\/\'\"\(\)]", "", context)
@@ -0,0 +1,165 @@
+"""
+Benchmark for Arxiv feed parsing: time and peak memory of parsing large Atom feeds whole with
+xmltodict (the previous path) against the incremental FeedParser, and of a paginated deep search
+through fetch_pages served from the same feed.
+
+Feeds are synthetic, with abstracts of realistic length, unless recorded feeds are passed with
+--feed (e.g. saved with `curl "http://export.arxiv.org/api/query?search_query=all:llm&max_results=2000"`).
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_arxiv_feed --entries 100 1000 10000
+    python -m benchmarks.bench_arxiv_feed --feed recorded.xml
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+import xmltodict
+
+from apis import arxiv
+from apis.resources import LazyResource
+
+ABSTRACT = " ".join(["We study retrieval augmented generation for scientific literature."] * 18)
+
+
+def synthetic_feed(count):
+    entries = "".join(
+        f"""
+  <entry>
+    <id>http://arxiv.org/abs/2401.{idx:05d}v1</id>
+    <updated>2024-01-02T00:00:00Z</updated>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Paper {idx} on Retrieval Augmented Generation</title>
+    <summary>{ABSTRACT}</summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+    <author><name>Grace Hopper</name></author>
+    <link href="http://arxiv.org/abs/2401.{idx:05d}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.{idx:05d}v1" rel="related" type="application/pdf"/>
+    <category term="cs.CL" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>"""
+        for idx in range(count)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f"<opensearch:totalResults>{count}</opensearch:totalResults>{entries}\n</feed>\n"
+    ).encode()
+
+
+def split_entries(feed):
+    # Header and entries, so the paginated run can serve any start/max_results slice
+    entries = re.findall(rb"<entry>.*?</entry>", feed, re.S)
+    head = feed[:feed.find(b"<entry>")] if entries else feed[:feed.rfind(b"</feed>")]
+    return head, entries
+
+
+def measure(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": elapsed, "peak_mb": peak / 2**20}
+
+
+def parse_whole(feed):
+    entries = xmltodict.parse(feed).get("feed", {}).get("entry", [])
+    return len(entries if isinstance(entries, list) else [entries])
+
+
+def parse_streaming(feed, chunk_size):
+    parser = arxiv.FeedParser()
+    count = 0
+    for offset in range(0, len(feed), chunk_size):
+        count += len(parser.feed(feed[offset:offset + chunk_size]))
+    return count + len(parser.close())
+
+
+def deep_search(head, entries, page_size, chunk_size):
+    async def handler(request):
+        start, size = int(request.url.params["start"]), int(request.url.params["max_results"])
+        # Sent in chunks, the way a large response arrives off the network
+        return httpx.Response(200, stream=PageStream(head, entries[start:start + size], chunk_size))
+
+    async def run():
+        arxiv.http_client = LazyResource("bench", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        arxiv.ARXIV_PAGE_DELAY = 0
+        count = 0
+        async for _ in arxiv.fetch_pages("retrieval", len(entries), page_size=page_size):
+            count += 1
+        return count
+
+    return asyncio.run(run())
+
+
+class PageStream(httpx.AsyncByteStream):
+    """A page body produced chunk by chunk, never joined in memory."""
+
+    def __init__(self, head, entries, chunk_size):
+        self.head = head
+        self.entries = entries
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self):
+        chunk = [self.head]
+        size = len(self.head)
+        for entry in self.entries:
+            chunk.append(entry)
+            size += len(entry)
+            if size >= self.chunk_size:
+                yield b"".join(chunk)
+                chunk, size = [], 0
+        chunk.append(b"</feed>\n")
+        yield b"".join(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--feed", nargs="+", help="Recorded Atom feeds to parse instead of synthetic ones")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="Bytes per chunk fed to the streaming parser")
+    parser.add_argument("--page-size", type=int, default=200, help="Results per request in the paginated run")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    feeds = (
+        [(path, Path(path).read_bytes()) for path in args.feed]
+        if args.feed else [(f"synthetic-{count}", synthetic_feed(count)) for count in args.entries]
+    )
+
+    report = {"chunk_size": args.chunk_size, "page_size": args.page_size, "results": []}
+    for name, feed in feeds:
+        # The feed is already in memory for every variant, so peaks only count parsing overhead
+        entries, whole = measure(lambda: parse_whole(feed))
+        _, streaming = measure(lambda: parse_streaming(feed, args.chunk_size))
+        head, pages = split_entries(feed)
+        _, paged = measure(lambda: deep_search(head, pages, args.page_size, args.chunk_size))
+        result = {
+            "feed": name,
+            "entries": entries,
+            "feed_mb": len(feed) / 2**20,
+            "xmltodict": whole,
+            "streaming": streaming,
+            "paginated": paged,
+        }
+        report["results"].append(result)
+        print(
+            f"{name}: {entries} entries, {result['feed_mb']:.1f} MB | "
+            f"xmltodict {whole['seconds']:.3f}s {whole['peak_mb']:.1f} MB | "
+            f"streaming {streaming['seconds']:.3f}s {streaming['peak_mb']:.1f} MB | "
+            f"paginated {paged['seconds']:.3f}s {paged['peak_mb']:.1f} MB"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
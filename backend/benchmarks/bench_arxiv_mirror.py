@@ -0,0 +1,128 @@
+"""
+Benchmark for the local Arxiv mirror: bulk load rate from a metadata dump, full-text query
+latency percentiles, an incremental harvest on top of the loaded mirror, and reopen time.
+
+The synthetic dump uses the JSON lines layout of the Arxiv metadata snapshot, with titles and
+abstracts drawn from a Zipf distribution so term frequencies are as skewed as in real text.
+Pass a real snapshot (or a slice of one) with --dump instead.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_arxiv_mirror --papers 200000
+    python -m benchmarks.bench_arxiv_mirror --dump arxiv-metadata-oai-snapshot.json
+"""
+import argparse
+import gzip
+import json
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from apis.arxiv_mirror import ArxivMirror, read_dump
+
+
+def synthetic_dump(path, count, vocabulary, seed, update_date="2024-01-05"):
+    rng = np.random.default_rng(seed)
+    terms = [f"term{i}" for i in range(vocabulary)]
+
+    # Draw every paper's words at once; sampling per paper dominates the run otherwise
+    ranks = np.minimum(rng.zipf(1.2, size=(count, 160)), vocabulary) - 1
+
+    def words(row):
+        return " ".join(terms[r] for r in row)
+
+    with gzip.open(path, "wt") as dump:
+        for idx, row in enumerate(ranks):
+            dump.write(json.dumps({
+                "id": f"{2000 + idx // 100000}.{idx % 100000:05d}",
+                "authors_parsed": [["Lovelace", "Ada", ""], ["Turing", "Alan", ""]],
+                "title": words(row[:10]),
+                "abstract": words(row[10:]),
+                "categories": "cs.LG",
+                "versions": [{"version": "v1", "created": "Mon, 1 Jan 2024 10:00:00 GMT"}],
+                "update_date": update_date,
+            }) + "\n")
+    return terms
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=100000)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--stopwords", type=int, default=20, help="Most frequent synthetic terms never used in queries")
+    parser.add_argument("--harvest", type=float, default=0.01, help="Share of papers re-sent as a newer incremental harvest")
+    parser.add_argument("--dump", help="Load this dump instead of a synthetic one; queries use words from its titles")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = args.dump or str(Path(tmp) / "snapshot.jsonl.gz")
+        if not args.dump:
+            terms = synthetic_dump(dump, args.papers, args.vocabulary, seed=0)
+
+        mirror = ArxivMirror(str(Path(tmp) / "mirror.db"))
+        start = time.perf_counter()
+        counts = mirror.load(read_dump(dump))
+        elapsed = time.perf_counter() - start
+        report["papers"] = counts["loaded"]
+        report["load_papers_per_second"] = counts["loaded"] / elapsed
+
+        rng = np.random.default_rng(1)
+        if args.dump:
+            # Words from the first titles in the dump, most frequent first
+            counts = Counter(
+                word.lower() for _, record in zip(range(args.queries * 20), read_dump(dump))
+                for word in record.get("title", "").split() if word.isalpha() and len(word) > 3
+            )
+            terms = [word for word, _ in counts.most_common()]
+        # Queries of one to four terms, mixing frequent and rare ones like real title searches. The
+        # top synthetic terms stand in for stopwords (the first is 18% of all words), which search
+        # drops, so queries start below them.
+        skip = 0 if args.dump else args.stopwords
+        queries = [
+            " ".join(terms[r] for r in np.minimum(skip + rng.zipf(1.3, size=int(rng.integers(1, 5))), len(terms)) - 1)
+            for _ in range(args.queries)
+        ]
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            found.append(len(mirror.search(query, limit=10)))
+            latencies.append(time.perf_counter() - start)
+        report["query"] = {
+            "p50_ms": percentile(latencies, 50),
+            "p99_ms": percentile(latencies, 99),
+            "hit_rate": sum(count == 10 for count in found) / len(found),
+        }
+
+        if not args.dump:
+            harvest = str(Path(tmp) / "harvest.jsonl.gz")
+            synthetic_dump(harvest, int(args.papers * args.harvest), args.vocabulary, seed=2, update_date="2024-02-01")
+            start = time.perf_counter()
+            counts = mirror.load(read_dump(harvest))
+            report["harvest"] = {**counts, "seconds": time.perf_counter() - start}
+            start = time.perf_counter()
+            counts = mirror.load(read_dump(harvest))
+            report["harvest_reload"] = {**counts, "seconds": time.perf_counter() - start}
+        mirror.close()
+
+        start = time.perf_counter()
+        reopened = ArxivMirror(str(Path(tmp) / "mirror.db"))
+        reopened.search(queries[0])
+        report["reopen_seconds"] = time.perf_counter() - start
+        reopened.close()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
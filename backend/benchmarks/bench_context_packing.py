@@ -0,0 +1,102 @@
+"""
+Benchmark for context packing: prompt tokens of the unbounded prompt versus the packed prompt over
+retrieved sets shaped like production ones (chunks of up to 500 words from split_text_into_chunks,
+with near-duplicates from overlapping dense and BM25 results), and the time packing takes.
+
+With --live, each prompt pair is also sent to the NVIDIA Llama3 endpoint (NVIDIA_API_KEY required)
+to compare generation latency before and after packing.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_context_packing --sets 50 --chunks 10
+    python -m benchmarks.bench_context_packing --sets 5 --live
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+from apis.context import TOKEN_BUDGET, count_tokens, pack_context
+
+
+def retrieved_set(rng, vocabulary, chunks, words, duplicate_rate):
+    docs = []
+    for _ in range(chunks):
+        if docs and rng.random() < duplicate_rate:
+            # A near-duplicate: the same chunk with a handful of words changed
+            tokens = docs[int(rng.integers(len(docs)))].page_content.split()
+            for position in rng.integers(len(tokens), size=5):
+                tokens[position] = vocabulary[int(rng.integers(len(vocabulary)))]
+        else:
+            length = int(rng.integers(words // 2, words + 1))
+            tokens = [vocabulary[i] for i in np.minimum(rng.zipf(1.1, size=length), len(vocabulary)) - 1]
+        docs.append(Document(page_content=" ".join(tokens)))
+    query = " ".join(docs[0].page_content.split()[:6])
+    return query, docs
+
+
+def prompt(query, docs):
+    return f"Query: {query}\nText Documents: {chr(10).join(doc.page_content for doc in docs)}\nImage Documents: "
+
+
+async def generation_seconds(text):
+    from apis.rag import call_nvidia_llama_api
+
+    start = time.perf_counter()
+    await call_nvidia_llama_api(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sets", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=10)
+    parser.add_argument("--words", type=int, default=500)
+    parser.add_argument("--duplicate-rate", type=float, default=0.3)
+    parser.add_argument("--budget", type=int, default=TOKEN_BUDGET)
+    parser.add_argument("--live", action="store_true", help="Also measure Llama3 generation latency")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = [f"w{i}" for i in range(20000)]
+    before_tokens, after_tokens, pack_ms, kept = [], [], [], []
+    pairs = []
+    for _ in range(args.sets):
+        query, docs = retrieved_set(rng, vocabulary, args.chunks, args.words, args.duplicate_rate)
+        start = time.perf_counter()
+        packed = pack_context(query, docs, token_budget=args.budget)
+        pack_ms.append((time.perf_counter() - start) * 1000)
+        before, after = prompt(query, docs), prompt(query, packed)
+        before_tokens.append(count_tokens(before))
+        after_tokens.append(count_tokens(after))
+        kept.append(len(packed))
+        pairs.append((before, after))
+
+    report = {
+        "sets": args.sets,
+        "budget": args.budget,
+        "prompt_tokens_before": statistics.mean(before_tokens),
+        "prompt_tokens_after": statistics.mean(after_tokens),
+        "chunks_before": args.chunks,
+        "chunks_after": statistics.mean(kept),
+        "pack_ms_p50": statistics.median(pack_ms),
+    }
+
+    if args.live:
+        before_latency = [asyncio.run(generation_seconds(before)) for before, _ in pairs]
+        after_latency = [asyncio.run(generation_seconds(after)) for _, after in pairs]
+        report["generation_seconds_before_p50"] = statistics.median(before_latency)
+        report["generation_seconds_after_p50"] = statistics.median(after_latency)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Load test: drives every API endpoint at increasing concurrency and reports throughput and
+p50/p95/p99 latency per endpoint and concurrency level.
+
+The FastAPI app runs under uvicorn on a local port with every upstream replaced by the stand-ins
+in benchmarks.upstream_stubs (OpenAI, NVIDIA, Tavily and arXiv over local HTTP; S3, Pinecone and
+wkhtmltopdf in-process), each with its own injected latency and error rate. Nothing leaves the
+machine. Every request uses a fresh query unless --repeat is set, so caches only help as much as
+the repeat fraction allows.
+
+Streaming endpoints are timed until the last event. A request counts as failed when it gets an
+HTTP error or a JSON body with an "error" key.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_load --levels 1,8,32 --requests 100 --output load.json
+    python -m benchmarks.bench_load --endpoints rag-search,arxiv --latency openai=0.3,nvidia=0.8 --error-rate tavily=0.05
+    python -m benchmarks.bench_load --output new.json --compare load.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+# The app reads these at import time: keep it offline and start it cold
+os.environ.setdefault("WARM_UP_ON_STARTUP", "false")
+os.environ.setdefault("ARXIV_SUMMARY_STORE", ":memory:")
+os.environ.setdefault("BUCKET_NAME", "bench-bucket")
+for name in ("OPENAI_API_KEY", "NVIDIA_API_KEY", "TAVILY_API_KEY", "PINECONE_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+import httpx
+import numpy as np
+import uvicorn
+
+from benchmarks.upstream_stubs import (
+    CORPUS, UPSTREAMS, StubRetriever, StubS3, StubState, StubTavilyClient, UpstreamProfile, create_stub_app,
+    simulated_pdf_render,
+)
+
+# Default latencies, roughly what the real services take
+DEFAULT_LATENCY = {
+    "openai": 0.4, "nvidia": 0.8, "tavily": 0.6, "arxiv": 0.5, "s3": 0.05, "pinecone": 0.08, "pdf": 0.3,
+}
+
+QUERIES = [
+    "latest news about {}",
+    "research papers on {}",
+    "summarize the uploaded report on {}",
+    "how does {} work",
+]
+TOPICS = ["transformers", "diffusion models", "graph networks", "retrieval", "quantization", "agents"]
+
+
+def query_text(n: int) -> str:
+    return QUERIES[n % len(QUERIES)].format(f"{TOPICS[n % len(TOPICS)]} {n}")
+
+
+# name -> (method, path, request builder taking a query number)
+ENDPOINTS = {
+    "health": ("GET", "/", lambda n: {}),
+    "smart-query": ("POST", "/smart-query", lambda n: {"json": {"query": query_text(n)}}),
+    "web-search": ("POST", "/web-search", lambda n: {"json": {"query": query_text(n)}}),
+    "rag-search": ("POST", "/rag-search", lambda n: {"json": {"query": query_text(n)}}),
+    "rag-stream": ("POST", "/rag-search/stream", lambda n: {"json": {"query": query_text(n)}}),
+    "arxiv": ("POST", "/copilotkit_remote", lambda n: {"json": {"query": query_text(n)}}),
+    "arxiv-stream": ("POST", "/copilotkit_remote/stream", lambda n: {"json": {"query": query_text(n)}}),
+    "batch-search": ("POST", "/batch-search", lambda n: {"json": {"queries": [
+        {"query": query_text(n), "tool": "web"},
+        {"query": query_text(n), "tool": "rag"},
+        {"query": query_text(n), "tool": "arxiv"},
+    ]}}),
+    "list-s3-files": ("GET", "/list-s3-files/", lambda n: {"params": {"prefix": f"pdfs/batch-{n % 100}/", "limit": 50}}),
+    "pdf-export": ("POST", "/convert-text-to-pdf", lambda n: {"json": {"text": f"# Notes {n}\n\n" + "Findings. " * 200}}),
+}
+
+
+class ServerThread:
+    """
+    Runs an ASGI app under uvicorn on a free local port in a background thread.
+    """
+
+    def __init__(self, app):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def install_stubs(stub_url: str, state: StubState, setattr=setattr):
+    """
+    Points every upstream client of the app at the stand-ins. Tests pass monkeypatch.setattr
+    so the real clients are restored afterwards.
+    """
+    from langchain_openai import OpenAIEmbeddings
+    from openai import AsyncOpenAI
+
+    from apis import arxiv, main, rag, web
+    from apis.cache import CachedQueryEmbeddings
+    from apis.pdf_render import PdfRenderer
+    from apis.resources import LazyResource
+    from apis.sparse_index import BM25Index
+
+    def resource(name, factory):
+        return LazyResource(f"bench.{name}", factory)
+
+    def openai_client():
+        return AsyncOpenAI(api_key="bench", base_url=f"{stub_url}/openai/v1")
+
+    setattr(main, "client", resource("openai", openai_client))
+    setattr(arxiv, "client", resource("openai", openai_client))
+    setattr(arxiv, "ARXIV_API_URL", f"{stub_url}/arxiv/api/query")
+    setattr(arxiv, "http_client", resource("arxiv", lambda: httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=5.0))))
+    setattr(rag, "client", resource("nvidia", lambda: AsyncOpenAI(api_key="bench", base_url=f"{stub_url}/nvidia/v1")))
+    setattr(rag, "text_embeddings", resource("embeddings", lambda: CachedQueryEmbeddings(
+        OpenAIEmbeddings(
+            model=rag.text_embedding_model, api_key="bench", base_url=f"{stub_url}/openai/v1",
+            check_embedding_ctx_length=False,
+        ),
+        model=rag.text_embedding_model,
+        cache=rag.query_embedding_cache,
+    )))
+    setattr(rag, "text_retriever", resource("pinecone", lambda: StubRetriever(state)))
+    setattr(web, "tavily_client", resource("tavily", lambda: StubTavilyClient(f"{stub_url}/tavily")))
+
+    s3 = StubS3(state)
+    setattr(main, "s3_client", resource("s3", lambda: s3))
+    setattr(rag, "s3_client", resource("s3", lambda: s3))
+
+    sparse = BM25Index(":memory:")
+    sparse.add([(f"chunk-{idx}", text, {"text": text}) for idx, text in enumerate(CORPUS)])
+    setattr(rag, "sparse_index", resource("sparse_index", lambda: sparse))
+
+    setattr(main, "pdf_renderer", PdfRenderer(render=simulated_pdf_render(state)))
+
+
+def parse_overrides(value: str, cast=float) -> dict:
+    # "openai=0.3,nvidia=0.8" -> {"openai": 0.3, "nvidia": 0.8}
+    overrides = {}
+    for item in filter(None, (value or "").split(",")):
+        name, _, number = item.partition("=")
+        if name not in UPSTREAMS:
+            raise SystemExit(f"Unknown upstream {name!r}; expected one of {', '.join(UPSTREAMS)}")
+        overrides[name] = cast(number)
+    return overrides
+
+
+async def is_failure(response: httpx.Response) -> bool:
+    if response.status_code >= 400:
+        return True
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        return isinstance(body, dict) and "error" in body
+    return False
+
+
+async def run_level(client, endpoint, concurrency, requests, repeat, counter):
+    method, path, build = ENDPOINTS[endpoint]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures, seen = [], 0, []
+
+    async def one():
+        nonlocal failures
+        if seen and random.random() < repeat:
+            n = random.choice(seen)
+        else:
+            n = next(counter)
+            seen.append(n)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with client.stream(method, path, **build(n)) as response:
+                    await response.aread()
+                failed = await is_failure(response)
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            failures += failed
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "failures": failures,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+async def drive(app_url, endpoints, levels, requests, repeat, state):
+    results = []
+    counter = iter(range(10 ** 9))
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=120) as client:
+        for endpoint in endpoints:
+            for concurrency in levels:
+                before = state.snapshot()
+                result = await run_level(client, endpoint, concurrency, requests, repeat, counter)
+                after = state.snapshot()
+                result["upstream_calls"] = {
+                    name: after[name]["calls"] - before[name]["calls"]
+                    for name in UPSTREAMS if after[name]["calls"] > before[name]["calls"]
+                }
+                results.append(result)
+                print(
+                    f"{endpoint:>14} c={concurrency:<4} {result['throughput_rps']:8.1f} req/s  "
+                    f"p50 {result['p50_ms']:8.1f}  p95 {result['p95_ms']:8.1f}  p99 {result['p99_ms']:8.1f} ms  "
+                    f"failures {result['failures']}",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """
+    Lists the (endpoint, concurrency) runs whose p95 rose or throughput fell by more than `threshold`.
+    """
+    previous = {(run["endpoint"], run["concurrency"]): run for run in baseline["results"]}
+    regressions = []
+    for run in report["results"]:
+        old = previous.get((run["endpoint"], run["concurrency"]))
+        if old is None:
+            continue
+        p95_change = run["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        throughput_change = run["throughput_rps"] / old["throughput_rps"] - 1 if old["throughput_rps"] else 0.0
+        print(
+            f"{run['endpoint']:>14} c={run['concurrency']:<4} p95 {p95_change:+7.1%}  throughput {throughput_change:+7.1%}",
+            file=sys.stderr,
+        )
+        if p95_change > threshold or throughput_change < -threshold:
+            regressions.append({
+                "endpoint": run["endpoint"], "concurrency": run["concurrency"],
+                "p95_change": p95_change, "throughput_change": throughput_change,
+            })
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated endpoint names")
+    parser.add_argument("--levels", default="1,4,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint and level")
+    parser.add_argument("--repeat", type=float, default=0.0, help="Fraction of requests that repeat an earlier query")
+    parser.add_argument("--latency", help="Mean latency overrides in seconds, e.g. openai=0.3,nvidia=0.8")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency varies by +/- this fraction")
+    parser.add_argument("--error-rate", help="Error rate overrides, e.g. tavily=0.05")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING", help="Log level for the app while under load")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change that counts as a regression")
+    args = parser.parse_args()
+
+    endpoints = [name for name in args.endpoints.split(",") if name]
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints {unknown}; expected some of {', '.join(ENDPOINTS)}")
+    levels = [int(level) for level in args.levels.split(",")]
+    random.seed(args.seed)
+
+    latency = {**DEFAULT_LATENCY, **parse_overrides(args.latency)}
+    error_rate = parse_overrides(args.error_rate)
+    state = StubState({
+        name: UpstreamProfile(latency=latency.get(name, 0.0), jitter=args.jitter, error_rate=error_rate.get(name, 0.0))
+        for name in UPSTREAMS
+    })
+
+    from apis.main import app
+
+    logging.getLogger().setLevel(args.log_level)
+    with ServerThread(create_stub_app(state)) as stubs:
+        install_stubs(stubs.url, state)
+        with ServerThread(app) as server:
+            results = asyncio.run(drive(server.url, endpoints, levels, args.requests, args.repeat, state))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "levels": levels, "requests": args.requests, "repeat": args.repeat, "jitter": args.jitter,
+            "latency": latency, "error_rate": error_rate, "seed": args.seed,
+        },
+        "results": results,
+        "upstreams": state.snapshot(),
+    }
+
+    regressions = []
+    if args.compare:
+        report["baseline"] = args.compare
+        regressions = report["regressions"] = compare(report, json.loads(Path(args.compare).read_text()), args.threshold)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
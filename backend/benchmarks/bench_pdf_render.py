@@ -0,0 +1,107 @@
+"""
+Benchmark for PDF export: throughput and latency percentiles of concurrent exports through the
+render pool and content-hash cache, against the previous one-render-per-request path.
+
+Uses wkhtmltopdf through pdfkit when it is installed. Otherwise (or with --simulate) each render
+is a stand-in that holds a worker for the given number of seconds, like a wkhtmltopdf process would.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_pdf_render --requests 200 --concurrency 32 --repeat 0.5
+    python -m benchmarks.bench_pdf_render --simulate 0.3
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from apis.pdf_render import PdfRenderer, RenderQueueFull, render_with_pdfkit
+
+
+def simulated_render(seconds):
+    def render(html):
+        time.sleep(seconds)
+        return b"%PDF-1.4 " + html.encode()
+    return render
+
+
+def documents(count, repeat, seed):
+    # A `repeat` fraction of exports re-send a document that was already exported
+    rng = np.random.default_rng(seed)
+    docs = []
+    for i in range(count):
+        if docs and rng.random() < repeat:
+            docs.append(docs[int(rng.integers(len(docs)))])
+        else:
+            docs.append(f"<h1>Research notes {i}</h1>" + "<p>Findings and citations.</p>" * 200)
+    return docs
+
+
+async def drive(export, docs, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, rejected = [], 0
+
+    async def one(html):
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await export(html)
+            except RenderQueueFull:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(html) for html in docs])
+    elapsed = time.perf_counter() - start
+    return {
+        "exports_per_second": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--repeat", type=float, default=0.5, help="Fraction of exports that repeat an earlier document")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=64)
+    parser.add_argument("--simulate", type=float, help="Seconds per simulated render instead of wkhtmltopdf")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    if args.simulate is None and not shutil.which("wkhtmltopdf"):
+        args.simulate = 0.3
+    render = simulated_render(args.simulate) if args.simulate is not None else render_with_pdfkit
+    docs = documents(args.requests, args.repeat, seed=0)
+
+    async def uncached(html):
+        # The previous path: every request renders in the shared default thread pool
+        return await asyncio.to_thread(render, html)
+
+    renderer = PdfRenderer(render=render, workers=args.workers, max_queue=args.queue)
+    report = {
+        "renderer": "simulated" if args.simulate is not None else "wkhtmltopdf",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "repeat": args.repeat,
+        "before": asyncio.run(drive(uncached, docs, args.concurrency)),
+        "after": asyncio.run(drive(renderer.render, docs, args.concurrency)),
+    }
+    report["after"]["renders"] = renderer.renders
+    renderer.close()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark for the /smart-query router.
+
+Compares the local fast-path router against the LLM labels in fixtures/routing_queries.json:
+routing latency (p50/p99), agreement with the labels and how often the LLM would be consulted.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_query_router
+    python -m benchmarks.bench_query_router --live   # also time the gpt-4o router and use its labels
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+from apis.query_router import QueryRouter
+
+FIXTURE = Path(__file__).parent / "fixtures" / "routing_queries.json"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples_ms):
+    return {
+        "p50_ms": percentile(samples_ms, 50),
+        "p99_ms": percentile(samples_ms, 99),
+        "mean_ms": statistics.fmean(samples_ms),
+    }
+
+
+async def run(live: bool, repeat: int) -> dict:
+    queries = json.loads(FIXTURE.read_text())["queries"]
+    labels = [row["label"] for row in queries]
+    report = {"queries": len(queries)}
+
+    if live:
+        from apis.main import llm_select_search_method
+
+        llm_latencies = []
+        labels = []
+        for row in queries:
+            start = time.perf_counter()
+            labels.append(await llm_select_search_method(row["query"]))
+            llm_latencies.append((time.perf_counter() - start) * 1000)
+        report["llm"] = summarize(llm_latencies)
+
+    # Cold path: rules + centroid classification, no memo
+    router = QueryRouter()
+    local_latencies = []
+    decisions = []
+    for _ in range(repeat):
+        decisions = []
+        for row in queries:
+            start = time.perf_counter()
+            decisions.append(router.classify(row["query"]))
+            local_latencies.append((time.perf_counter() - start) * 1000)
+
+    confident = [(decision, label) for decision, label in zip(decisions, labels) if decision is not None]
+    report["local"] = summarize(local_latencies)
+    report["escalation_rate"] = 1 - len(confident) / len(queries)
+    report["agreement_when_confident"] = (
+        sum(decision.route == label for decision, label in confident) / len(confident) if confident else 0.0
+    )
+
+    # Full path with low-confidence queries escalated to the labels, then the memoized path
+    label_by_query = {row["query"]: label for row, label in zip(queries, labels)}
+
+    async def label_fallback(query):
+        return label_by_query[query]
+
+    routed = [await router.route(row["query"], fallback=label_fallback) for row in queries]
+    report["agreement_with_fallback"] = sum(
+        decision.route == label for decision, label in zip(routed, labels)
+    ) / len(queries)
+
+    memo_latencies = []
+    for row in queries:
+        start = time.perf_counter()
+        await router.route(row["query"].upper() + "?", fallback=label_fallback)
+        memo_latencies.append((time.perf_counter() - start) * 1000)
+    report["memo"] = summarize(memo_latencies)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Call the gpt-4o router for latency and labels")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the fixture for local timings")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.live, args.repeat))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark for the BM25 index: incremental indexing throughput, query latency percentiles and
+how long it takes to reopen the index from disk.
+
+The synthetic corpus draws words from a Zipf distribution, so posting lists are as skewed as in
+real text, and chunks are the size produced by split_text_into_chunks.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_sparse_index --chunks 100000 --words 120
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from apis.sparse_index import BM25Index
+
+
+def synthetic_chunks(count, words, vocabulary, seed):
+    rng = np.random.default_rng(seed)
+    terms = [f"term{i}" for i in range(vocabulary)]
+    ranks = np.minimum(rng.zipf(1.2, size=(count, words)), vocabulary) - 1
+    return [(f"chunk-{i}", " ".join(terms[r] for r in row), {"chunk": i}) for i, row in enumerate(ranks)], terms
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--words", type=int, default=120)
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=1000, help="Chunks per add() call, as one ingested document")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    chunks, terms = synthetic_chunks(args.chunks, args.words, args.vocabulary, seed=0)
+    rng = np.random.default_rng(1)
+    # Queries mix frequent and rare terms, like a title plus a few content words
+    queries = [
+        " ".join(terms[r] for r in np.minimum(rng.zipf(1.2, size=int(rng.integers(2, 7))), args.vocabulary) - 1)
+        for _ in range(args.queries)
+    ]
+    report = {"chunks": args.chunks, "words_per_chunk": args.words}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bm25.sqlite")
+        index = BM25Index(path)
+
+        start = time.perf_counter()
+        for offset in range(0, len(chunks), args.batch):
+            index.add(chunks[offset:offset + args.batch])
+        elapsed = time.perf_counter() - start
+        report["index_chunks_per_second"] = args.chunks / elapsed
+
+        # The first search of each term builds its posting arrays; measure cold and warm passes
+        for name in ("cold", "warm"):
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                index.search(query, top_k=10)
+                latencies.append(time.perf_counter() - start)
+            report[name] = {"p50_ms": percentile(latencies, 50), "p99_ms": percentile(latencies, 99)}
+        index.close()
+
+        start = time.perf_counter()
+        BM25Index(path).close()
+        report["reopen_seconds"] = time.perf_counter() - start
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
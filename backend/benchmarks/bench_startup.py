@@ -0,0 +1,69 @@
+"""
+Benchmark for backend startup: how long `import apis.main` takes in a fresh interpreter, how
+long until the first request is served, and (with --warm-up) how long until /ready returns 200.
+
+Each measurement runs in its own subprocess so module caches do not carry over between runs.
+Warm-up needs real credentials and network access for Pinecone, S3 and the Hugging Face models.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 1 --warm-up
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROBE = """
+import json, os, time
+start = time.perf_counter()
+from apis import main
+imported = time.perf_counter() - start
+
+from fastapi.testclient import TestClient
+from apis.resources import readiness
+report = {"import_seconds": imported}
+with TestClient(main.app) as client:
+    client.get("/")
+    report["first_request_seconds"] = time.perf_counter() - start
+    if os.environ["WARM_UP_ON_STARTUP"] == "true":
+        task = main.app.state.warm_up
+        while client.get("/ready").status_code != 200 and not task.done():
+            time.sleep(0.05)
+        report["ready_seconds"] = time.perf_counter() - start
+        report["ready"] = readiness()[0]
+print(json.dumps(report))
+"""
+
+
+def run_once(warm_up):
+    env = {**os.environ, "WARM_UP_ON_STARTUP": "true" if warm_up else "false"}
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True, env=env)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warm-up", action="store_true", help="Also measure time until /ready returns 200")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    runs = [run_once(args.warm_up) for _ in range(args.runs)]
+    report = {"runs": args.runs}
+    for key in runs[0]:
+        if key != "ready":
+            report[key] = statistics.median(run[key] for run in runs)
+    if args.warm_up:
+        report["ready"] = all(run["ready"] for run in runs)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
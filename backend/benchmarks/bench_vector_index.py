@@ -0,0 +1,88 @@
+"""
+Benchmark for the local vector index: recall@k and queries per second of IVF search against
+the exact brute-force baseline, plus how long it takes to reopen the index from disk.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_vector_index --count 200000 --dim 512 --nprobe 8 16 32
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from apis.vector_index import LocalVectorIndex
+
+
+def clustered_vectors(count, dim, clusters, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=count)]
+    vectors += 0.5 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors
+
+
+def search_all(index, queries, k):
+    start = time.perf_counter()
+    results = [[match["id"] for match in index.query(vector=query, top_k=k)["matches"]] for query in queries]
+    elapsed = time.perf_counter() - start
+    return results, len(queries) / elapsed
+
+
+def recall(results, truth):
+    return float(np.mean([len(set(found) & set(expected)) / len(expected) for found, expected in zip(results, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.count, args.dim, args.clusters, seed=0)
+    queries = clustered_vectors(args.queries, args.dim, args.clusters, seed=1)
+    report = {"count": args.count, "dim": args.dim, "k": args.k}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "index")
+        index = LocalVectorIndex(path, dimension=args.dim, mode="exact")
+
+        start = time.perf_counter()
+        for offset in range(0, args.count, 10000):
+            batch = vectors[offset:offset + 10000]
+            index.upsert(vectors=[(str(offset + i), vector) for i, vector in enumerate(batch)])
+        report["upsert_seconds"] = time.perf_counter() - start
+
+        truth, exact_qps = search_all(index, queries, args.k)
+        report["exact"] = {"qps": exact_qps, "recall": 1.0}
+
+        start = time.perf_counter()
+        index.build_ivf()
+        report["ivf_build_seconds"] = time.perf_counter() - start
+        index.close()
+
+        start = time.perf_counter()
+        index = LocalVectorIndex(path, dimension=args.dim, mode="ivf")
+        report["reopen_seconds"] = time.perf_counter() - start
+
+        report["ivf"] = []
+        for nprobe in args.nprobe:
+            index.nprobe = nprobe
+            results, qps = search_all(index, queries, args.k)
+            report["ivf"].append({"nprobe": nprobe, "qps": qps, "recall": recall(results, truth)})
+        index.close()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
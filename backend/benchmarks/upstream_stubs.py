@@ -0,0 +1,295 @@
+"""
+Local stand-ins for every upstream the backend calls, for offline load tests.
+
+OpenAI, NVIDIA, Tavily and arXiv are served over HTTP by one Starlette app, so requests go through
+the real client libraries and connection pools. S3 and Pinecone are called through blocking SDKs
+that the backend runs in worker threads, so they are replaced in-process by objects that block
+for the same injected latency.
+
+Every upstream has an UpstreamProfile with a mean latency, a jitter fraction and an error rate.
+Errors are answered the way the real service fails under load: 503 for HTTP upstreams and an
+exception for the SDK stand-ins.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+
+import httpx
+import numpy as np
+from langchain_core.documents import Document
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+UPSTREAMS = ("openai", "nvidia", "tavily", "arxiv", "s3", "pinecone", "pdf")
+EMBEDDING_DIM = 1536
+
+
+@dataclass
+class UpstreamProfile:
+    latency: float = 0.0       # Mean seconds before the response (or the first streamed token)
+    jitter: float = 0.0        # Latency varies uniformly by +/- this fraction
+    error_rate: float = 0.0    # Fraction of calls that fail
+    token_interval: float = 0.005  # Seconds between streamed tokens
+
+    def delay(self) -> float:
+        return max(0.0, self.latency * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+
+class StubState:
+    """
+    Profiles and call counters shared by the HTTP and in-process stand-ins.
+    """
+
+    def __init__(self, profiles: dict = None):
+        self.profiles = {name: UpstreamProfile() for name in UPSTREAMS}
+        self.profiles.update(profiles or {})
+        self.calls = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, upstream: str) -> UpstreamProfile:
+        with self._lock:
+            self.calls[upstream] += 1
+        return self.profiles[upstream]
+
+    def failed(self, upstream: str):
+        with self._lock:
+            self.errors[upstream] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: {"calls": self.calls[name], "errors": self.errors[name]} for name in UPSTREAMS}
+
+
+def fake_embedding(text: str) -> list:
+    # Deterministic per text, so repeated queries embed identically and distinct ones are near-orthogonal
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    vector = rng.standard_normal(EMBEDDING_DIM).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def chat_completion(content: str, model: str) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def arxiv_feed(query: str, count: int) -> str:
+    # Entry ids depend on the query, so distinct queries miss the summary store like real ones would
+    base = zlib.crc32(query.encode("utf-8")) % 90000
+    entries = "".join(
+        f"""
+  <entry>
+    <id>http://arxiv.org/abs/2401.{base + idx:05d}v1</id>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Paper {base + idx} on {query}</title>
+    <summary>An abstract about {query}, describing the method, the experiments and the results in some detail.</summary>
+    <author><name>Ada Lovelace</name></author>
+    <link href="http://arxiv.org/abs/2401.{base + idx:05d}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.{base + idx:05d}v1" rel="related" type="application/pdf"/>
+  </entry>"""
+        for idx in range(count)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">{entries}\n</feed>\n'
+
+
+def create_stub_app(state: StubState) -> Starlette:
+    """
+    Builds the HTTP stand-ins, mounted under /openai, /nvidia, /tavily and /arxiv.
+    """
+
+    async def upstream_call(upstream):
+        profile = state.record(upstream)
+        await asyncio.sleep(profile.delay())
+        if profile.fails():
+            state.failed(upstream)
+            return profile, JSONResponse({"error": {"message": f"{upstream} stub failure"}}, status_code=503)
+        return profile, None
+
+    async def openai_chat(request):
+        _, error = await upstream_call("openai")
+        if error:
+            return error
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        if body.get("response_format", {}).get("type") == "json_object":
+            count = prompt.count("\n[") + (1 if prompt.count("[0]") else 0)
+            content = json.dumps({"summaries": [f"Summary {idx} of the paper." for idx in range(count)]})
+        elif "Choose the most appropriate search method" in prompt:
+            content = "web"
+        else:
+            content = "A short summary of the paper's method and findings."
+        return JSONResponse(chat_completion(content, body.get("model", "gpt-3.5-turbo")))
+
+    async def openai_embeddings(request):
+        _, error = await upstream_call("openai")
+        if error:
+            return error
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        return JSONResponse({
+            "object": "list",
+            "model": body.get("model", "text-embedding-ada-002"),
+            "data": [
+                {"object": "embedding", "index": idx, "embedding": fake_embedding(str(text))}
+                for idx, text in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    async def nvidia_chat(request):
+        profile, error = await upstream_call("nvidia")
+        if error:
+            return error
+        body = await request.json()
+        tokens = [f"token{idx} " for idx in range(40)]
+        if not body.get("stream"):
+            return JSONResponse(chat_completion("".join(tokens), body["model"]))
+
+        async def events():
+            for token in tokens:
+                chunk = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(profile.token_interval)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def tavily_search(request):
+        _, error = await upstream_call("tavily")
+        if error:
+            return error
+        body = await request.json()
+        return JSONResponse({"results": [
+            {"url": f"https://example.com/{idx}", "title": f"Result {idx}",
+             "content": f"Web context {idx} about {body['query']}.", "score": 1.0 - idx / 10}
+            for idx in range(body.get("max_results", 5))
+        ]})
+
+    async def arxiv_query(request):
+        _, error = await upstream_call("arxiv")
+        if error:
+            return Response("Service unavailable", status_code=503)
+        query = request.query_params.get("search_query", "").removeprefix("all:")
+        count = int(request.query_params.get("max_results", "5"))
+        return Response(arxiv_feed(query, count), media_type="application/atom+xml")
+
+    return Starlette(routes=[
+        Route("/openai/v1/chat/completions", openai_chat, methods=["POST"]),
+        Route("/openai/v1/embeddings", openai_embeddings, methods=["POST"]),
+        Route("/nvidia/v1/chat/completions", nvidia_chat, methods=["POST"]),
+        Route("/tavily/search", tavily_search, methods=["POST"]),
+        Route("/arxiv/api/query", arxiv_query, methods=["GET"]),
+    ])
+
+
+class StubTavilyClient:
+    """
+    Speaks the Tavily /search API and formats the context like AsyncTavilyClient.get_search_context.
+    The SDK trims the context with tiktoken, which downloads its vocabulary, so it cannot run offline.
+    """
+
+    def __init__(self, base_url: str):
+        self.http = httpx.AsyncClient(base_url=base_url, timeout=180)
+
+    async def get_search_context(self, query: str, max_results: int = 5, **kwargs) -> str:
+        response = await self.http.post("/search", json={"query": query, "max_results": max_results})
+        response.raise_for_status()
+        context = [{"url": source["url"], "content": source["content"]} for source in response.json()["results"]]
+        return json.dumps([json.dumps(item) for item in context])
+
+
+class StubS3:
+    """
+    In-process stand-in for the boto3 S3 client calls the backend makes.
+    """
+
+    def __init__(self, state: StubState, keys: int = 5000):
+        self.state = state
+        self.keys = [f"pdfs/batch-{idx % 100}/paper-{idx:05d}.pdf" for idx in range(keys)]
+
+    def _call(self):
+        profile = self.state.record("s3")
+        time.sleep(profile.delay())
+        if profile.fails():
+            self.state.failed("s3")
+            raise RuntimeError("s3 stub failure")
+
+    def list_objects_v2(self, Bucket=None, Prefix="", MaxKeys=1000, ContinuationToken=None, **kwargs):
+        self._call()
+        matching = [key for key in self.keys if key.startswith(Prefix)]
+        start = int(ContinuationToken or 0)
+        page = matching[start:start + MaxKeys]
+        response = {"Contents": [{"Key": key, "Size": 1024} for key in page], "KeyCount": len(page)}
+        if start + MaxKeys < len(matching):
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+    def head_object(self, Bucket=None, Key=None, **kwargs):
+        self._call()
+        return {"ETag": f'"{zlib.crc32(Key.encode()):08x}"', "ContentLength": 1024}
+
+    def get_object(self, Bucket=None, Key=None, **kwargs):
+        self._call()
+        raise RuntimeError("image downloads are not stubbed")
+
+
+CORPUS = [
+    f"Section {idx}: findings on {topic}, with the evaluation setup, datasets and the main results table."
+    for idx, topic in enumerate(
+        ["transformers", "diffusion models", "graph networks", "retrieval", "quantization", "agents"] * 20
+    )
+]
+
+
+class StubRetriever:
+    """
+    In-process stand-in for the Pinecone-backed LangChain retriever.
+    """
+
+    def __init__(self, state: StubState, top_k: int = 4):
+        self.state = state
+        self.top_k = top_k
+
+    def get_relevant_documents(self, query: str) -> list:
+        profile = self.state.record("pinecone")
+        time.sleep(profile.delay())
+        if profile.fails():
+            self.state.failed("pinecone")
+            raise RuntimeError("pinecone stub failure")
+        start = zlib.crc32(query.encode("utf-8")) % len(CORPUS)
+        return [
+            Document(page_content=CORPUS[(start + idx) % len(CORPUS)], metadata={"chunk": (start + idx) % len(CORPUS)})
+            for idx in range(self.top_k)
+        ]
+
+    invoke = get_relevant_documents
+
+
+def simulated_pdf_render(state: StubState):
+    def render(html: str) -> bytes:
+        profile = state.record("pdf")
+        time.sleep(profile.delay())
+        if profile.fails():
+            state.failed("pdf")
+            raise RuntimeError("pdf stub failure")
+        return b"%PDF-1.4 " + html.encode("utf-8")
+    return render
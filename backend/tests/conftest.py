@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+
+# The API modules build their clients at import time, so give them dummy credentials.
+# Tests never talk to the real services; upstream calls are served by local transports.
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-tavily-key")
+os.environ.setdefault("PINECONE_API_KEY", "test-pinecone-key")
+os.environ.setdefault("NVIDIA_API_KEY", "test-nvidia-key")
+os.environ.setdefault("ARXIV_SUMMARY_STORE", ":memory:")
+os.environ.setdefault("WARM_UP_ON_STARTUP", "false")
+
+
+def arxiv_feed(count):
+    """Builds an Arxiv Atom feed with `count` entries."""
+    entries = "".join(
+        f"""
+  <entry>
+    <id>http://arxiv.org/abs/2401.{idx:05d}v1</id>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Paper {idx} About Machine Learning</title>
+    <summary>Abstract number {idx} about machine learning.</summary>
+    <author><name>Ada Lovelace</name></author>
+    <author><name>Alan Turing</name></author>
+    <link href="http://arxiv.org/abs/2401.{idx:05d}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.{idx:05d}v1" rel="related" type="application/pdf"/>
+  </entry>"""
+        for idx in range(count)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">{entries}\n</feed>\n'
+
+
+def chat_completion(content):
+    """Builds a minimal OpenAI chat completion payload."""
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-3.5-turbo",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+class ArxivUpstreams:
+    """Local stand-ins for the Arxiv API and OpenAI, with a fixed injected latency."""
+
+    def __init__(self):
+        self.delay = 0.3
+        self.entries = 1
+        self.arxiv_calls = 0
+        self.completion_calls = 0
+
+    async def arxiv(self, request):
+        self.arxiv_calls += 1
+        await asyncio.sleep(self.delay)
+        return httpx.Response(200, text=arxiv_feed(self.entries))
+
+    async def openai(self, request):
+        self.completion_calls += 1
+        await asyncio.sleep(self.delay)
+        body = json.loads(request.content)
+        if body.get("response_format", {}).get("type") == "json_object":
+            # Batched request: answer with one summary per numbered abstract
+            count = body["messages"][-1]["content"].count("\n[")
+            content = json.dumps({"summaries": [f"Batched summary {idx}." for idx in range(count)]})
+        else:
+            content = "A short summary."
+        return httpx.Response(200, json=chat_completion(content))
+
+
+@pytest.fixture
+def arxiv_upstreams(monkeypatch):
+    from openai import AsyncOpenAI
+
+    from apis import arxiv
+    from apis.resources import LazyResource
+    from apis.summary_store import SummaryStore
+
+    def resource(value):
+        return LazyResource("test", lambda: value)
+
+    upstreams = ArxivUpstreams()
+    monkeypatch.setattr(arxiv, "summary_store", resource(SummaryStore(":memory:")))
+    monkeypatch.setattr(arxiv, "http_client", resource(httpx.AsyncClient(transport=httpx.MockTransport(upstreams.arxiv))))
+    monkeypatch.setattr(
+        arxiv,
+        "client",
+        resource(AsyncOpenAI(api_key="test", http_client=httpx.AsyncClient(transport=httpx.MockTransport(upstreams.openai)))),
+    )
+    return upstreams
+
+
+@pytest.fixture(autouse=True)
+def clear_tool_caches():
+    """Tool results are cached process-wide; start every test cold."""
+    from apis.tool_cache import tool_caches
+
+    for cache in tool_caches.values():
+        cache.clear()
+    yield
+
+
+class FakeTavily:
+    async def get_search_context(self, query):
+        return f"context for {query}"
+
+
+class FakeS3:
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None):
+        return {"KeyCount": 1, "Contents": [{"Key": f"{Prefix}paper.pdf"}]}
+
+
+@pytest.fixture
+def endpoint_upstreams(monkeypatch, arxiv_upstreams):
+    """Stubs every upstream the API endpoints call, so each route can be exercised locally."""
+    from apis import main, profiling, web
+    from apis.pdf_render import PdfRenderer
+    from apis.rag import completion_from_text
+    from apis.resources import LazyResource
+
+    async def rag_search(query, image_key=None):
+        return completion_from_text(f"answer to {query}")
+
+    async def rag_search_stream(query, image_key=None):
+        for token in ("answer ", "to ", query):
+            yield token
+
+    async def select_search_method(query):
+        return "web"
+
+    arxiv_upstreams.delay = 0
+    monkeypatch.setattr(web, "tavily_client", LazyResource("test", lambda: FakeTavily()))
+    monkeypatch.setattr(main, "rag_search", rag_search)
+    monkeypatch.setattr(main, "rag_search_stream", rag_search_stream)
+    monkeypatch.setattr(main, "llm_select_search_method", select_search_method)
+    monkeypatch.setattr(main, "s3_client", LazyResource("test", lambda: FakeS3()))
+    monkeypatch.setattr(main, "pdf_renderer", PdfRenderer(render=lambda html: b"%PDF-1.4 " + html.encode(), workers=1))
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "test-profile-token")
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "test-admin-token")
+    main.s3_listing_cache.clear()
+    return arxiv_upstreams
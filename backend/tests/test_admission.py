@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from apis import admission, main, web
+from apis.rag import completion_from_text
+from apis.resources import LazyResource
+
+
+class SlowRag:
+    """Stands in for a RAG upstream that has slowed to a crawl."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, query, image_key=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return completion_from_text(f"answer to {query}")
+
+
+class FastTavily:
+    async def get_search_context(self, query):
+        return f"context for {query}"
+
+
+@pytest.fixture
+def slow_rag(monkeypatch):
+    rag = SlowRag(delay=1.0)
+    monkeypatch.setattr(main, "rag_search", rag)
+    monkeypatch.setattr(web, "tavily_client", LazyResource("test", lambda: FastTavily()))
+    monkeypatch.setitem(admission.limiters, "nvidia", admission.AdmissionLimiter("nvidia", 2, 2, 0.3))
+    return rag
+
+
+async def timed(client, method, path, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    return response, time.perf_counter() - start
+
+
+def test_service_stays_responsive_when_an_upstream_is_slow(slow_rag):
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=10) as client:
+            rag_requests = [
+                asyncio.create_task(timed(client, "POST", "/rag-search", json={"query": f"q{idx}"}))
+                for idx in range(10)
+            ]
+            await asyncio.sleep(0.05)
+            # Other endpoints are unaffected while /rag-search is saturated
+            health, health_time = await timed(client, "GET", "/")
+            web_search, web_time = await timed(client, "POST", "/web-search", json={"query": "news"})
+            return await asyncio.gather(*rag_requests), (health, health_time), (web_search, web_time)
+
+    rag_results, (health, health_time), (web_search, web_time) = asyncio.run(run())
+
+    # Well under the slow upstream's delay: nothing waits behind the saturated group
+    fast = slow_rag.delay / 2
+    assert health.status_code == 200 and health_time < fast
+    assert web_search.json() == {"context": "context for news"} and web_time < fast
+
+    by_status = {}
+    for response, elapsed in rag_results:
+        by_status.setdefault(response.status_code, []).append(elapsed)
+    assert len(by_status[200]) == 2            # In flight
+    assert len(by_status[503]) == 2            # Queued, then shed at the 0.3s deadline
+    assert len(by_status[429]) == 6            # Rejected at once: queue full
+    assert max(by_status[429]) < fast
+    assert all(0.3 <= elapsed < 0.8 for elapsed in by_status[503])
+    assert slow_rag.calls == 2                 # Shed requests never reached the upstream
+
+    shed = next(response for response, _ in rag_results if response.status_code == 429)
+    assert int(shed.headers["retry-after"]) >= 1
+    assert "error" in shed.json()
+
+
+def test_queued_requests_are_admitted_in_order():
+    limiter = admission.AdmissionLimiter("test", max_concurrent=1, max_queue=5, queue_timeout=1.0)
+    order = []
+
+    async def request(name, hold):
+        await limiter.acquire()
+        order.append(name)
+        await asyncio.sleep(hold)
+        limiter.release(hold)
+
+    async def run():
+        await asyncio.gather(*[request(name, 0.02) for name in "abcd"])
+
+    asyncio.run(run())
+
+    assert order == list("abcd")
+    assert limiter.stats()["active"] == 0
+    assert limiter.stats()["admitted"] == 4
+
+
+def test_cancelled_waiters_do_not_leak_slots():
+    limiter = admission.AdmissionLimiter("test", max_concurrent=1, max_queue=5, queue_timeout=1.0)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release()
+        await asyncio.wait_for(limiter.acquire(), 0.1)  # The slot is free again
+        limiter.release()
+
+    asyncio.run(run())
+
+    assert limiter.stats()["active"] == 0
+    assert limiter.stats()["queued"] == 0
+
+
+def test_slot_handed_over_at_the_deadline_is_not_leaked():
+    limiter = admission.AdmissionLimiter("test", max_concurrent=1, max_queue=5, queue_timeout=0.05)
+
+    def stall_then_release():
+        # Block past the queue deadline, so the hand-off and the timeout run in the same iteration
+        time.sleep(0.1)
+        asyncio.get_running_loop().call_soon(limiter.release)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        asyncio.get_running_loop().call_later(0.01, stall_then_release)
+        try:
+            await waiter
+        except admission.Overloaded:
+            return False
+        limiter.release()
+        return True
+
+    admitted = asyncio.run(run())
+
+    assert admitted
+    assert limiter.stats()["active"] == 0
+    assert limiter.stats()["queued"] == 0
+
+
+def test_admission_stats_endpoint():
+    from fastapi.testclient import TestClient
+
+    stats = TestClient(main.app).get("/admission-stats").json()
+
+    assert set(stats) == set(admission.DEFAULT_LIMITS)
+    assert stats["nvidia"]["max_concurrent"] == admission.limiters["nvidia"].max_concurrent
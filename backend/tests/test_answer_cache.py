@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+from langchain_core.documents import Document
+
+from apis import rag
+from apis.cache import SemanticAnswerCache
+from apis.resources import LazyResource
+
+
+def test_similar_query_with_same_documents_hits():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0, 0.1], ["doc-1", "doc-2"], "answer")
+
+    assert cache.lookup([1.0, 0.05, 0.1], ["doc-2", "doc-1"]) == "answer"
+    assert cache.lookup([0.0, 1.0, 0.0], ["doc-1", "doc-2"]) is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_changed_documents_or_scope_miss():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], ["doc-1"], "answer", scope="figure.png")
+
+    assert cache.lookup([1.0, 0.0], ["doc-1", "doc-3"], scope="figure.png") is None
+    assert cache.lookup([1.0, 0.0], ["doc-1"]) is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_entries_expire_evict_and_invalidate():
+    cache = SemanticAnswerCache(max_entries=2, ttl=0.05, threshold=0.9)
+    cache.store([1.0, 0.0, 0.0], ["a"], "a")
+    cache.store([0.0, 1.0, 0.0], ["b"], "b")
+    cache.store([0.0, 0.0, 1.0], ["c"], "c")
+
+    assert cache.lookup([1.0, 0.0, 0.0], ["a"]) is None
+    assert cache.stats()["evictions"] == 1
+
+    time.sleep(0.06)
+    assert cache.lookup([0.0, 1.0, 0.0], ["b"]) is None
+    assert cache.stats()["expirations"] == 1
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        # Paraphrases of the revenue question land on the same vector
+        return [1.0, 0.0] if "revenue" in text else [0.0, 1.0]
+
+
+def test_rag_search_reuses_answer_for_paraphrase(monkeypatch):
+    generated = []
+
+    async def retrieve(query, image_key=None):
+        return [Document(page_content="Revenue grew 12%.", metadata={"id": "report-text-1"})], []
+
+    async def generate(prompt):
+        generated.append(prompt)
+        return rag.completion_from_text("Revenue grew 12%.")
+
+    monkeypatch.setattr(rag, "answer_cache", SemanticAnswerCache())
+    monkeypatch.setattr(rag, "text_embeddings", LazyResource("test", FakeEmbeddings))
+    monkeypatch.setattr(rag, "retrieve_documents", retrieve)
+    monkeypatch.setattr(rag, "call_nvidia_llama_api", generate)
+
+    first = asyncio.run(rag.rag_search("What does the report say about revenue?"))
+    second = asyncio.run(rag.rag_search("how did revenue change according to the report"))
+    asyncio.run(rag.rag_search("Who wrote the report?"))
+
+    assert first is second
+    assert len(generated) == 2
+    assert rag.answer_cache.stats()["hits"] == 1
+
+
+def test_invalidate_endpoint_requires_the_admin_token(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from apis import main
+
+    flushed = []
+    monkeypatch.setattr(main.answer_cache, "invalidate", lambda: flushed.append(True))
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+
+    assert client.post("/rag-cache/invalidate").status_code == 403
+    assert client.post("/rag-cache/invalidate", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert flushed == []
+
+    response = client.post("/rag-cache/invalidate", headers={"Authorization": "Bearer secret"})
+    assert response.json() == {"invalidated": True}
+    assert flushed == [True]
@@ -0,0 +1,191 @@
+import asyncio
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from apis import arxiv, main
+from apis.resources import LazyResource
+
+
+def timed_search(query):
+    start = time.perf_counter()
+    result = asyncio.run(arxiv.search_arxiv.ainvoke(query))
+    return time.perf_counter() - start, result
+
+
+def test_summaries_run_concurrently(arxiv_upstreams):
+    arxiv_upstreams.entries = 5
+
+    elapsed, result = timed_search("machine learning")
+
+    assert [paper["summary"] for paper in result["results"]] == ["A short summary."] * 5
+    assert arxiv_upstreams.completion_calls == 5
+    # One Arxiv round trip plus roughly one LLM round trip, not five in a row
+    assert elapsed < arxiv_upstreams.delay * 4
+
+
+def test_latency_does_not_grow_with_result_count(arxiv_upstreams):
+    arxiv_upstreams.entries = 1
+    single, _ = timed_search("machine learning")
+
+    arxiv_upstreams.entries = arxiv.SUMMARY_CONCURRENCY
+    many, _ = timed_search("machine learning")
+
+    assert many < single * 1.5
+
+
+def test_results_with_failed_summaries_are_not_cached(arxiv_upstreams, monkeypatch):
+    arxiv_upstreams.entries = 2
+    summarize_text = arxiv.summarize_text
+    failures = [arxiv.SUMMARY_UNAVAILABLE]
+
+    async def flaky_summarize(text):
+        return failures.pop() if failures else await summarize_text(text)
+
+    monkeypatch.setattr(arxiv, "summarize_text", flaky_summarize)
+
+    _, first = timed_search("machine learning")
+    _, second = timed_search("machine learning")
+    _, third = timed_search("machine learning")
+
+    assert arxiv.SUMMARY_UNAVAILABLE in [paper["summary"] for paper in first["results"]]
+    assert [paper["summary"] for paper in second["results"]] == ["A short summary."] * 2
+    assert third == second
+    # The failed call and its retry reach Arxiv; the complete result is then cached
+    assert arxiv_upstreams.arxiv_calls == 2
+    assert arxiv_upstreams.completion_calls == 2
+
+
+def test_batch_mode_uses_one_completion(arxiv_upstreams, monkeypatch):
+    monkeypatch.setattr(arxiv, "SUMMARY_MODE", "batch")
+    arxiv_upstreams.entries = 4
+
+    _, result = timed_search("machine learning")
+
+    assert arxiv_upstreams.completion_calls == 1
+    assert [paper["summary"] for paper in result["results"]] == [f"Batched summary {idx}." for idx in range(4)]
+
+
+def test_batch_mode_falls_back_when_split_fails(arxiv_upstreams, monkeypatch):
+    async def short_batch(abstracts):
+        return None
+
+    monkeypatch.setattr(arxiv, "summarize_batch", short_batch)
+
+    summaries = asyncio.run(arxiv.summarize_abstracts(["one", "two", "three"], mode="batch"))
+
+    assert summaries == ["A short summary."] * 3
+    assert arxiv_upstreams.completion_calls == 3
+
+
+def test_stream_yields_stored_papers_before_fresh_summaries(arxiv_upstreams):
+    arxiv_upstreams.entries = 3
+    arxiv.summary_store.get().put_many([("http://arxiv.org/abs/2401.00002v1", "Abstract number 2 about machine learning.", "Stored.")])
+
+    async def collect():
+        start = time.perf_counter()
+        events = []
+        async for item in arxiv.search_arxiv_stream("machine learning"):
+            events.append((time.perf_counter() - start, item))
+        return events
+
+    events = asyncio.run(collect())
+
+    first_at, first = events[0]
+    assert first["paper"]["summary"] == "Stored."
+    # Only the Arxiv round trip, no LLM call, before the first paper goes out
+    assert first_at < arxiv_upstreams.delay * 1.5
+    assert sorted(item["paper"]["title"] for _, item in events) == [f"Paper {idx} About Machine Learning" for idx in range(3)]
+    assert arxiv_upstreams.completion_calls == 2
+
+
+def atom_feed(start, stop, total):
+    entries = "".join(
+        f"<entry><id>http://arxiv.org/abs/2401.{idx:05d}v1</id><title>Paper {idx}</title>"
+        f"<summary>Abstract {idx}.</summary><author><name>Ada Lovelace</name></author>"
+        f"<author><name>Alan Turing</name></author>"
+        f'<link title="pdf" href="http://arxiv.org/pdf/2401.{idx:05d}v1" rel="related"/></entry>'
+        for idx in range(start, stop)
+    )
+    return (
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>{entries}</feed>"
+    )
+
+
+def paged_feed(total):
+    """Serves `total` results, honouring start/max_results like the Arxiv API."""
+    requests = []
+
+    async def handler(request):
+        start, size = int(request.url.params["start"]), int(request.url.params["max_results"])
+        requests.append((start, size))
+        return httpx.Response(200, text=atom_feed(start, min(start + size, total), total))
+
+    return handler, requests
+
+
+def collect_pages(query, max_results, **kwargs):
+    async def collect():
+        return [item async for item in arxiv.search_arxiv_pages(query, max_results, **kwargs)]
+
+    return asyncio.run(collect())
+
+
+def test_feed_parser_matches_whole_feed_parsing_when_fed_in_chunks():
+    feed = atom_feed(0, 50, 50).encode()
+    parser = arxiv.FeedParser()
+
+    records = []
+    for offset in range(0, len(feed), 64):
+        records.extend(parser.feed(feed[offset:offset + 64]))
+    records.extend(parser.close())
+
+    papers, abstracts = arxiv.parse_papers(feed)
+    assert [record["abstract"] for record in records] == abstracts
+    assert [record["title"] for record in records] == [paper["title"] for paper in papers]
+    assert records[7]["pdf_url"] == papers[7]["pdf_url"] == "http://arxiv.org/pdf/2401.00007v1"
+    assert records[7]["authors"] == ["Ada Lovelace", "Alan Turing"]
+    assert parser.total_results == 50
+    # Entries are dropped from the tree once parsed, so nothing accumulates
+    assert parser._root.find(arxiv.ATOM + "entry") is None
+
+
+def test_deep_search_pages_through_results_without_summaries(arxiv_upstreams, monkeypatch):
+    handler, requests = paged_feed(total=45)
+    monkeypatch.setattr(arxiv, "http_client", LazyResource("test", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+    monkeypatch.setattr(arxiv, "ARXIV_PAGE_DELAY", 0)
+
+    items = collect_pages("machine learning", 100, page_size=20)
+
+    assert requests == [(0, 20), (20, 20), (40, 20)]  # Stops at totalResults
+    assert [item["paper"]["title"] for item in items] == [f"Paper {idx}" for idx in range(45)]
+    assert "summary" not in items[0]["paper"]
+    assert arxiv_upstreams.completion_calls == 0
+
+    requests.clear()
+    assert len(collect_pages("machine learning", 30, page_size=20)) == 30
+    assert requests == [(0, 20), (20, 10)]
+
+
+def test_deep_search_summarizes_on_request(arxiv_upstreams, monkeypatch):
+    handler, _ = paged_feed(total=3)
+    monkeypatch.setattr(arxiv, "http_client", LazyResource("test", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+
+    items = collect_pages("machine learning", 10, summarize=True)
+
+    assert [item["paper"]["summary"] for item in items] == ["A short summary."] * 3
+    assert arxiv_upstreams.completion_calls == 3
+
+
+def test_deep_search_endpoint_streams_papers(arxiv_upstreams, monkeypatch):
+    handler, _ = paged_feed(total=5)
+    monkeypatch.setattr(arxiv, "http_client", LazyResource("test", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))))
+    client = TestClient(main.app)
+
+    body = client.post("/copilotkit_remote/deep", json={"query": "machine learning", "max_results": 5}).text
+
+    assert body.count("event: paper") == 5
+    assert 'event: done\ndata: {"count": 5}' in body
+    assert "error" in client.post("/copilotkit_remote/deep", json={"query": "ml", "max_results": 10**6}).json()
@@ -0,0 +1,154 @@
+import asyncio
+import gzip
+import json
+import time
+
+from apis import arxiv
+from apis.arxiv_mirror import ArxivMirror, feed_record, iso_timestamp, read_dump
+from apis.resources import LazyResource
+
+TOPICS = ["graph neural networks", "protein folding", "dark matter halos", "retrieval augmented generation"]
+
+
+def snapshot_dump(path, count, update_date="2024-01-05"):
+    """Writes a gzipped dump in the JSON lines layout of the Arxiv metadata snapshot."""
+    with gzip.open(path, "wt") as dump:
+        for idx in range(count):
+            topic = TOPICS[idx % len(TOPICS)]
+            dump.write(json.dumps({
+                "id": f"2312.{idx:05d}",
+                "authors": "Ada Lovelace and Alan Turing",
+                "authors_parsed": [["Lovelace", "Ada", ""], ["Turing", "Alan", ""]],
+                "title": f"Scaling {topic}\n  study {idx}",
+                "abstract": f"  We study {topic} at scale, experiment {idx}.\n",
+                "categories": "cs.LG",
+                "versions": [{"version": "v1", "created": "Mon, 1 Jan 2024 10:00:00 GMT"}, {"version": "v2", "created": "Fri, 5 Jan 2024 10:00:00 GMT"}],
+                "update_date": update_date,
+            }) + "\n")
+    return str(path)
+
+
+def oai_dump(path, records):
+    """Writes an OAI-PMH ListRecords harvest in the "arXiv" metadata format."""
+    body = ""
+    for arxiv_id, title, updated in records:
+        if title is None:
+            body += f'<record><header status="deleted"><identifier>oai:arXiv.org:{arxiv_id}</identifier></header></record>'
+            continue
+        body += f"""<record><header><identifier>oai:arXiv.org:{arxiv_id}</identifier><datestamp>{updated}</datestamp></header>
+<metadata><arXiv xmlns="http://arxiv.org/OAI/arXiv/"><id>{arxiv_id}</id><created>2024-01-01</created><updated>{updated}</updated>
+<authors><author><keyname>Hopper</keyname><forenames>Grace</forenames></author></authors>
+<title>{title}</title><categories>cs.CL</categories><abstract>An abstract about {title.lower()}.</abstract></arXiv></metadata></record>"""
+    path.write_text(f'<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><ListRecords>{body}</ListRecords></OAI-PMH>')
+    return str(path)
+
+
+def test_search_loaded_snapshot(tmp_path):
+    mirror = ArxivMirror(str(tmp_path / "mirror.db"))
+
+    assert mirror.load(read_dump(snapshot_dump(tmp_path / "snapshot.jsonl.gz", 400))) == {"loaded": 400, "skipped": 0, "deleted": 0}
+
+    start = time.perf_counter()
+    papers = mirror.search("protein folding", limit=5)
+    elapsed = time.perf_counter() - start
+
+    assert len(papers) == 5 and elapsed < 0.05
+    assert all("protein folding" in paper["title"].lower() for paper in papers)
+    assert papers[0]["authors"] == ["Ada Lovelace", "Alan Turing"]
+    assert papers[0]["link"].startswith("http://arxiv.org/abs/2312.") and papers[0]["link"].endswith("v2")
+    assert papers[0]["published"] == "2024-01-01T10:00:00Z"
+    # Every term must match; query syntax characters are plain text
+    assert mirror.search("protein halos") == []
+    assert mirror.search('dark "matter" OR (NEAR') == []
+    assert len(mirror.search("dark matter", limit=200)) == 100
+    # No title has "experiment", so the full index answers
+    assert mirror.search("scale experiment 7")[0]["title"] == "Scaling retrieval augmented generation study 7"
+
+
+def test_incremental_updates_replace_newer_and_delete(tmp_path):
+    mirror = ArxivMirror(str(tmp_path / "mirror.db"))
+    mirror.load(read_dump(snapshot_dump(tmp_path / "snapshot.jsonl.gz", 8)))
+
+    harvest = oai_dump(tmp_path / "harvest.xml", [
+        ("2312.00001", "Quantum Annealing Revisited", "2024-02-01"),   # Newer: replaces the paper
+        ("2312.00002", "Stale Title", "2023-12-01"),                   # Older than the mirror: ignored
+        ("2312.00003", None, None),                                    # Withdrawn
+        ("2402.00001", "Sparse Attention Kernels", "2024-02-01"),      # New paper
+    ])
+    counts = mirror.load(read_dump(harvest))
+
+    assert counts == {"loaded": 2, "skipped": 1, "deleted": 1}
+    assert [paper["title"] for paper in mirror.search("quantum annealing")] == ["Quantum Annealing Revisited"]
+    assert mirror.search("scaling protein folding study 1") == []
+    assert mirror.search("stale title") == []
+    assert mirror.search("sparse attention")[0]["authors"] == ["Grace Hopper"]
+    assert mirror.stats()["papers"] == 8
+    # Reloading the same harvest changes nothing
+    assert mirror.load(read_dump(harvest)) == {"loaded": 0, "skipped": 3, "deleted": 0}
+
+
+def atom_entry(arxiv_id, title, updated):
+    return f"""<entry><id>http://arxiv.org/abs/{arxiv_id}</id><published>2024-01-01T10:00:00Z</published>
+<updated>{updated}</updated><title>{title}</title><summary>An abstract about {title.lower()}.</summary>
+<author><name>Grace Hopper</name></author></entry>"""
+
+
+def test_revised_entries_from_the_api_replace_older_rows(tmp_path):
+    mirror = ArxivMirror(str(tmp_path / "mirror.db"))
+    # Snapshot rows are dated by day only: updated 2024-01-05
+    mirror.load(read_dump(snapshot_dump(tmp_path / "snapshot.jsonl.gz", 8)))
+    feed = '<feed xmlns="http://www.w3.org/2005/Atom">' + "".join([
+        atom_entry("2312.00001v3", "Quantum Annealing Revisited", "2024-01-05T09:30:00Z"),  # Revised later that day
+        atom_entry("2312.00002v1", "Stale Title", "2024-01-04T23:00:00Z"),                  # Older than the mirror
+    ]) + "</feed>"
+
+    papers, abstracts = arxiv.parse_papers(feed)
+    counts = mirror.upsert([feed_record(paper, abstract) for paper, abstract in zip(papers, abstracts)])
+
+    assert papers[0]["updated"] == "2024-01-05T09:30:00Z"
+    assert counts == {"loaded": 1, "skipped": 1, "deleted": 0}
+    revised = mirror.search("quantum annealing")[0]
+    assert revised["link"] == "http://arxiv.org/abs/2312.00001v3"
+    assert revised["updated"] == "2024-01-05T09:30:00Z"
+    assert mirror.search("stale title") == []
+
+
+def test_dates_are_normalized_to_one_format():
+    assert iso_timestamp("2024-01-05") == "2024-01-05T00:00:00Z"
+    assert iso_timestamp("2024-01-05T09:30:00Z") == "2024-01-05T09:30:00Z"
+    assert iso_timestamp("2024-01-05T11:30:00+02:00") == "2024-01-05T09:30:00Z"
+    assert iso_timestamp("Fri, 5 Jan 2024 10:00:00 GMT") == "2024-01-05T10:00:00Z"
+    assert iso_timestamp("") == ""
+
+
+def test_search_arxiv_answers_from_the_mirror_first(arxiv_upstreams, tmp_path, monkeypatch):
+    mirror = ArxivMirror(str(tmp_path / "mirror.db"))
+    mirror.load(read_dump(snapshot_dump(tmp_path / "snapshot.jsonl.gz", 40)))
+    monkeypatch.setattr(arxiv, "mirror", LazyResource("test", lambda: mirror))
+    arxiv_upstreams.entries = 5
+
+    hit = asyncio.run(arxiv.search_arxiv.ainvoke("graph neural networks"))
+
+    assert arxiv_upstreams.arxiv_calls == 0
+    assert len(hit["results"]) == 5
+    assert all(paper["summary"] == "A short summary." for paper in hit["results"])
+
+    # A miss goes to the API, and its results are mirrored for next time
+    miss = asyncio.run(arxiv.search_arxiv.ainvoke("machine learning"))
+    assert arxiv_upstreams.arxiv_calls == 1
+    assert len(miss["results"]) == 5
+    assert len(mirror.search("machine learning")) == 5
+    assert mirror.stats()["papers"] == 45
+
+
+def test_stale_mirror_falls_back_to_the_api(arxiv_upstreams, tmp_path, monkeypatch):
+    mirror = ArxivMirror(str(tmp_path / "mirror.db"))
+    mirror.load(read_dump(snapshot_dump(tmp_path / "snapshot.jsonl.gz", 40)))
+    monkeypatch.setattr(arxiv, "mirror", LazyResource("test", lambda: mirror))
+    monkeypatch.setattr(arxiv, "ARXIV_MIRROR_MAX_AGE", 60)
+    monkeypatch.setattr(time, "time", lambda: mirror.loaded_at() + 120)
+    arxiv_upstreams.entries = 5
+
+    asyncio.run(arxiv.search_arxiv.ainvoke("graph neural networks"))
+
+    assert arxiv_upstreams.arxiv_calls == 1
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+from apis import arxiv
+
+PARALLEL_REQUESTS = 10
+
+
+def test_search_arxiv_returns_results(arxiv_upstreams):
+    result = asyncio.run(arxiv.search_arxiv.ainvoke("machine learning"))
+
+    paper = result["results"][0]
+    assert paper["title"] == "Paper 0 About Machine Learning"
+    assert paper["summary"] == "A short summary."
+    assert paper["authors"] == ["Ada Lovelace", "Alan Turing"]
+    assert paper["pdf_url"] == "http://arxiv.org/pdf/2401.00000v1"
+
+
+def test_parallel_requests_take_about_as_long_as_one(arxiv_upstreams):
+    async def timed(n):
+        start = time.perf_counter()
+        results = await asyncio.gather(*(arxiv.search_arxiv.ainvoke(f"query {i}") for i in range(n)))
+        return time.perf_counter() - start, results
+
+    async def run():
+        single, _ = await timed(1)
+        parallel, results = await timed(PARALLEL_REQUESTS)
+        return single, parallel, results
+
+    single, parallel, results = asyncio.run(run())
+
+    assert all("results" in result for result in results)
+    # Serialised on the event loop this would take PARALLEL_REQUESTS times as long
+    assert parallel < single * 2
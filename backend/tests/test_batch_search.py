@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from apis import main
+
+
+def fake_tools(monkeypatch, delay=0.05):
+    calls = []
+    active = {"web": 0, "rag": 0, "arxiv": 0}
+    peak = dict(active)
+
+    def handler(tool):
+        async def run(payload):
+            calls.append((tool, payload["query"]))
+            active[tool] += 1
+            peak[tool] = max(peak[tool], active[tool])
+            await asyncio.sleep(delay)
+            active[tool] -= 1
+            return {"results": [{"title": tool, "summary": payload["query"]}]}
+        return run
+
+    for tool in main.BATCH_TOOLS:
+        monkeypatch.setitem(main.BATCH_TOOLS, tool, handler(tool))
+    return calls, peak
+
+
+def test_batch_dedupes_and_preserves_order(monkeypatch):
+    calls, _ = fake_tools(monkeypatch)
+    queries = [
+        {"query": "latest nvidia stock price", "tool": "web"},
+        {"query": "papers on diffusion models", "tool": "arxiv"},
+        {"query": "latest  nvidia stock price ", "tool": "web"},
+        {"query": "summarize the uploaded report", "tool": "rag"},
+    ]
+
+    response = TestClient(main.app).post("/batch-search", json={"queries": queries}).json()
+
+    assert [result["index"] for result in response["results"]] == [0, 1, 2, 3]
+    assert [result["tool"] for result in response["results"]] == ["web", "arxiv", "web", "rag"]
+    assert response["results"][2]["result"] == response["results"][0]["result"]
+    assert response["unique"] == 3
+    assert len(calls) == 3
+
+
+def test_batch_routes_queries_without_tool(monkeypatch):
+    fake_tools(monkeypatch)
+
+    response = TestClient(main.app).post(
+        "/batch-search", json={"queries": ["recent arxiv papers on graph neural networks"]}
+    ).json()
+
+    assert response["results"][0]["tool"] == "arxiv"
+
+
+def test_batch_reports_malformed_entries_per_item(monkeypatch):
+    calls, _ = fake_tools(monkeypatch)
+    client = TestClient(main.app)
+    queries = [7, None, {"query": "valid question", "tool": "web"}, {"query": "q", "tool": ["web"]}, {"query": 3}, "  "]
+
+    response = client.post("/batch-search", json={"queries": queries})
+
+    assert response.status_code == 200
+    errors = [result["result"].get("error") for result in response.json()["results"]]
+    assert errors == [
+        "Each query must be a string or an object, not int",
+        "Each query must be a string or an object, not NoneType",
+        None,
+        "tool must be a string",
+        "query must be a string",
+        "No query provided",
+    ]
+    assert calls == [("web", "valid question")]
+    assert client.post("/batch-search", json={"queries": "not a list"}).json() == {"error": "queries must be a list"}
+    assert client.post("/batch-search", json={"queries": ["q"], "tool": 1}).json() == {"error": "tool must be a string"}
+
+
+def test_batch_respects_upstream_limits(monkeypatch):
+    _, peak = fake_tools(monkeypatch)
+    monkeypatch.setitem(main.BATCH_CONCURRENCY, "arxiv", 2)
+    queries = [{"query": f"topic {i}", "tool": "arxiv"} for i in range(8)]
+
+    response = TestClient(main.app).post("/batch-search", json={"queries": queries}).json()
+
+    assert len(response["results"]) == 8
+    assert peak["arxiv"] == 2
+
+
+def test_batch_streams_results_in_order(monkeypatch):
+    fake_tools(monkeypatch)
+    queries = [{"query": f"topic {i}", "tool": "web"} for i in range(3)]
+
+    with TestClient(main.app).stream("POST", "/batch-search", json={"queries": queries, "stream": True}) as response:
+        events = [line for line in response.iter_lines() if line.startswith("data: ")]
+
+    payloads = [json.loads(line[len("data: "):]) for line in events]
+    assert [payload.get("index") for payload in payloads[:3]] == [0, 1, 2]
+    assert payloads[-1] == {"count": 3, "unique": 3}
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+from apis.cache import CachedQueryEmbeddings, TTLCache
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.queries = []
+
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text))]
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(ttl=0.05)
+    cache.set("key", "value")
+
+    assert cache.get("key") == "value"
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_bound_evicts_until_values_fit():
+    cache = TTLCache(max_entries=100, max_bytes=3 * 2048)
+    for key in range(5):
+        cache.set(key, np.zeros(512, dtype=np.float32))
+
+    assert cache.stats()["size"] == 3
+    assert cache.stats()["bytes"] == 3 * 2048
+    assert cache.get(0) is None
+    assert cache.get(4) is not None
+
+
+def test_query_embeddings_are_cached_per_model_and_normalized_query():
+    inner = CountingEmbeddings()
+    embeddings = CachedQueryEmbeddings(inner, model="test-model", cache=TTLCache())
+
+    first = embeddings.embed_query("graph  neural networks ")
+    second = embeddings.embed_query(" graph neural networks")
+    third = asyncio.run(embeddings.aembed_query("graph neural networks"))
+
+    assert first == second == third
+    assert inner.queries == ["graph neural networks"]
+    assert embeddings.cache.stats()["hits"] == 2
@@ -0,0 +1,66 @@
+import pytest
+from langchain_core.documents import Document
+
+from apis import context
+from apis.resources import LazyResource
+
+
+class WordEncoding:
+    """Stands in for a tiktoken encoding: one token per word."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokenizer(monkeypatch):
+    monkeypatch.setattr(context, "tokenizer", LazyResource("test", WordEncoding))
+
+
+def chunk(text, **metadata):
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_near_duplicates_are_dropped():
+    docs = [
+        chunk("Revenue grew twelve percent in the third quarter driven by cloud sales"),
+        chunk("Revenue grew twelve percent in the third quarter, driven by cloud sales."),
+        chunk("Operating costs fell after the data center consolidation"),
+    ]
+
+    packed = context.pack_context("revenue growth", docs, token_budget=1000)
+
+    assert len(packed) == 2
+    assert packed[0].page_content == docs[0].page_content
+
+
+def test_packing_respects_token_budget():
+    docs = [chunk(" ".join(f"word{i}-{j}" for j in range(300))) for i in range(5)]
+
+    packed = context.pack_context("word0", docs, token_budget=700)
+
+    assert sum(context.count_tokens(doc.page_content) for doc in packed) <= 700
+    assert len(packed) == 3
+    assert context.count_tokens(packed[-1].page_content) == 100
+
+
+def test_mmr_prefers_diverse_chunks():
+    docs = [
+        chunk("transformer attention heads scale with model width"),
+        chunk("transformer attention heads scale with model depth and width"),
+        chunk("protein folding benchmarks measure structure accuracy"),
+    ]
+
+    packed = context.pack_context("transformer attention", docs, token_budget=1000, dedup_threshold=1.1, mmr_lambda=0.3)
+
+    assert [doc.page_content for doc in packed][:2] == [docs[0].page_content, docs[2].page_content]
+
+
+def test_token_counts_are_estimated_without_tokenizer(monkeypatch):
+    monkeypatch.setattr(context, "tokenizer", LazyResource("test", lambda: None))
+
+    assert context.count_tokens("x" * 40) == 10
+    assert context.truncate_to_tokens("x" * 40, 2) == "x" * 8
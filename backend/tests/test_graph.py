@@ -0,0 +1,74 @@
+import asyncio
+import json
+import time
+
+from langchain_core.messages import HumanMessage
+
+from apis import main
+
+
+def fake_sources(monkeypatch, delays=None, failures=()):
+    calls = []
+    delays = delays or {}
+
+    def handler(source):
+        async def run(query):
+            calls.append(source)
+            await asyncio.sleep(delays.get(source, 0.05))
+            if source in failures:
+                raise RuntimeError(f"{source} is down")
+            return [{"title": f"{source} result", "summary": query, "link": f"https://{source}.example/1"}]
+        return run
+
+    for source in main.GRAPH_TOOLS:
+        monkeypatch.setitem(main.GRAPH_TOOLS, source, handler(source))
+    return calls
+
+
+def run_graph(query, **state):
+    result = asyncio.run(main.workflow.ainvoke({"messages": [HumanMessage(content=query)], **state}))
+    return json.loads(result["messages"][-1].content)
+
+
+def test_named_sources_run_in_parallel(monkeypatch):
+    calls = fake_sources(monkeypatch, delays={"arxiv": 0.2, "web": 0.2})
+
+    start = time.perf_counter()
+    answer = run_graph("compare arxiv papers and web news on diffusion models")
+    elapsed = time.perf_counter() - start
+
+    assert sorted(calls) == ["arxiv", "web"]
+    assert elapsed < 0.35  # Both branches overlapped instead of running back to back
+    assert {item["title"] for item in answer["results"]} == {"arxiv result", "web result"}
+    assert set(answer["timings"]) == {"fetch_arxiv", "web_search"}
+
+
+def test_single_route_without_keywords(monkeypatch):
+    calls = fake_sources(monkeypatch)
+
+    answer = run_graph("recent papers on graph neural networks")
+
+    assert len(calls) == 1
+    assert len(answer["results"]) == 1
+
+
+def test_multi_mode_queries_top_ranked_sources(monkeypatch):
+    calls = fake_sources(monkeypatch)
+    monkeypatch.setattr(main, "GRAPH_MULTI_SOURCES", 2)
+
+    answer = run_graph("recent papers on graph neural networks", mode="multi")
+
+    assert len(calls) == 2
+    assert calls[0] != calls[1]
+    assert len(answer["results"]) == 2
+
+
+def test_failing_and_slow_branches_do_not_block_the_answer(monkeypatch):
+    fake_sources(monkeypatch, delays={"web": 1.0}, failures=("rag",))
+    monkeypatch.setattr(main, "GRAPH_BRANCH_TIMEOUT", 0.2)
+
+    answer = run_graph("search arxiv, rag and web for transformers")
+
+    assert [item["title"] for item in answer["results"]] == ["arxiv result"]
+    assert answer["errors"]["rag"] == "rag is down"
+    assert "timed out" in answer["errors"]["web"]
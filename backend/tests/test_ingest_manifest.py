@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from apis.ingest_manifest import CONVERTED, EMBEDDED, IngestManifest, fingerprint, force_reprocess
+
+
+def listing(count, version="v1", prefix="pdfs/", suffix=".pdf"):
+    """list_objects_v2 "Contents" entries, with the quoted ETags S3 returns."""
+    return [
+        {"Key": f"{prefix}paper{idx}{suffix}", "ETag": f'"{version}-{idx}"', "Size": 1000 + idx, "LastModified": "2024-01-01"}
+        for idx in range(count)
+    ]
+
+
+def test_pending_skips_unchanged_objects(tmp_path):
+    manifest = IngestManifest(str(tmp_path / "manifest.db"))
+    objects = listing(5)
+
+    assert manifest.pending(objects, CONVERTED) == objects
+    for item in objects[:3]:
+        manifest.mark_done(item["Key"], fingerprint(item), CONVERTED, markdown="outputs/x.md")
+
+    assert [item["Key"] for item in manifest.pending(objects, CONVERTED)] == ["pdfs/paper3.pdf", "pdfs/paper4.pdf"]
+    # Stages are tracked separately
+    assert manifest.pending(objects, EMBEDDED) == objects
+    # A re-uploaded object gets a new ETag and is processed again
+    changed = [dict(objects[1], ETag='"v2-1"')] + objects[2:3]
+    assert manifest.pending(changed, CONVERTED) == changed[:1]
+    assert manifest.pending(objects, CONVERTED, force=True) == objects
+
+    status = manifest.status("pdfs/paper0.pdf")
+    assert status[CONVERTED]["fingerprint"] == "v1-0"
+    assert status[CONVERTED]["details"] == {"markdown": "outputs/x.md"}
+    assert manifest.details("pdfs/paper0.pdf", CONVERTED) == {"markdown": "outputs/x.md"}
+    assert manifest.details("pdfs/paper0.pdf", EMBEDDED) == {}
+    assert manifest.status("pdfs/missing.pdf") == {}
+
+
+def test_manifest_persists_across_runs(tmp_path):
+    objects = listing(4)
+    manifest = IngestManifest(str(tmp_path / "state" / "manifest.db"))
+    for item in objects:
+        manifest.mark_done(item["Key"], fingerprint(item), CONVERTED)
+    manifest.mark_done(objects[0]["Key"], fingerprint(objects[0]), EMBEDDED)
+    manifest.close()
+
+    reopened = IngestManifest(str(tmp_path / "state" / "manifest.db"))
+
+    assert reopened.pending(objects, CONVERTED) == []
+    assert reopened.stats() == {CONVERTED: 4, EMBEDDED: 1}
+
+
+def test_fingerprint_falls_back_without_etag():
+    assert fingerprint({"Key": "a.pdf", "ETag": '"abc-2"'}) == "abc-2"
+    assert fingerprint({"Key": "a.pdf", "LastModified": "2024-01-01", "Size": 10}) == "2024-01-01:10"
+
+
+def test_force_reprocess_from_run_conf_or_env(monkeypatch):
+    monkeypatch.delenv("INGEST_FORCE", raising=False)
+
+    assert not force_reprocess()
+    assert not force_reprocess({"dag_run": SimpleNamespace(conf=None)})
+    assert force_reprocess({"dag_run": SimpleNamespace(conf={"force": True})})
+
+    monkeypatch.setenv("INGEST_FORCE", "true")
+    assert force_reprocess({})
@@ -0,0 +1,43 @@
+import asyncio
+
+from apis import main
+from benchmarks.bench_load import ServerThread, compare, drive, install_stubs
+from benchmarks.upstream_stubs import StubState, UpstreamProfile, create_stub_app
+
+
+def test_endpoints_run_offline_against_the_stubs(monkeypatch):
+    state = StubState()
+    with ServerThread(create_stub_app(state)) as stubs:
+        install_stubs(stubs.url, state, setattr=monkeypatch.setattr)
+        with ServerThread(main.app) as server:
+            results = asyncio.run(drive(server.url, ["web-search", "rag-search", "arxiv"], [1, 2], 4, 0.0, state))
+
+    assert [(run["endpoint"], run["concurrency"]) for run in results] == [
+        ("web-search", 1), ("web-search", 2), ("rag-search", 1), ("rag-search", 2), ("arxiv", 1), ("arxiv", 2),
+    ]
+    assert all(run["failures"] == 0 for run in results)
+    assert all(run["p50_ms"] <= run["p95_ms"] <= run["p99_ms"] for run in results)
+    assert state.calls["tavily"] == 8
+    assert state.calls["nvidia"] == 8
+    assert state.calls["arxiv"] == 8
+
+
+def test_injected_errors_count_as_failures(monkeypatch):
+    state = StubState({"tavily": UpstreamProfile(error_rate=1.0)})
+    with ServerThread(create_stub_app(state)) as stubs:
+        install_stubs(stubs.url, state, setattr=monkeypatch.setattr)
+        with ServerThread(main.app) as server:
+            results = asyncio.run(drive(server.url, ["web-search"], [2], 4, 0.0, state))
+
+    assert results[0]["failures"] == 4
+    assert state.errors["tavily"] == 4
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": [{"endpoint": "rag-search", "concurrency": 8, "p95_ms": 100.0, "throughput_rps": 50.0}]}
+    report = {"results": [{"endpoint": "rag-search", "concurrency": 8, "p95_ms": 130.0, "throughput_rps": 49.0}]}
+
+    regressions = compare(report, baseline, threshold=0.1)
+
+    assert [(run["endpoint"], run["concurrency"]) for run in regressions] == [("rag-search", 8)]
+    assert compare(baseline, baseline, threshold=0.1) == []
@@ -0,0 +1,151 @@
+import time
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from apis import main, metrics, web
+from apis.resources import LazyResource
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def requests_for(endpoint, method="GET", status="200"):
+    return sample("http_requests_total", method=method, endpoint=endpoint, status=status)
+
+
+def stage_count(stage):
+    return sample("stage_duration_seconds_count", stage=stage)
+
+
+class FakeTavily:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def get_search_context(self, query):
+        if self.fail:
+            raise RuntimeError("tavily is down")
+        return f"context for {query}"
+
+
+def test_requests_are_counted_and_timed_per_endpoint(monkeypatch):
+    monkeypatch.setattr(web, "tavily_client", LazyResource("test", lambda: FakeTavily()))
+    client = TestClient(main.app)
+    before = {
+        "/": requests_for("/"),
+        "/web-search": requests_for("/web-search", method="POST"),
+        "tavily": stage_count("tavily"),
+    }
+
+    client.get("/")
+    client.post("/web-search", json={"query": "nvidia news"})
+    body = client.get("/metrics").text
+
+    assert requests_for("/") == before["/"] + 1
+    assert requests_for("/web-search", method="POST") == before["/web-search"] + 1
+    assert stage_count("tavily") == before["tavily"] + 1
+    assert sample("http_requests_in_flight", endpoint="/web-search") == 0
+    assert 'http_request_duration_seconds_count{endpoint="/web-search",method="POST"}' in body
+    assert 'stage_duration_seconds_bucket{le="0.005",stage="tavily"}' in body
+
+
+PROFILE_AUTH = {"Authorization": "Bearer test-profile-token"}
+ADMIN_AUTH = {"Authorization": "Bearer test-admin-token"}
+
+# One request per route: (method, route template, path, request kwargs, expected status)
+ENDPOINT_CASES = [
+    ("GET", "/", "/", {}, "200"),
+    ("GET", "/ready", "/ready", {}, "503"),
+    ("GET", "/metrics", "/metrics", {}, "200"),
+    ("GET", "/list-s3-files/", "/list-s3-files/?prefix=pdfs/", {}, "200"),
+    ("POST", "/list-s3-files/invalidate", "/list-s3-files/invalidate", {"headers": ADMIN_AUTH}, "200"),
+    ("POST", "/smart-query", "/smart-query", {"json": {"query": "what is new"}}, "200"),
+    ("POST", "/web-search", "/web-search", {"json": {"query": "nvidia news"}}, "200"),
+    ("POST", "/rag-search", "/rag-search", {"json": {"query": "summarize the report"}}, "200"),
+    ("POST", "/rag-search/stream", "/rag-search/stream", {"json": {"query": "summarize the report"}}, "200"),
+    ("POST", "/copilotkit_remote", "/copilotkit_remote", {"json": {"query": "diffusion models"}}, "200"),
+    ("POST", "/copilotkit_remote/stream", "/copilotkit_remote/stream", {"json": {"query": "diffusion models"}}, "200"),
+    ("POST", "/copilotkit_remote/deep", "/copilotkit_remote/deep", {"json": {"query": "diffusion models", "max_results": 2}}, "200"),
+    ("POST", "/batch-search", "/batch-search", {"json": {"queries": ["nvidia news"], "tool": "web"}}, "200"),
+    ("GET", "/admin/profiling", "/admin/profiling", {"headers": PROFILE_AUTH}, "200"),
+    ("POST", "/admin/profiling", "/admin/profiling", {"json": {"sample_rate": 0}, "headers": PROFILE_AUTH}, "200"),
+    ("GET", "/upstream-stats", "/upstream-stats", {}, "200"),
+    ("GET", "/admission-stats", "/admission-stats", {}, "200"),
+    ("GET", "/cache-stats", "/cache-stats", {}, "200"),
+    ("POST", "/rag-cache/invalidate", "/rag-cache/invalidate", {"headers": ADMIN_AUTH}, "200"),
+    ("POST", "/convert-text-to-pdf", "/convert-text-to-pdf", {"json": {"text": "# Report"}}, "200"),
+]
+
+
+def test_every_route_has_a_metrics_case():
+    routes = {(method, route.path) for route in main.app.routes if isinstance(route, APIRoute) for method in route.methods}
+
+    assert routes == {(method, template) for method, template, *_ in ENDPOINT_CASES}
+
+
+@pytest.mark.parametrize(
+    "method, template, path, kwargs, status", ENDPOINT_CASES, ids=[f"{case[0]} {case[1]}" for case in ENDPOINT_CASES]
+)
+def test_each_endpoint_is_counted_and_timed_by_route_template(endpoint_upstreams, method, template, path, kwargs, status):
+    client = TestClient(main.app)
+    count = requests_for(template, method=method, status=status)
+    timed = sample("http_request_duration_seconds_count", method=method, endpoint=template)
+
+    response = client.request(method, path, **kwargs)
+
+    assert str(response.status_code) == status
+    # Stubbed upstreams answer every request, so no endpoint should report a failure
+    if response.headers["content-type"] == "application/json":
+        assert "error" not in response.json()
+    assert "event: error" not in response.text
+    assert requests_for(template, method=method, status=status) == count + 1
+    assert sample("http_request_duration_seconds_count", method=method, endpoint=template) == timed + 1
+    assert sample("http_requests_in_flight", endpoint=template) == 0
+
+
+def test_unknown_paths_share_one_label():
+    before = requests_for(metrics.UNMATCHED, status="404")
+
+    TestClient(main.app).get("/no-such-page/12345")
+
+    assert requests_for(metrics.UNMATCHED, status="404") == before + 1
+    assert "/no-such-page/12345" not in TestClient(main.app).get("/metrics").text
+
+
+def test_upstream_failures_are_counted(monkeypatch):
+    monkeypatch.setattr(web, "tavily_client", LazyResource("test", lambda: FakeTavily(fail=True)))
+    before = sample("upstream_errors_total", upstream="tavily", stage="tavily")
+
+    response = TestClient(main.app).post("/web-search", json={"query": "nvidia news"}).json()
+
+    assert "error" in response
+    assert sample("upstream_errors_total", upstream="tavily", stage="tavily") == before + 1
+    assert sample("upstream_requests_in_flight", upstream="tavily") == 0
+
+
+def test_arxiv_search_reports_fetch_and_summarization_stages(arxiv_upstreams):
+    arxiv_upstreams.delay = 0
+    arxiv_upstreams.entries = 3
+    before = (stage_count("arxiv_fetch"), stage_count("summarization"))
+
+    TestClient(main.app).post("/copilotkit_remote", json={"query": "metrics test papers"})
+
+    assert stage_count("arxiv_fetch") == before[0] + 1
+    assert stage_count("summarization") > before[1]
+
+
+def test_stage_timer_costs_microseconds():
+    stage = metrics.Stage("overhead_test", upstream="test")
+    runs = 20000
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        with stage.time():
+            pass
+    per_call = (time.perf_counter() - start) / runs
+
+    assert per_call < 50e-6
+    assert stage_count("overhead_test") == runs
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from apis import main
+from apis.pdf_render import PdfRenderer, RenderQueueFull
+
+
+class SlowRender:
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, html):
+        with self._lock:
+            self.calls.append(html)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.active -= 1
+        return b"%PDF-1.4 " + html.encode()
+
+
+def test_identical_documents_render_once():
+    render = SlowRender()
+    renderer = PdfRenderer(render=render, workers=2)
+
+    async def run():
+        first = await asyncio.gather(*[renderer.render("<p>report</p>") for _ in range(5)])
+        second = await renderer.render("<p>report</p>")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert len(render.calls) == 1
+    assert [cached for _, _, cached in first].count(False) == 1
+    assert second[2] is True
+    assert renderer.stats()["coalesced"] == 4
+
+
+def test_pool_bounds_workers_and_rejects_over_queue_limit():
+    render = SlowRender(seconds=0.1)
+    renderer = PdfRenderer(render=render, workers=2, max_queue=2)
+
+    async def run():
+        return await asyncio.gather(*[renderer.render(f"<p>{i}</p>") for i in range(6)], return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert render.peak == 2
+    assert sum(isinstance(result, RenderQueueFull) for result in results) == 2
+    assert renderer.stats()["rejected"] == 2
+
+
+def test_endpoint_returns_binary_pdf(monkeypatch):
+    monkeypatch.setattr(main, "pdf_renderer", PdfRenderer(render=SlowRender(seconds=0)))
+    client = TestClient(main.app)
+
+    first = client.post("/convert-text-to-pdf", json={"text": "# Findings"})
+    second = client.post("/convert-text-to-pdf", json={"text": "# Findings"})
+
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "application/pdf"
+    assert first.content.startswith(b"%PDF")
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("miss", "hit")
+    assert first.headers["etag"] == second.headers["etag"]
+
+
+def test_endpoint_sheds_load_when_queue_is_full(monkeypatch):
+    renderer = PdfRenderer(render=SlowRender(seconds=0), workers=1, max_queue=0)
+
+    async def busy(html):
+        raise RenderQueueFull("busy")
+
+    monkeypatch.setattr(renderer, "render", busy)
+    monkeypatch.setattr(main, "pdf_renderer", renderer)
+
+    response = TestClient(main.app).post("/convert-text-to-pdf", json={"text": "# Findings"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "2"
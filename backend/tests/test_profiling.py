@@ -0,0 +1,130 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+
+from apis import main, profiling, web
+from apis.resources import LazyResource
+
+
+class SlowTavily:
+    async def get_search_context(self, query):
+        await asyncio.sleep(0.1)
+        return f"context for {query}"
+
+
+def setup(monkeypatch, tmp_path):
+    monkeypatch.setattr(web, "tavily_client", LazyResource("test", lambda: SlowTavily()))
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling.settings, "sample_rate", 0.0)
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    return TestClient(main.app)
+
+
+def saved_profiles(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+
+
+def test_summary_mode_returns_the_profile_with_await_time(monkeypatch, tmp_path):
+    client = setup(monkeypatch, tmp_path)
+
+    response = client.post(
+        "/web-search", json={"query": "slow query"},
+        headers={"X-Profile": "summary:secret", "Origin": "https://canvas.example"},
+    )
+    body = response.json()
+
+    assert body["status"] == 200
+    assert body["response"] == {"context": "context for slow query"}
+    assert body["profile"]["duration"] >= 0.1
+    assert body["profile"]["await_time"] >= 0.08  # The Tavily wait is attributed, not lost
+    assert "search_web" in body["profile"]["call_tree"]
+    assert response.headers["x-profile-id"] == body["profile"]["id"]
+    # Headers set inside the app survive the rewritten response
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert response.headers["content-length"] == str(len(response.content))
+
+
+def test_query_flag_saves_the_profile(monkeypatch, tmp_path):
+    client = setup(monkeypatch, tmp_path)
+
+    response = client.post("/web-search?profile=1:secret", json={"query": "slow query"})
+
+    assert response.json() == {"context": "context for slow query"}
+    profile_id = response.headers["x-profile-id"]
+    assert saved_profiles(tmp_path) == [f"{profile_id}.json"]
+    assert os.path.exists(tmp_path / f"{profile_id}.html")
+
+
+def test_unflagged_requests_are_not_profiled(monkeypatch, tmp_path):
+    client = setup(monkeypatch, tmp_path)
+
+    response = client.post("/web-search", json={"query": "slow query"})
+
+    assert "x-profile-id" not in response.headers
+    assert not os.path.exists(tmp_path) or saved_profiles(tmp_path) == []
+
+
+def test_admin_sample_rate_profiles_traffic_automatically(monkeypatch, tmp_path):
+    client = setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(profiling.settings, "sample_paths", list(profiling.settings.sample_paths))
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    auth = {"Authorization": "Bearer secret"}
+
+    assert client.post("/admin/profiling", json={"sample_rate": 2}, headers=auth).status_code == 400
+    settings = client.post("/admin/profiling", json={"sample_rate": 1.0, "sample_paths": ["/web-search"]}, headers=auth).json()
+    assert settings["sample_rate"] == 1.0
+    assert client.get("/admin/profiling", headers=auth).json() == settings
+
+    client.post("/web-search", json={"query": "first"})
+    client.post("/web-search", json={"query": "second"})
+    client.get("/")  # Not a sampled path
+
+    assert len(saved_profiles(tmp_path)) == 2
+
+
+def test_token_is_required_to_profile_on_request(monkeypatch, tmp_path):
+    client = setup(monkeypatch, tmp_path)
+
+    unprofiled = client.post("/web-search", json={"query": "q"}, headers={"X-Profile": "summary"})
+    wrong = client.post("/web-search?profile=summary:wrong", json={"query": "q"})
+    profiled = client.post("/web-search", json={"query": "q"}, headers={"X-Profile": "summary:secret"})
+
+    assert unprofiled.json() == wrong.json() == {"context": "context for q"}
+    assert "profile" in profiled.json()
+
+    # Without a configured token, on-request profiling is off entirely
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    for response in (
+        client.post("/web-search", json={"query": "q"}, headers={"X-Profile": "summary"}),
+        client.post("/web-search?profile=summary", json={"query": "q"}),
+        client.post("/web-search", json={"query": "q"}, headers={"X-Profile": "summary:"}),
+    ):
+        assert response.json() == {"context": "context for q"}
+        assert "x-profile-id" not in response.headers
+
+
+def test_admin_endpoint_requires_the_token(monkeypatch, tmp_path):
+    client = setup(monkeypatch, tmp_path)
+    change = {"sample_rate": 1.0, "sample_paths": ["/web-search"]}
+
+    # Not served at all without a configured token
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    assert client.get("/admin/profiling").status_code == 404
+    assert client.post("/admin/profiling", json=change).status_code == 404
+
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    assert client.get("/admin/profiling").status_code == 403
+    assert client.post("/admin/profiling", json=change, headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert profiling.settings.sample_rate == 0.0
+
+
+def test_old_profiles_are_pruned(tmp_path):
+    for index in range(5):
+        profiling.save_profile({"id": f"p{index}"}, "<html></html>", directory=str(tmp_path), max_files=3)
+        os.utime(tmp_path / f"p{index}.json", (index, index))
+
+    profiling.save_profile({"id": "p5"}, "<html></html>", directory=str(tmp_path), max_files=3)
+
+    assert saved_profiles(tmp_path) == ["p3.json", "p4.json", "p5.json"]
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".html")) == ["p3.html", "p4.html", "p5.html"]
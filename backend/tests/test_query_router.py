@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+from apis.query_router import QueryRouter, normalize_query
+
+
+def test_keyword_rules_route_without_scoring():
+    router = QueryRouter()
+
+    assert router.classify("Find arXiv papers on diffusion").route == "arxiv"
+    assert router.classify("Summarize the uploaded PDF").route == "rag"
+    assert router.classify("Latest news on the election").route == "web"
+    assert router.classify("Find arXiv papers on diffusion").source == "rules"
+
+
+def test_centroid_classifier_handles_queries_without_keywords():
+    decision = QueryRouter().classify("self supervised learning for speech recognition")
+
+    assert decision.route == "arxiv"
+    assert decision.source == "centroid"
+
+
+def test_low_confidence_escalates_to_fallback_and_is_memoized():
+    router = QueryRouter(min_similarity=1.1)
+    calls = []
+
+    async def fallback(query):
+        calls.append(query)
+        return "web"
+
+    first = asyncio.run(router.route("Who painted the Mona Lisa?", fallback=fallback))
+    second = asyncio.run(router.route("  who painted the MONA LISA ", fallback=fallback))
+
+    assert (first.route, first.source) == ("web", "llm")
+    assert (second.route, second.source) == ("web", "memo")
+    assert calls == ["Who painted the Mona Lisa?"]
+
+
+def test_unrecognized_fallback_answers_are_not_memoized():
+    router = QueryRouter(min_similarity=1.1)
+
+    async def fallback(query):
+        return "not sure"
+
+    asyncio.run(router.route("hello there", fallback=fallback))
+
+    assert normalize_query("hello there") not in router._memo
+
+
+def test_local_routing_is_sub_millisecond():
+    router = QueryRouter()
+    query = "recent advances in graph neural networks for chemistry"
+
+    start = time.perf_counter()
+    for _ in range(100):
+        router.classify(query)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / 100
+
+    assert elapsed_ms < 1.0
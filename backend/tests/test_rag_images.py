@@ -0,0 +1,88 @@
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from apis import rag
+from apis.cache import TTLCache
+from apis.resources import LazyResource
+
+
+def png_bytes(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {"outputs/figure-1.png": (png_bytes("red"), '"etag-1"')}
+        self.heads = 0
+        self.downloads = 0
+
+    def head_object(self, Bucket, Key):
+        self.heads += 1
+        return {"ETag": self.objects[Key][1]}
+
+    def get_object(self, Bucket, Key):
+        self.downloads += 1
+        return {"Body": io.BytesIO(self.objects[Key][0])}
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.vectors = []
+
+    def similarity_search_by_vector(self, embedding, **kwargs):
+        self.vectors.append(embedding)
+        return []
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.vectorstore = FakeVectorStore()
+        self.search_kwargs = {}
+
+
+def setup_fakes(monkeypatch):
+    s3 = FakeS3()
+    embedded = []
+
+    def fake_embedding(image):
+        assert isinstance(image, Image.Image) and image.mode == "RGB"
+        embedded.append(image.getpixel((0, 0)))
+        return np.full(512, len(embedded), dtype=np.float32)
+
+    monkeypatch.setattr(rag, "s3_client", LazyResource("test", lambda: s3))
+    monkeypatch.setattr(rag, "image_retriever", LazyResource("test", FakeRetriever))
+    monkeypatch.setattr(rag, "image_embedding_cache", TTLCache(max_bytes=1024 * 1024))
+    monkeypatch.setattr(rag, "get_image_embedding", fake_embedding)
+    return s3, embedded
+
+
+def test_repeat_image_queries_skip_download_and_clip(monkeypatch):
+    s3, embedded = setup_fakes(monkeypatch)
+
+    for _ in range(3):
+        asyncio.run(rag.retrieve_image_docs("outputs/figure-1.png"))
+
+    assert s3.heads == 3
+    assert s3.downloads == 1
+    assert embedded == [(255, 0, 0)]
+    assert rag.image_embedding_cache.stats()["hits"] == 2
+
+
+def test_changed_etag_reembeds_image(monkeypatch):
+    s3, embedded = setup_fakes(monkeypatch)
+
+    first = rag.get_s3_image_embedding("outputs/figure-1.png")
+    s3.objects["outputs/figure-1.png"] = (png_bytes("blue"), '"etag-2"')
+    second = rag.get_s3_image_embedding("outputs/figure-1.png")
+
+    assert embedded == [(255, 0, 0), (0, 0, 255)]
+    assert not np.array_equal(first, second)
+
+
+def test_undecodable_image_is_rejected():
+    assert rag.decode_image(b"not an image") is None
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from apis import resources
+from apis.resources import LazyResource, readiness, warm_up
+
+
+def test_lazy_resource_builds_once_under_concurrency():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    resource = LazyResource("slow", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resource.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert resource.ready
+
+
+def test_failed_build_is_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream unavailable")
+        return "client"
+
+    resource = LazyResource("flaky", factory)
+    try:
+        resource.get()
+    except RuntimeError:
+        pass
+    assert not resource.ready
+    assert resource.status()["error"] == "upstream unavailable"
+
+    assert resource.get() == "client"
+    assert resource.status()["error"] is None
+
+
+def test_app_serves_health_before_ready(monkeypatch):
+    from apis import main
+
+    monkeypatch.setattr(resources, "registry", {})
+    resources.lazy("test.model", lambda: "model")
+    resources.lazy("test.optional", lambda: 1 / 0, required=False)
+
+    with TestClient(main.app) as client:
+        assert client.get("/").status_code == 200
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["resources"]["test.model"]["ready"] is False
+
+        statuses = warm_up()
+        assert statuses["test.optional"]["error"]
+        assert client.get("/ready").status_code == 200
+        assert readiness()[0]
@@ -0,0 +1,96 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from apis import main
+from apis.resources import LazyResource
+
+
+class FakeS3:
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.calls = []
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, ContinuationToken=None):
+        self.calls.append({"Prefix": Prefix, "MaxKeys": MaxKeys, "ContinuationToken": ContinuationToken})
+        matching = [key for key in self.keys if key.startswith(Prefix)]
+        start = int(ContinuationToken or 0)
+        page = matching[start:start + MaxKeys]
+        response = {"KeyCount": len(page)}
+        if page:
+            response["Contents"] = [{"Key": key} for key in page]
+        if start + MaxKeys < len(matching):
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        return response
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3([f"pdfs/paper-{i:03d}.pdf" for i in range(25)] + [f"outputs/doc/img-{i}.png" for i in range(100)])
+    monkeypatch.setattr(main, "s3_client", LazyResource("test", lambda: fake))
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    main.s3_listing_cache.clear()
+    return fake
+
+
+def test_listing_filters_by_prefix_on_the_server(s3):
+    response = TestClient(main.app).get("/list-s3-files/").json()
+
+    assert len(response["files"]) == 25
+    assert response["next_cursor"] is None
+    assert s3.calls[0]["Prefix"] == "pdfs/"
+
+
+def test_cursor_pages_through_all_keys(s3):
+    client = TestClient(main.app)
+    files, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/list-s3-files/", params=params).json()
+        files += page["files"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert files == [f"pdfs/paper-{i:03d}.pdf" for i in range(25)]
+    assert len(s3.calls) == 3
+
+
+def test_pages_are_cached_until_invalidated(s3):
+    client = TestClient(main.app)
+    client.get("/list-s3-files/")
+    client.get("/list-s3-files/")
+    assert len(s3.calls) == 1
+
+    s3.keys.append("pdfs/paper-new.pdf")
+    assert client.post("/list-s3-files/invalidate", headers={"Authorization": "Bearer secret"}).status_code == 200
+
+    assert "pdfs/paper-new.pdf" in client.get("/list-s3-files/").json()["files"]
+    assert len(s3.calls) == 2
+
+
+def test_empty_prefix_reports_no_files(s3, monkeypatch):
+    monkeypatch.setattr(main, "S3_LIST_PREFIXES", ["pdfs/", "missing/"])
+    response = TestClient(main.app).get("/list-s3-files/", params={"prefix": "missing/"}).json()
+
+    assert response == {"message": "No files found in the bucket."}
+
+
+def test_only_allowed_prefixes_can_be_listed(s3):
+    client = TestClient(main.app)
+
+    for prefix in ("", "outputs/", "pdfs"):
+        assert client.get("/list-s3-files/", params={"prefix": prefix}).status_code == 400
+    assert s3.calls == []
+
+
+def test_invalidation_requires_the_admin_token(s3, monkeypatch):
+    client = TestClient(main.app)
+    client.get("/list-s3-files/")
+
+    assert client.post("/list-s3-files/invalidate").status_code == 403
+    assert client.post("/list-s3-files/invalidate", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.post("/list-s3-files/invalidate", headers={"Authorization": "Bearer secret"}).status_code == 404
+
+    client.get("/list-s3-files/")
+    assert len(s3.calls) == 1  # Still cached
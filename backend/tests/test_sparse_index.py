@@ -0,0 +1,78 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from apis import context, rag
+from apis.ranking import reciprocal_rank_fusion
+from apis.resources import LazyResource
+from apis.sparse_index import BM25Index, tokenize
+
+CHUNKS = [
+    ("doc-text-0", "Attention Is All You Need introduces the Transformer architecture.", {"content": "transformer"}),
+    ("doc-text-1", "Table 3: BLEU scores of GPT-4 and LLaMA-2 on WMT14.", {"content": "table"}),
+    ("doc-text-2", "Recurrent networks process tokens one at a time.", {"content": "rnn"}),
+]
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize("GPT-4 beats the baseline (arXiv 2401.00001)") == ["gpt-4", "beats", "baseline", "arxiv", "2401.00001"]
+
+
+def test_exact_terms_rank_first():
+    index = BM25Index(":memory:")
+    index.add(CHUNKS)
+
+    results = index.search("table 3 gpt-4", top_k=2)
+
+    assert [chunk_id for chunk_id, _, _ in results][0] == "doc-text-1"
+    assert results[0][2] == {"content": "table"}
+    assert index.search("quantum chromodynamics") == []
+
+
+def test_updates_and_deletes_replace_postings():
+    index = BM25Index(":memory:")
+    index.add(CHUNKS)
+    index.add([("doc-text-2", "Convolutional networks for images.", {})])
+    index.delete(["doc-text-0"])
+
+    assert index.search("recurrent") == []
+    assert index.search("transformer") == []
+    assert [chunk_id for chunk_id, _, _ in index.search("convolutional")] == ["doc-text-2"]
+    assert index.stats()["chunks"] == 2
+
+
+def test_reader_picks_up_chunks_from_writer(tmp_path):
+    path = str(tmp_path / "bm25.sqlite")
+    writer = BM25Index(path)
+    reader = BM25Index(path)
+    writer.add(CHUNKS)
+    writer.delete(["doc-text-2"])
+
+    assert reader.refresh() == 3
+    assert [chunk_id for chunk_id, _, _ in reader.search("transformer")] == ["doc-text-0"]
+    assert reader.search("recurrent") == []
+    assert BM25Index(path).stats()["chunks"] == 2
+
+
+def test_reciprocal_rank_fusion_merges_duplicates():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d", "a"]])
+
+    assert fused[:2] == ["a", "c"]
+    assert sorted(fused) == ["a", "b", "c", "d"]
+
+
+def test_rag_prompt_fuses_dense_and_bm25_results(monkeypatch):
+    index = BM25Index(":memory:")
+    index.add([(chunk_id, text, {"content": text}) for chunk_id, text, _ in CHUNKS])
+
+    async def dense(query):
+        return [Document(page_content=CHUNKS[2][1]), Document(page_content=CHUNKS[0][1])]
+
+    monkeypatch.setattr(context, "tokenizer", LazyResource("test", lambda: None))
+    monkeypatch.setattr(rag, "sparse_index", LazyResource("test", lambda: index))
+    monkeypatch.setattr(rag, "retrieve_text_docs", dense)
+
+    prompt = asyncio.run(rag.build_rag_prompt("table 3 BLEU scores"))
+
+    assert CHUNKS[1][1] in prompt
+    assert prompt.count(CHUNKS[0][1]) == 1
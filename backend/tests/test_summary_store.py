@@ -0,0 +1,47 @@
+import asyncio
+
+from apis import arxiv
+from apis.summary_store import SummaryStore
+
+
+def test_store_survives_restart(tmp_path):
+    path = str(tmp_path / "summaries.db")
+    store = SummaryStore(path)
+    store.put_many([("http://arxiv.org/abs/1", "abstract one", "summary one")])
+    store.close()
+
+    reopened = SummaryStore(path)
+
+    assert reopened.get_many([("http://arxiv.org/abs/1", "abstract one")]) == ["summary one"]
+    assert reopened.stats()["hits"] == 1
+
+
+def test_changed_abstract_is_a_miss():
+    store = SummaryStore(":memory:")
+    store.put_many([("http://arxiv.org/abs/1", "abstract one", "summary one")])
+
+    assert store.get_many([("http://arxiv.org/abs/1", "revised abstract")]) == [None]
+    assert store.stats()["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    store = SummaryStore(":memory:", max_entries=2, memory_entries=1)
+    store.put_many([("a", "a", "summary a")])
+    store.put_many([("b", "b", "summary b")])
+    store.get_many([("a", "a")])
+    store.put_many([("c", "c", "summary c")])
+
+    assert store.get_many([("a", "a"), ("b", "b"), ("c", "c")]) == ["summary a", None, "summary c"]
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["size"] == 2
+
+
+def test_search_arxiv_reuses_stored_summaries(arxiv_upstreams):
+    arxiv_upstreams.entries = 3
+
+    first = asyncio.run(arxiv.search_arxiv.ainvoke("machine learning"))
+    second = asyncio.run(arxiv.search_arxiv.ainvoke("deep learning"))
+
+    assert arxiv_upstreams.completion_calls == 3
+    assert first == second
+    assert arxiv.summary_store.get().stats()["hits"] == 3
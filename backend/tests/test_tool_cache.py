@@ -0,0 +1,111 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from apis import web
+from apis.resources import LazyResource
+from apis.router import tool_node
+from apis.tool_cache import DiskTier, ToolResultCache, cached_tool
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    calls = []
+
+    @cached_tool("test-coalesce", ttl=60)
+    async def lookup(query: str) -> dict:
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return {"context": query.upper()}
+
+    async def run():
+        return await asyncio.gather(*[lookup(" graph  networks") for _ in range(10)])
+
+    results = asyncio.run(run())
+    again = asyncio.run(lookup("graph networks"))
+
+    assert calls == [" graph  networks"]
+    assert all(result == {"context": " GRAPH  NETWORKS"} for result in results + [again])
+    stats = lookup.cache.stats()
+    assert stats["coalesced"] == 9
+    assert stats["hits"] == 1
+    assert stats["upstream_calls"] == 1
+
+
+def test_errors_are_not_cached():
+    calls = []
+
+    @cached_tool("test-errors", ttl=60)
+    async def lookup(query: str) -> dict:
+        calls.append(query)
+        return {"error": "upstream timeout"}
+
+    asyncio.run(lookup("q"))
+    asyncio.run(lookup("q"))
+
+    assert len(calls) == 2
+
+
+def test_clear_during_a_call_keeps_its_result_out_of_the_cache():
+    calls = []
+
+    @cached_tool("test-clear", ttl=60)
+    async def lookup(query: str) -> dict:
+        calls.append(query)
+        version = len(calls)
+        if version == 1:
+            # The data this call read is invalidated while it runs, as by an index refresh
+            await asyncio.to_thread(lookup.cache.clear)
+        await asyncio.sleep(0.05)
+        return {"version": version}
+
+    async def run():
+        first = asyncio.ensure_future(lookup("q"))
+        await asyncio.sleep(0.02)
+        # Started after the clear, so it does not join the stale call
+        second = await lookup("q")
+        return await first, second
+
+    first, second = asyncio.run(run())
+    third = asyncio.run(lookup("q"))
+
+    assert first == {"version": 1}
+    assert second == third == {"version": 2}
+    assert len(calls) == 2
+
+
+def test_disk_tier_survives_a_new_memory_tier(tmp_path):
+    disk = DiskTier(str(tmp_path / "tool_results.sqlite"))
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"results": [1, 2, 3]}
+
+    first = ToolResultCache("arxiv", ttl=60, disk=disk)
+    asyncio.run(first.call("arxiv:key", compute))
+
+    second = ToolResultCache("arxiv", ttl=60, disk=disk)
+    assert asyncio.run(second.call("arxiv:key", compute)) == {"results": [1, 2, 3]}
+    assert second.stats()["disk_hits"] == 1
+    assert len(calls) == 1
+
+
+class FakeTavily:
+    def __init__(self):
+        self.queries = []
+
+    async def get_search_context(self, query):
+        self.queries.append(query)
+        return f"context for {query}"
+
+
+def test_tool_node_and_endpoint_share_the_cache(monkeypatch):
+    tavily = FakeTavily()
+    monkeypatch.setattr(web, "tavily_client", LazyResource("test", lambda: tavily))
+
+    message = AIMessage(content="", tool_calls=[{"name": "web_search", "args": {"query": "nvidia news"}, "id": "call-1"}])
+    asyncio.run(tool_node.ainvoke({"messages": [message]}))
+    result = asyncio.run(web.search_web.ainvoke("nvidia news"))
+
+    assert result == {"context": "context for nvidia news"}
+    assert tavily.queries == ["nvidia news"]
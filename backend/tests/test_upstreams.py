@@ -0,0 +1,106 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from apis import arxiv, main, rag, upstreams, web
+from apis.resources import LazyResource
+from benchmarks.bench_load import ServerThread
+
+
+async def ok(request):
+    await asyncio.sleep(0.02)
+    return JSONResponse({"results": [{"url": "https://example.com", "content": "context"}]})
+
+
+def local_server():
+    return ServerThread(Starlette(routes=[Route("/", ok, methods=["GET", "HEAD"]), Route("/search", ok, methods=["POST"])]))
+
+
+def test_requests_reuse_pooled_connections():
+    with local_server() as server:
+        registry = upstreams.UpstreamRegistry()
+        registry.register(upstreams.UpstreamConfig("local", server.url, max_connections=2, max_keepalive=2))
+
+        async def run():
+            client = registry.http_client("local")
+            for _ in range(5):
+                await client.get("/")
+            await asyncio.gather(*[client.get("/") for _ in range(6)])
+            await client.aclose()
+
+        asyncio.run(run())
+
+    stats = registry.stats()["local"]
+    assert stats["requests"] == 11
+    assert stats["connections_opened"] <= 2  # The pool limit holds under concurrency
+    assert stats["reused"] == 11 - stats["connections_opened"]
+
+
+def test_warm_opens_connections_before_the_first_request():
+    with local_server() as server:
+        registry = upstreams.UpstreamRegistry()
+        registry.register(upstreams.UpstreamConfig("local", server.url))
+
+        async def run():
+            client = LazyResource("test", lambda: registry.http_client("local"))
+            assert await registry.warm({"local": client}, connections=2) == {"local": True}
+            opened = registry.stats()["local"]["connections_opened"]
+            await client.get().get("/")
+            return opened
+
+        opened_by_warm_up = asyncio.run(run())
+
+    assert opened_by_warm_up == 2
+    assert registry.stats()["local"]["connections_opened"] == 2
+
+
+def test_tavily_client_keeps_the_shared_pool_open(monkeypatch):
+    with local_server() as server:
+        registry = upstreams.UpstreamRegistry()
+        registry.register(upstreams.UpstreamConfig("tavily", server.url))
+
+        async def run():
+            pooled = registry.http_client("tavily")
+            monkeypatch.setitem(upstreams.http_clients, "tavily", LazyResource("test", lambda: pooled))
+            client = upstreams.create_tavily_client("test-key")
+            first = await client.search("first query")
+            second = await client.search("second query")
+            return first, second
+
+        first, second = asyncio.run(run())
+
+    assert first["results"] == second["results"]
+    assert registry.stats()["tavily"]["connections_opened"] == 1
+
+
+def test_tavily_client_borrows_the_pooled_client(monkeypatch):
+    from tavily import AsyncTavilyClient
+
+    # Pooling replaces this private SDK attribute; if a tavily-python upgrade drops it, fail here
+    assert callable(getattr(AsyncTavilyClient(api_key="test-key"), "_client_creator", None))
+
+    pooled = object()
+    monkeypatch.setitem(upstreams.http_clients, "tavily", LazyResource("test", lambda: pooled))
+
+    async def borrow():
+        async with upstreams.create_tavily_client("test-key")._client_creator() as http_client:
+            return http_client
+
+    assert asyncio.run(borrow()) is pooled
+
+
+def test_modules_share_one_client_per_upstream():
+    assert main.client is arxiv.client is upstreams.openai_client
+    assert main.s3_client is rag.s3_client is upstreams.s3_client
+    assert web.tavily_client is upstreams.tavily_client
+    assert arxiv.http_client is upstreams.http_clients["arxiv"]
+
+
+def test_upstream_stats_endpoint():
+    stats = TestClient(main.app).get("/upstream-stats").json()
+
+    assert set(stats) == {"openai", "nvidia", "tavily", "arxiv"}
+    assert stats["arxiv"]["max_connections"] == upstreams.registry.configs["arxiv"].max_connections
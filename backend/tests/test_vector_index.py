@@ -0,0 +1,144 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_pinecone import PineconeVectorStore
+
+from apis.vector_index import LocalVectorIndex
+
+
+class FixedEmbeddings(Embeddings):
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def clustered_vectors(count, dim, clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def exact_top_k(vectors, queries, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.argsort(-(queries @ normalized.T), axis=1)[:, :k]
+
+
+def test_exact_query_returns_nearest_with_metadata(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "idx"), dimension=3)
+    index.upsert(vectors=[
+        {"id": "x", "values": [1, 0, 0], "metadata": {"text": "about x"}},
+        {"id": "y", "values": [0, 1, 0], "metadata": {"text": "about y"}},
+        ("z", [0.9, 0.1, 0], {"text": "about z"}),
+    ])
+
+    result = index.query(vector=[1, 0, 0], top_k=2, include_metadata=True)
+
+    assert [match["id"] for match in result["matches"]] == ["x", "z"]
+    assert result["matches"][0]["metadata"] == {"text": "about x"}
+    assert abs(result["matches"][0]["score"] - 1.0) < 1e-6
+
+
+def test_upsert_overwrites_and_delete_hides(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "idx"), dimension=2)
+    index.upsert(vectors=[("a", [1, 0]), ("b", [0, 1])])
+    index.upsert(vectors=[("a", [0, 1], {"v": 2})])
+    index.delete(ids=["b"])
+
+    result = index.query(vector=[0, 1], top_k=5, include_metadata=True)
+
+    assert [(m["id"], m["metadata"]) for m in result["matches"]] == [("a", {"v": 2})]
+    assert index.describe_index_stats()["total_vector_count"] == 1
+
+
+def test_index_survives_restart_and_grows_past_initial_capacity(tmp_path):
+    path = str(tmp_path / "idx")
+    vectors = clustered_vectors(3000, 8)
+    index = LocalVectorIndex(path, dimension=8)
+    index.upsert(vectors=[(str(i), vector) for i, vector in enumerate(vectors)])
+    index.delete(ids=["5"])
+    index.upsert(vectors=[("5", vectors[5])])
+    index.close()
+
+    reopened = LocalVectorIndex(path, dimension=8)
+
+    assert reopened.describe_index_stats()["total_vector_count"] == 3000
+    assert reopened.query(vector=vectors[1234], top_k=1)["matches"][0]["id"] == "1234"
+    assert reopened.query(vector=vectors[5], top_k=1)["matches"][0]["id"] == "5"
+
+
+def test_refresh_picks_up_another_handles_writes(tmp_path):
+    path = str(tmp_path / "idx")
+    vectors = clustered_vectors(2000, 8)
+    writer = LocalVectorIndex(path, dimension=8, ivf_threshold=1000)
+    writer.upsert(vectors=[(str(i), vector) for i, vector in enumerate(vectors[:100])])
+    reader = LocalVectorIndex(path, dimension=8, ivf_threshold=1000, nprobe=64)
+    reader.query(vector=vectors[0], top_k=1)
+
+    # Past the initial capacity, so the writer replaces the vectors file
+    writer.upsert(vectors=[(str(i), vector) for i, vector in enumerate(vectors[100:], start=100)])
+    writer.ensure_ivf()
+    writer.delete(ids=["7"])
+    writer.upsert(vectors=[("8", vectors[1500], {"moved": True})])
+
+    assert reader.query(vector=vectors[1999], top_k=1)["matches"][0]["id"] != "1999"
+    assert reader.refresh() == 1902
+    assert reader.refresh() == 0
+
+    assert reader.describe_index_stats()["total_vector_count"] == 1999
+    # The reader searches with the writer's IVF index instead of training its own
+    assert reader.describe_index_stats()["search_mode"] == "ivf"
+    assert reader._ivf_thread is None
+    assert reader.query(vector=vectors[1999], top_k=1)["matches"][0]["id"] == "1999"
+    assert "7" not in {match["id"] for match in reader.query(vector=vectors[7], top_k=5)["matches"]}
+    moved = reader.query(vector=vectors[1500], top_k=2, include_metadata=True)["matches"]
+    assert {match["id"] for match in moved} == {"8", "1500"}
+    assert reader.fetch(["8"])["vectors"]["8"]["metadata"] == {"moved": True}
+
+
+def test_ivf_recall_against_exact(tmp_path):
+    vectors = clustered_vectors(5000, 32)
+    queries = clustered_vectors(50, 32, seed=1)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    index = LocalVectorIndex(str(tmp_path / "idx"), dimension=32, mode="ivf", nprobe=16)
+    index.upsert(vectors=[(str(i), vector) for i, vector in enumerate(vectors)])
+    index.ensure_ivf()
+
+    truth = exact_top_k(vectors, queries, 10)
+    hits = 0
+    for query, expected in zip(queries, truth):
+        found = {int(match["id"]) for match in index.query(vector=query, top_k=10)["matches"]}
+        hits += len(found & set(expected.tolist()))
+
+    assert index.describe_index_stats()["search_mode"] == "ivf"
+    assert hits / truth.size > 0.9
+
+
+def test_missing_ivf_is_trained_in_the_background(tmp_path):
+    vectors = clustered_vectors(3000, 16)
+    index = LocalVectorIndex(str(tmp_path / "idx"), dimension=16, ivf_threshold=1000)
+    index.upsert(vectors=[(str(i), vector) for i, vector in enumerate(vectors)])
+
+    # Past the threshold with no trained index: answered exactly while training runs
+    assert index.query(vector=vectors[42], top_k=1)["matches"][0]["id"] == "42"
+    index._ivf_thread.join()
+
+    assert index.describe_index_stats()["search_mode"] == "ivf"
+    assert index.query(vector=vectors[42], top_k=1)["matches"][0]["id"] == "42"
+    assert LocalVectorIndex(str(tmp_path / "idx"), dimension=16, ivf_threshold=1000)._centroids is not None
+
+
+def test_works_behind_the_langchain_pinecone_retriever(tmp_path):
+    embeddings = FixedEmbeddings({"cats": [1.0, 0.0], "dogs": [0.0, 1.0], "kittens": [0.9, 0.1]})
+    index = LocalVectorIndex(str(tmp_path / "idx"), dimension=2)
+    index.upsert(vectors=[
+        {"id": name, "values": embeddings.embed_query(name), "metadata": {"text": f"all about {name}"}}
+        for name in ("cats", "dogs")
+    ])
+
+    retriever = PineconeVectorStore(index=index, embedding=embeddings).as_retriever(search_kwargs={"k": 1})
+
+    assert [doc.page_content for doc in retriever.invoke("kittens")] == ["all about cats"]
@@ -38,14 +38,24 @@ export default function Home() {
   useEffect(() => {
     const fetchFiles = async () => {
         try {
-            const response = await fetch("http://localhost:8000/list-s3-files/");
-            if (!response.ok) {
-                throw new Error("Failed to fetch files from backend");
-            }
-            const data = await response.json();
-            if (data.files) {
+            // Follow next_cursor until the last page of the listing
+            let allFiles = [];
+            let cursor = null;
+            do {
+                const url = cursor
+                    ? `http://localhost:8000/list-s3-files/?cursor=${encodeURIComponent(cursor)}`
+                    : "http://localhost:8000/list-s3-files/";
+                const response = await fetch(url);
+                if (!response.ok) {
+                    throw new Error("Failed to fetch files from backend");
+                }
+                const data = await response.json();
+                allFiles = allFiles.concat(data.files || []);
+                cursor = data.next_cursor;
+            } while (cursor);
+            if (allFiles.length) {
                 // Filter to exclude 'pdfs/' and remove the 'pdfs/' prefix from each filename
-                const filteredFiles = data.files
+                const filteredFiles = allFiles
                     .filter(file => file.startsWith("pdfs/") && file !== "pdfs/") // Exclude "pdfs/" itself
                     .map(file => file.replace("pdfs/", ""));
                 setFiles(filteredFiles);